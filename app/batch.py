@@ -0,0 +1,38 @@
+from fastapi import HTTPException, status
+
+from .serializers import encode, encode_array, json_response
+
+MAX_BATCH_SIZE = 500
+
+
+def parse_ids(ids):
+    '''
+    The distinct ids of a batch request, in request order. Accepts the comma
+    separated `ids` query parameter or the `ids` list of a POST body.
+    '''
+    if isinstance(ids, str):
+        ids = ids.split(',')
+    if not isinstance(ids, list) or not all(isinstance(entity_id, str) for entity_id in ids):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="ids must be a list of strings")
+
+    ids = list(dict.fromkeys(entity_id.strip() for entity_id in ids if entity_id.strip()))
+    if not ids:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="ids is required")
+    if len(ids) > MAX_BATCH_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail=f"At most {MAX_BATCH_SIZE} ids per request")
+    return ids
+
+
+def body_ids(body: dict):
+    if not body:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Body is required")
+    return parse_ids(body.get('ids'))
+
+
+def batch_response(ids: list, entities: list, fragment, headers: dict | None = None):
+    '''`{"items": [...], "missing": [...]}`, entities being the lookup of ids with None when not found'''
+    found = [fragment(entity) for entity in entities if entity is not None]
+    missing = [entity_id for entity_id, entity in zip(ids, entities) if entity is None]
+    return json_response(
+        b'{"items":' + encode_array(found) + b',"missing":' + encode(missing) + b'}', headers=headers)
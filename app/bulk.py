@@ -0,0 +1,108 @@
+import asyncio
+import re
+from typing import Literal
+
+import orjson
+from fastapi import HTTPException, Request, status
+
+from .serializers import encode, json_response
+
+NDJSON_MEDIA_TYPES = ('application/x-ndjson', 'application/ndjson', 'application/jsonl')
+MAX_BULK_ITEMS = 5000
+BULK_CHUNK_SIZE = 500  # items handled between two pauses for other requests
+# ids that stay addressable as a path segment and inside the comma separated ids of /batch
+SAFE_ID_PATTERN = re.compile(r'[A-Za-z0-9._:-]{1,128}')
+
+
+class InvalidItem:
+    '''Placeholder for an NDJSON line that is not valid JSON'''
+
+    def __init__(self, detail: str):
+        self.detail = detail
+
+
+def parse_line(line: bytes):
+    try:
+        return orjson.loads(line)
+    except orjson.JSONDecodeError as e:
+        return InvalidItem(f"Invalid JSON: {e}")
+
+
+async def read_bulk_items(request: Request):
+    '''
+    Items of a bulk body: a JSON array, or NDJSON (one object per line) when
+    sent with an NDJSON content type. NDJSON is parsed as it arrives, so the
+    raw body is never held whole.
+    '''
+    content_type = request.headers.get('content-type', '').split(';')[0].strip()
+    if content_type in NDJSON_MEDIA_TYPES:
+        items = []
+        buffer = b''
+        async for chunk in request.stream():
+            buffer += chunk
+            *lines, buffer = buffer.split(b'\n')
+            items.extend(parse_line(line) for line in lines if line.strip())
+            check_item_count(items)
+        if buffer.strip():
+            items.append(parse_line(buffer))
+        return check_item_count(items)
+
+    try:
+        items = orjson.loads(await request.body())
+    except orjson.JSONDecodeError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Invalid JSON: {e}")
+    if not isinstance(items, list):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Body must be a JSON array or NDJSON")
+    return check_item_count(items)
+
+
+def check_item_count(items: list):
+    if len(items) > MAX_BULK_ITEMS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail=f"At most {MAX_BULK_ITEMS} items per request")
+    return items
+
+
+def check_item_id(entity_id, reserved: tuple = ()):
+    '''Why a client chosen id cannot be used, or None'''
+    if not isinstance(entity_id, str) or not SAFE_ID_PATTERN.fullmatch(entity_id):
+        return "id must be 1 to 128 letters, digits or ._:-"
+    if entity_id in reserved:
+        return f"id cannot be {entity_id}"
+    return None
+
+
+async def paced(items: list):
+    '''Enumerate items, pausing every BULK_CHUNK_SIZE so a large import does not hold the event loop'''
+    for index, item in enumerate(items):
+        if index and index % BULK_CHUNK_SIZE == 0:
+            await asyncio.sleep(0)
+        yield index, item
+
+
+class BulkResults:
+    '''Per item outcome of a bulk request, in request order'''
+
+    def __init__(self):
+        self.__results = []
+        self.__counts = {'created': 0, 'duplicate': 0, 'invalid': 0}
+
+    # Setters
+    def created(self, index: int, entity_id: str):
+        self.__add({'index': index, 'id': entity_id, 'status': 'created'})
+
+    def duplicate(self, index: int, entity_id: str):
+        self.__add({'index': index, 'id': entity_id, 'status': 'duplicate'})
+
+    def invalid(self, index: int, detail: str):
+        self.__add({'index': index, 'status': 'invalid', 'detail': detail})
+
+    # Utility methods
+    def response(self, results: Literal['all', 'errors'] = 'all'):
+        items = self.__results if results == 'all' else [
+            result for result in self.__results if result['status'] != 'created']
+        return json_response(encode({**self.__counts, 'results': items}))
+
+    def __add(self, result: dict):
+        self.__counts[result['status']] += 1
+        self.__results.append(result)
@@ -0,0 +1,159 @@
+import gzip
+from collections import OrderedDict
+
+from starlette.datastructures import Headers, MutableHeaders
+
+# coding -> compress(body, level), best first when the client rates them equally
+ENCODERS = {}
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+else:
+    ENCODERS['zstd'] = lambda body, level: zstandard.ZstdCompressor(level=level).compress(body)
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+else:
+    ENCODERS['br'] = lambda body, level: brotli.compress(body, quality=level)
+
+ENCODERS['gzip'] = lambda body, level: gzip.compress(body, compresslevel=level, mtime=0)
+
+COMPRESSIBLE_TYPES = ('application/json', 'application/x-ndjson', 'text/')
+
+
+def negotiate_encoding(accept_encoding: str):
+    '''The best available coding the client accepts, by q-value then by our preference'''
+    accepted = {}
+    for item in accept_encoding.split(','):
+        coding, _, parameters = item.strip().partition(';')
+        quality = 1.0
+        parameter, _, value = parameters.strip().partition('=')
+        if parameter.strip() == 'q':
+            try:
+                quality = float(value)
+            except ValueError:
+                quality = 0.0
+        if coding:
+            accepted[coding.strip().lower()] = quality
+
+    best, best_quality = None, 0.0
+    for coding in ENCODERS:
+        quality = accepted.get(coding, accepted.get('*', 0.0))
+        if quality > best_quality:
+            best, best_quality = coding, quality
+    return best
+
+
+class CompressedCache:
+    '''LRU of compressed bodies keyed by ETag and coding, bounded in bytes'''
+
+    def __init__(self, max_bytes: int):
+        self.__entries = OrderedDict()
+        self.__size = 0
+        self.__max_bytes = max_bytes
+
+    # Getters
+    def get(self, key: tuple):
+        body = self.__entries.get(key)
+        if body is not None:
+            self.__entries.move_to_end(key)
+        return body
+
+    def get_size(self):
+        return self.__size
+
+    # Setters
+    def put(self, key: tuple, body: bytes):
+        if len(body) > self.__max_bytes:
+            return
+        old = self.__entries.pop(key, None)
+        if old is not None:
+            self.__size -= len(old)
+        self.__entries[key] = body
+        self.__size += len(body)
+        while self.__size > self.__max_bytes:
+            _, evicted = self.__entries.popitem(last=False)
+            self.__size -= len(evicted)
+
+
+class CompressionMiddleware:
+    '''
+    Compresses whole JSON and text bodies of at least `minimum_size` bytes
+    with the best coding the client accepts (zstd and br when their packages
+    are installed, gzip always). Responses carrying an ETag are fully
+    determined by it, so their compressed bytes are cached under it and an
+    unchanged listing is compressed once. Streamed bodies pass through.
+
+    Once a coding is negotiated the tag is sent in its weak form whether or
+    not this body was compressed, so a 304 carries the same tag as the 200
+    it revalidates.
+    '''
+
+    def __init__(self, app, minimum_size: int = 1024, levels: dict | None = None, cache_bytes: int = 32 * 1024 * 1024):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.levels = {'gzip': 6, 'br': 5, 'zstd': 3, **(levels or {})}
+        self.cache = CompressedCache(cache_bytes)
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate_encoding(Headers(scope=scope).get('accept-encoding', ''))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        passthrough = False
+
+        async def send_compressed(message):
+            nonlocal start_message, passthrough
+            if passthrough:
+                await send(message)
+                return
+            if message['type'] == 'http.response.start':
+                # held back until the body shows whether it gets compressed
+                start_message = message
+                return
+
+            body = message.get('body', b'')
+            headers = MutableHeaders(raw=start_message['headers'])
+            etag = headers.get('etag')
+            if etag:
+                # the bytes differ per coding, so the tag can only be weak,
+                # and a 304 repeats the tag and Vary of the 200 it stands for
+                headers.add_vary_header('Accept-Encoding')
+                if not etag.startswith('W/'):
+                    headers['ETag'] = 'W/' + etag
+            if message.get('more_body', False) or not self.__is_compressible(headers, body):
+                passthrough = True
+                await send(start_message)
+                await send(message)
+                return
+
+            key = (etag, encoding, len(body))
+            compressed = self.cache.get(key) if etag else None
+            if compressed is None:
+                compressed = ENCODERS[encoding](body, self.levels[encoding])
+                if etag:
+                    self.cache.put(key, compressed)
+
+            headers['Content-Encoding'] = encoding
+            headers['Content-Length'] = str(len(compressed))
+            if not etag:
+                headers.add_vary_header('Accept-Encoding')
+            passthrough = True
+            await send(start_message)
+            await send({'type': 'http.response.body', 'body': compressed})
+
+        await self.app(scope, receive, send_compressed)
+
+    def __is_compressible(self, headers: MutableHeaders, body: bytes):
+        return (len(body) >= self.minimum_size
+                and 'content-encoding' not in headers
+                and headers.get('content-type', '').startswith(COMPRESSIBLE_TYPES))
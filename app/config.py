@@ -6,6 +6,35 @@ class Settings(BaseSettings):
     SECRET_KEY: str
     ALGORITHM: str
     ACCESS_TOKEN_EXPIRE_MINUTES: int
+    PASSWORD_SCHEME: str = 'bcrypt'  # passlib scheme for new hashes, bcrypt hashes keep verifying
+    BCRYPT_ROUNDS: int = 12  # hashes at any other cost are rehashed on login
+    PASSWORD_HASH_WORKERS: int = 2  # threads hashing passwords off the event loop
+    TOKEN_CACHE_SIZE: int = 10000  # verified access tokens remembered by get_current_user
+    RATE_LIMITS: dict[str, str] = {'login': '10/minute', 'register': '5/minute'}  # per client IP and per username
+    RATE_LIMIT_MAX_KEYS: int = 100000  # buckets kept per route and key type
+    CLIENT_IP_HEADER: str | None = None  # e.g. 'Fly-Client-IP' behind the fly.io proxy
+    COMPRESSION_MINIMUM_SIZE: int = 1024  # smaller bodies are sent as is
+    GZIP_LEVEL: int = 6
+    BROTLI_QUALITY: int = 5  # used when the brotli package is installed
+    ZSTD_LEVEL: int = 3  # used when the zstandard package is installed
+    COMPRESSION_CACHE_BYTES: int = 32 * 1024 * 1024  # compressed bodies kept by ETag
+    FRAGMENT_CACHE_BYTES: int = 64 * 1024 * 1024  # encoded entity fragments, shared by all entities
+    ROUTE_DISTANCE_METHOD: str = 'vincenty'  # or 'haversine', see internal/geometry
+    ROUTE_SPEED_KMH: float = 60.0  # average speed turning route distances into total_time
+    OPTIMIZE_MAX_WAYPOINTS: int = 300  # the search still converges within the time budget at this size
+    OPTIMIZE_TIME_BUDGET_MS: int = 250  # waypoint order search stops improving after this
+    STORAGE_BACKEND: str = 'memory'  # 'memory' or 'sqlite'
+    SQLITE_PATH: str = 'rally.db'
+    SQLITE_POOL_SIZE: int = 4
+    SQLITE_CACHE_SIZE: int = 10000
+    PERSISTENCE_DIR: str | None = None  # snapshot and journal of the memory backend, off when unset
+    SNAPSHOT_EVERY: int = 100000  # journal records that trigger a new snapshot
+    SNAPSHOT_CHECK_SECONDS: int = 30
+    JOURNAL_FSYNC: bool = False
+    SEED_ACCOUNTS: bool = True  # create the demo user and admin when missing
+    # precomputed bcrypt hashes of the demo passwords, so startup does no hashing
+    SEED_USER_PASSWORD_HASH: str = '$2b$12$Etwbk9Z2.k6rWEs1ceTwdOT.4Qv0cz90GEtzOk05Mc4bBGMXwEWaO'
+    SEED_ADMIN_PASSWORD_HASH: str = '$2b$12$n5PLnQwn15q1IjHYrwbPRuhBsXKjHD0itz.1vlYyW7mdyWzzbdrQy'
 
     class Config:
         env_file = '.env'
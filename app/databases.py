@@ -1,3 +1,6 @@
+from contextlib import nullcontext
+
+from .config import get_settings
 from .internal.roadtrip_catalog import RoadtripCatalog
 from .internal.account_catalog import AccountCatalog
 from .internal.magazine_catalog import MagazineCatalog
@@ -5,25 +8,69 @@ from .internal.landmark_catalog import LandmarkCatalog
 
 from .internal.user import User
 from .internal.admin import Admin
-from .utils import get_password_hash
 
-roadtrips_collection = RoadtripCatalog()
-accounts_collection = AccountCatalog()
-magazines_collection = MagazineCatalog()
-landmarks_collection = LandmarkCatalog()
+settings = get_settings()
+
+if settings.STORAGE_BACKEND == 'sqlite':
+    from .internal.sqlite_storage import SQLiteStorage
+    from .internal.sqlite_catalogs import (SQLiteAccountCatalog, SQLiteLandmarkCatalog,
+                                           SQLiteMagazineCatalog, SQLiteRoadtripCatalog)
+
+    storage = SQLiteStorage(settings.SQLITE_PATH, settings.SQLITE_POOL_SIZE)
+    magazines_collection = SQLiteMagazineCatalog(storage, settings.SQLITE_CACHE_SIZE)
+    roadtrips_collection = SQLiteRoadtripCatalog(storage, magazines_collection, settings.SQLITE_CACHE_SIZE)
+    accounts_collection = SQLiteAccountCatalog(storage, settings.SQLITE_CACHE_SIZE)
+    landmarks_collection = SQLiteLandmarkCatalog(storage, settings.SQLITE_CACHE_SIZE)
+else:
+    storage = None
+    roadtrips_collection = RoadtripCatalog()
+    accounts_collection = AccountCatalog()
+    magazines_collection = MagazineCatalog()
+    landmarks_collection = LandmarkCatalog()
+
+journal = None
+if settings.STORAGE_BACKEND != 'sqlite' and settings.PERSISTENCE_DIR:
+    from .internal.journal import Journal
+
+    journal = Journal(settings.PERSISTENCE_DIR, roadtrips_collection, accounts_collection,
+                      landmarks_collection, magazines_collection, settings.JOURNAL_FSYNC)
 
 fake_user = {
     "username": "1tpp",
-    "password": get_password_hash("1"),
+    "password": settings.SEED_USER_PASSWORD_HASH,
     "email": "1tpp@gmail.com"
 }
 
 fake_admin = {
     "username": "admin",
-    "password": get_password_hash("admin"),
+    "password": settings.SEED_ADMIN_PASSWORD_HASH,
     "email": "admin@gmail.com"
 }
 
 
-accounts_collection.add_account(User(**fake_user))
-accounts_collection.add_account(Admin(**fake_admin))
\ No newline at end of file
+def transaction():
+    '''
+    Scope for the changes of one request: a single SQLite transaction, or a
+    journal batch writing one record per changed entity
+    '''
+    if storage is not None:
+        return storage.write()
+    if journal is not None:
+        return journal.batch()
+    return nullcontext()
+
+
+def initialize():
+    '''Load persisted data and seed the demo accounts, run once at startup before any request'''
+    if journal is not None:
+        journal.open()
+
+    if not settings.SEED_ACCOUNTS:
+        return
+    # a persistent backend already holds the seed accounts after the first start,
+    # and with several workers the transaction keeps them from seeding twice
+    with transaction():
+        if accounts_collection.get_account_by_username(fake_user['username']) is None:
+            accounts_collection.add_account(User(**fake_user))
+        if accounts_collection.get_account_by_username(fake_admin['username']) is None:
+            accounts_collection.add_account(Admin(**fake_admin))
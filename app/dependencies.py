@@ -2,25 +2,43 @@ from typing import Annotated
 
 from fastapi import HTTPException, status, Depends, Header, HTTPException
 from fastapi.security import OAuth2PasswordBearer
-from jose import JWTError, jwt
 from pydantic import BaseModel
 
 from .internal.user import User
 from .internal.admin import Admin
 from .internal.account import Account
-from .databases import accounts_collection
+from .databases import accounts_collection, storage
 from .config import get_settings
+from .token_cache import TokenCache
 
 settings = get_settings()
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
+token_cache = TokenCache(settings.TOKEN_CACHE_SIZE)
+
 
 class TokenData(BaseModel):
     username: str | None = None
 
 
+def is_live_account(user: Account, username: str):
+    '''The account is still in the catalog, as that object, under that username'''
+    return accounts_collection.get_account_by_id(user.get_id()) is user and user.get_username() == username
+
+
 async def get_current_user(token: Annotated[str, Depends(oauth2_scheme)]):
+    cached = token_cache.get(token)
+    if cached is not None:
+        username, user = cached
+        if is_live_account(user, username):
+            return user
+        # removed or renamed since, the full check below decides
+        token_cache.discard(token)
+
+    # jose is slow to import, see warmup
+    from jose import JWTError, jwt
+
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -40,7 +58,10 @@ async def get_current_user(token: Annotated[str, Depends(oauth2_scheme)]):
     user = accounts_collection.get_account_by_username(username=token_data.username)
     if user is None:
         raise credentials_exception
-    
+
+    if isinstance(payload.get("exp"), (int, float)):
+        token_cache.put(token, payload["exp"], token_data.username, user)
+
     return user
 
 
@@ -48,4 +69,10 @@ async def check_admin_role(current_user = Depends(get_current_user)):
     if not isinstance(current_user, Admin):
         raise HTTPException(status_code=403, detail="Forbidden")
     
-    return current_user
\ No newline at end of file
+    return current_user
+
+
+async def sync_storage():
+    '''Drop entities other worker processes changed before the request reads them'''
+    if storage is not None:
+        storage.sync()
@@ -0,0 +1,42 @@
+import hashlib
+import uuid
+
+from fastapi import Request, Response, status
+
+from .databases import storage
+
+# In memory the version counters restart with the process, so tags carry a
+# per-boot prefix and never match a body served by an earlier process.
+BOOT_ID = uuid.uuid4().hex[:8]
+# A SQLite database assigns the versions in its rows for every worker sharing
+# it, so the prefix is the database's own id and a tag from one worker
+# matches on all.
+ETAG_PREFIX = storage.get_instance_id()[:8] if storage is not None else BOOT_ID
+
+
+def make_etag(*state):
+    '''Strong ETag for a response fully determined by `state` (ids, versions, query)'''
+    digest = hashlib.blake2b(repr(state).encode(), digest_size=8).hexdigest()
+    return f'"{ETAG_PREFIX}-{digest}"'
+
+
+def etag_headers(etag: str):
+    # clients must revalidate, the data is per user and changes often
+    return {
+        'ETag': etag,
+        'Cache-Control': 'private, no-cache'
+    }
+
+
+def etag_matches(request: Request, etag: str):
+    '''Weak comparison against If-None-Match, as RFC 9110 asks for GET'''
+    header = request.headers.get('if-none-match')
+    if not header:
+        return False
+    if header.strip() == '*':
+        return True
+    return any(tag.strip().removeprefix('W/') == etag for tag in header.split(','))
+
+
+def not_modified_response(etag: str):
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=etag_headers(etag))
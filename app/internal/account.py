@@ -1,14 +1,22 @@
-import uuid
+from .compact import new_id, pack_id, unpack_id
 
 class Account:
-    def __init__(self, email, username, password):
-        self.__id = str(uuid.uuid4())
+    __slots__ = ('__id', '__email', '__username', '__password', '__catalog', '__version', '__weakref__')
+
+    def __init__(self, email, username, password, id: str | None = None):
+        self.__id = pack_id(id) if id is not None else new_id()
         self.__email = email
         self.__username = username
         self.__password = password
+        self.__catalog = None # pointer to the catalog indexing this account
+        self.__version = 0 # bumped on every change, see bump_version
 
     # Getters
     def get_id(self):
+        return unpack_id(self.__id)
+
+    def get_key(self):
+        '''The compact id catalogs index by, see compact.pack_id'''
         return self.__id
 
     def get_email(self):
@@ -20,12 +28,38 @@ class Account:
     def get_password(self):
         return self.__password
 
+    def get_catalog(self):
+        return self.__catalog
+
+    def get_version(self):
+        return self.__version
+
     # Setters
     def set_email(self, email):
+        old_email = self.__email
         self.__email = email
+        if self.__catalog is not None:
+            self.__catalog.reindex_email(self, old_email)
+        self.bump_version()
 
     def set_username(self, username):
+        old_username = self.__username
         self.__username = username
+        if self.__catalog is not None:
+            self.__catalog.reindex_username(self, old_username)
+        self.bump_version()
 
     def set_password(self, password):
-        self.__password = password
\ No newline at end of file
+        self.__password = password
+        self.bump_version()
+
+    def set_catalog(self, catalog):
+        self.__catalog = catalog
+
+    def set_version(self, version: int):
+        self.__version = version
+
+    def bump_version(self):
+        self.__version += 1
+        if self.__catalog is not None:
+            self.__catalog.update_account(self)
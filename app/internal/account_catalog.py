@@ -1,27 +1,84 @@
+from .compact import pack_id
 from .user import User
 from .admin import Admin
+from .ordered_collection import OrderedCollection
+
+
+def normalize_email(email: str):
+    return email.strip().lower() if isinstance(email, str) else email
 
 
 class AccountCatalog:
     def __init__(self):
-        self.__users = []
+        self.__users = OrderedCollection()  # id -> account
+        self.__users_by_username = {}
+        self.__users_by_email = {}
+        self.__version = 0  # bumped whenever the catalog or one of its entities changes
+        self.__journal = None  # records every change when persistence is on, see Journal
 
     # Getters
     def get_accounts(self):
-        return self.__users
+        return self.__users.get_items()
+
+    def get_accounts_page(self, after: int, limit: int):
+        return self.__users.get_page(after, limit)
 
     def get_account_by_email(self, email: str):
-        return next((user for user in self.get_accounts() if user.get_email() == email), None)
+        return self.__users_by_email.get(normalize_email(email))
 
     def get_account_by_username(self, username: str):
-        return next((user for user in self.get_accounts() if user.get_username() == username), None)
+        return self.__users_by_username.get(username)
 
     def get_account_by_id(self, user_id: str):
-        return next((user for user in self.get_accounts() if user.get_id() == user_id), None)
+        return self.__users.get(pack_id(user_id))
+
+    def get_accounts_by_ids(self, user_ids: list):
+        '''The account of each id, None where there is none'''
+        return [self.__users.get(pack_id(user_id)) for user_id in user_ids]
+
+    def get_version(self):
+        return self.__version
 
     # Setters
     def add_account(self, user: User | Admin):
-        self.__users.append(user)
+        self.__users.add(user.get_key(), user)
+        self.__users_by_username[user.get_username()] = user
+        self.__users_by_email[normalize_email(user.get_email())] = user
+        user.set_catalog(self)
+        if self.__journal is not None:
+            self.__journal.put('account', user)
+        self.bump_version()
 
     def remove_account(self, user: User | Admin):
-        self.__users.remove(user)
\ No newline at end of file
+        self.__users.remove(user.get_key())
+        self.__unindex(self.__users_by_username, user.get_username(), user)
+        self.__unindex(self.__users_by_email, normalize_email(user.get_email()), user)
+        user.set_catalog(None)
+        if self.__journal is not None:
+            self.__journal.delete('account', user.get_id())
+        self.bump_version()
+
+    def update_account(self, user: User | Admin):
+        if self.__journal is not None:
+            self.__journal.put('account', user)
+        self.bump_version()
+
+    def set_journal(self, journal):
+        self.__journal = journal
+
+    def bump_version(self):
+        self.__version += 1
+
+    # Index maintenance, called by Account setters
+    def reindex_username(self, user: User | Admin, old_username: str):
+        self.__unindex(self.__users_by_username, old_username, user)
+        self.__users_by_username[user.get_username()] = user
+
+    def reindex_email(self, user: User | Admin, old_email: str):
+        self.__unindex(self.__users_by_email, normalize_email(old_email), user)
+        self.__users_by_email[normalize_email(user.get_email())] = user
+
+    # Utility methods
+    def __unindex(self, index: dict, key, user: User | Admin):
+        if index.get(key) is user:
+            del index[key]
@@ -1,4 +1,4 @@
 from .user import User
 
 class Admin(User):
-    pass
\ No newline at end of file
+    __slots__ = ()
@@ -0,0 +1,50 @@
+import struct
+import uuid
+from numbers import Real
+
+POSITION = struct.Struct('<2d')
+
+
+def new_id():
+    '''A random UUID in its 16 byte form'''
+    return uuid.uuid4().bytes
+
+
+def pack_id(entity_id):
+    '''
+    The compact key of an id: 16 bytes for a canonical UUID string, any
+    other id as is. Entities keep this form and catalogs index by it, the
+    string is rendered by unpack_id when it is read.
+    '''
+    if is_uuid(entity_id):
+        return uuid.UUID(entity_id).bytes
+    return entity_id
+
+
+def is_uuid(entity_id):
+    '''Whether the id is a canonical (lower case, hyphenated) UUID string'''
+    if not isinstance(entity_id, str) or len(entity_id) != 36:
+        return False
+    try:
+        return str(uuid.UUID(entity_id)) == entity_id
+    except ValueError:
+        return False
+
+
+def unpack_id(key):
+    if not isinstance(key, bytes):
+        return key
+    digits = key.hex()
+    return f'{digits[:8]}-{digits[8:12]}-{digits[12:16]}-{digits[16:20]}-{digits[20:]}'
+
+
+def pack_position(position):
+    '''`[lat, lon]` packed into 16 bytes, anything else is kept as given'''
+    if (isinstance(position, (list, tuple)) and len(position) == 2
+            and all(isinstance(value, Real) and not isinstance(value, bool) for value in position)):
+        return POSITION.pack(*position)
+    return position
+
+
+def unpack_position(packed):
+    return list(POSITION.unpack(packed)) if isinstance(packed, bytes) else packed
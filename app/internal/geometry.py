@@ -0,0 +1,135 @@
+import numpy as np
+
+from .spatial_index import EARTH_RADIUS_METERS, parse_position
+
+# WGS-84 ellipsoid
+WGS84_A = 6378137.0
+WGS84_F = 1 / 298.257223563
+WGS84_B = (1 - WGS84_F) * WGS84_A
+
+VINCENTY_MAX_ITERATIONS = 200
+VINCENTY_TOLERANCE = 1e-12
+
+
+def positions_array(waypoints: list):
+    '''`(n, 2)` array of waypoint `[lat, lon]` in degrees, NaN where a position is invalid'''
+    positions = np.full((len(waypoints), 2), np.nan)
+    for index, waypoint in enumerate(waypoints):
+        position = parse_position(waypoint.get_position())
+        if position is not None:
+            positions[index] = position
+    return positions
+
+
+def haversine_distances(lat1, lon1, lat2, lon2):
+    '''Great-circle distances in meters on the mean earth sphere, arguments in degrees'''
+    phi1, phi2 = np.radians(lat1), np.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = np.radians(lon2 - lon1)
+    a = np.sin(d_phi / 2) ** 2 + np.cos(phi1) * np.cos(phi2) * np.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_METERS * np.arcsin(np.minimum(1.0, np.sqrt(a)))
+
+
+def vincenty_distances(lat1, lon1, lat2, lon2):
+    '''
+    Geodesic distances in meters on the WGS-84 ellipsoid, arguments in
+    degrees. Pairs leave the iteration as soon as they converge, so a few
+    slow ones only iterate on themselves. Pairs that do not converge (nearly
+    antipodal points) fall back to haversine.
+    '''
+    lat1, lon1, lat2, lon2 = np.broadcast_arrays(*(np.asarray(value, dtype=float) for value in (lat1, lon1, lat2, lon2)))
+    shape = lat1.shape
+    L = np.radians(lon2 - lon1).ravel()
+    U1 = np.arctan((1 - WGS84_F) * np.tan(np.radians(lat1))).ravel()
+    U2 = np.arctan((1 - WGS84_F) * np.tan(np.radians(lat2))).ravel()
+
+    # results per pair, filled in when the pair converges
+    converged = np.zeros(L.size, dtype=bool)
+    sin_sigma, cos_sigma, sigma, cos2_alpha, cos_2sigma_m = (np.zeros(L.size) for _ in range(5))
+
+    # the pairs still iterating and their inputs
+    pending = np.arange(L.size)
+    L_, lam = L, L
+    sin_U1, cos_U1, sin_U2, cos_U2 = np.sin(U1), np.cos(U1), np.sin(U2), np.cos(U2)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        for _ in range(VINCENTY_MAX_ITERATIONS):
+            sin_lam, cos_lam = np.sin(lam), np.cos(lam)
+            sin_s = np.hypot(cos_U2 * sin_lam, cos_U1 * sin_U2 - sin_U1 * cos_U2 * cos_lam)
+            cos_s = sin_U1 * sin_U2 + cos_U1 * cos_U2 * cos_lam
+            s = np.arctan2(sin_s, cos_s)
+            # coincident points have sin_sigma 0, equatorial lines cos2_alpha 0
+            sin_a = np.where(sin_s == 0, 0.0, cos_U1 * cos_U2 * sin_lam / sin_s)
+            cos2_a = 1 - sin_a ** 2
+            cos_2s_m = np.where(cos2_a == 0, 0.0, cos_s - 2 * sin_U1 * sin_U2 / cos2_a)
+            C = WGS84_F / 16 * cos2_a * (4 + WGS84_F * (4 - 3 * cos2_a))
+            previous = lam
+            lam = L_ + (1 - C) * WGS84_F * sin_a * (
+                s + C * sin_s * (cos_2s_m + C * cos_s * (-1 + 2 * cos_2s_m ** 2)))
+            # NaN inputs (invalid positions) stop here too, their distance stays NaN
+            done = ~(np.abs(lam - previous) >= VINCENTY_TOLERANCE)
+
+            finished = pending[done]
+            converged[finished] = True
+            sin_sigma[finished], cos_sigma[finished], sigma[finished] = sin_s[done], cos_s[done], s[done]
+            cos2_alpha[finished], cos_2sigma_m[finished] = cos2_a[done], cos_2s_m[done]
+
+            left = ~done
+            pending = pending[left]
+            if not pending.size:
+                break
+            L_, lam = L_[left], lam[left]
+            sin_U1, cos_U1, sin_U2, cos_U2 = sin_U1[left], cos_U1[left], sin_U2[left], cos_U2[left]
+
+    u2 = cos2_alpha * (WGS84_A ** 2 - WGS84_B ** 2) / WGS84_B ** 2
+    A = 1 + u2 / 16384 * (4096 + u2 * (-768 + u2 * (320 - 175 * u2)))
+    B = u2 / 1024 * (256 + u2 * (-128 + u2 * (74 - 47 * u2)))
+    delta_sigma = B * sin_sigma * (cos_2sigma_m + B / 4 * (
+        cos_sigma * (-1 + 2 * cos_2sigma_m ** 2)
+        - B / 6 * cos_2sigma_m * (-3 + 4 * sin_sigma ** 2) * (-3 + 4 * cos_2sigma_m ** 2)))
+    distances = (WGS84_B * A * (sigma - delta_sigma)).reshape(shape)
+    return np.where(converged.reshape(shape), distances, haversine_distances(lat1, lon1, lat2, lon2))
+
+
+DISTANCE_METHODS = {
+    'haversine': haversine_distances,
+    'vincenty': vincenty_distances,
+}
+
+
+def distance_matrix(positions, method: str = 'vincenty'):
+    '''
+    `(n, n)` distances in meters between every pair of `(n, 2)` positions,
+    0 for pairs with an invalid position like legs in route_metrics_many
+    '''
+    lat, lon = positions[:, 0], positions[:, 1]
+    return np.nan_to_num(DISTANCE_METHODS[method](lat[:, None], lon[:, None], lat[None, :], lon[None, :]), nan=0.0)
+
+
+def route_metrics_many(waypoint_lists: list, speed: float, method: str = 'vincenty'):
+    '''
+    `(leg distances, total distance, total time)` of each waypoint list, in
+    meters and seconds at `speed` meters per second. The positions of all
+    lists are stacked into one array so every leg is computed in a single
+    vectorized call. A leg touching an invalid position counts as 0.
+    '''
+    sizes = np.array([len(waypoints) for waypoints in waypoint_lists], dtype=np.intp)
+    positions = positions_array([waypoint for waypoints in waypoint_lists for waypoint in waypoints])
+    if len(positions) < 2:
+        return [([], 0.0, 0.0) for _ in waypoint_lists]
+
+    legs = DISTANCE_METHODS[method](positions[:-1, 0], positions[:-1, 1], positions[1:, 0], positions[1:, 1])
+    legs = np.round(np.nan_to_num(legs, nan=0.0), 1)
+
+    metrics = []
+    start = 0
+    for size in sizes:
+        # the legs of a list are the pairs inside it, the pair across its end belongs to no route
+        route = legs[start:start + size - 1] if size > 1 else legs[:0]
+        total_distance = round(float(route.sum()), 1)
+        metrics.append((route.tolist(), total_distance, round(total_distance / speed, 1)))
+        start += size
+    return metrics
+
+
+def route_metrics(waypoints: list, speed: float, method: str = 'vincenty'):
+    return route_metrics_many([waypoints], speed, method)[0]
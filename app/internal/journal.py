@@ -0,0 +1,432 @@
+import glob
+import mmap
+import os
+import struct
+import threading
+from contextlib import contextmanager
+
+import orjson
+
+from .admin import Admin
+from .landmark import Landmark
+from .magazine import Magazine
+from .review import Review
+from .roadtrip import Roadtrip
+from .user import User
+from .waypoint import Waypoint
+
+# every file starts with a magic and the format version, records are JSON arrays
+FILE_HEADER = struct.Struct('<4sH')
+SNAPSHOT_MAGIC = b'RTSN'
+JOURNAL_MAGIC = b'RTJL'
+FORMAT_VERSION = 1
+RECORD_HEADER = struct.Struct('<I')  # byte length of the encoded record that follows
+
+SNAPSHOT_FILE = 'snapshot.bin'
+JOURNAL_PATTERN = 'journal-{:08d}.log'
+
+
+# Entity states, plain tuples written as JSON arrays
+def dump_favorite(landmark: Landmark):
+    return (landmark.get_id(), landmark.get_name(), landmark.get_amenity(), landmark.get_position(),
+            landmark.get_opening_hours())
+
+
+def dump_account(user: User | Admin):
+    return (user.get_id(), 'admin' if isinstance(user, Admin) else 'user', user.get_email(), user.get_username(),
+            user.get_password(), tuple(dump_favorite(landmark) for landmark in user.get_favorite_landmarks()),
+            user.get_version())
+
+
+def dump_magazine(magazine: Magazine):
+    return magazine.get_id(), magazine.get_title(), magazine.get_description(), magazine.get_version()
+
+
+def dump_landmark(landmark: Landmark):
+    return (landmark.get_id(), landmark.get_name(), landmark.get_amenity(), landmark.get_position(),
+            landmark.get_opening_hours(), landmark.get_version())
+
+
+def dump_review(landmark: Landmark, review: Review):
+    return (landmark.get_id(), review.get_id(), review.get_review_text(), review.get_reviewer(), review.get_rating(),
+            review.get_version())
+
+
+def dump_waypoint(waypoint: Waypoint):
+    return (waypoint.get_id(), waypoint.get_name(), waypoint.get_amenity(), waypoint.get_position(),
+            waypoint.get_opening_hours(), waypoint.get_note(), waypoint.get_description())
+
+
+def dump_roadtrip(roadtrip: Roadtrip):
+    return (roadtrip.get_id(), roadtrip.get_author(), roadtrip.get_title(), roadtrip.get_sub_title(),
+            roadtrip.get_description(), roadtrip.get_category(), roadtrip.get_summary(),
+            tuple(dump_waypoint(waypoint) for waypoint in roadtrip.get_waypoints()),
+            roadtrip.get_distance_between_waypoints(), roadtrip.get_total_distance(), roadtrip.get_total_time(),
+            tuple(magazine.get_id() for magazine in roadtrip.get_magazines()), roadtrip.get_version())
+
+
+def check_header(data, magic: bytes, path: str):
+    found_magic, version = FILE_HEADER.unpack_from(data, 0)
+    if found_magic != magic or version != FORMAT_VERSION:
+        raise ValueError(f"{path} is not a format {FORMAT_VERSION} {magic.decode()} file")
+
+
+DUMPERS = {
+    'account': dump_account,
+    'magazine': dump_magazine,
+    'landmark': dump_landmark,
+    'review': dump_review,
+    'roadtrip': dump_roadtrip,
+}
+
+
+class Journal:
+    '''
+    Persistence for the in-memory catalogs.
+
+    The catalogs report every change as a `(kind, op, state)` record that is
+    appended to the current journal file. A snapshot holds the full state as
+    of the start of its generation; on boot the snapshot is memory mapped
+    and loaded, and only the journals of that generation and later are
+    replayed. Writing a snapshot starts a new generation and deletes the
+    journals it made redundant.
+    '''
+
+    def __init__(self, directory: str, roadtrips, accounts, landmarks, magazines, fsync: bool = False):
+        self.__directory = directory
+        self.__roadtrips = roadtrips
+        self.__accounts = accounts
+        self.__landmarks = landmarks
+        self.__magazines = magazines
+        self.__fsync = fsync
+        self.__lock = threading.Lock()
+        self.__snapshot_lock = threading.Lock()  # one snapshot written at a time
+        self.__generation = 0
+        self.__snapshot_generation = 0  # generation of the snapshot on disk
+        self.__file = None
+        self.__record_count = 0  # records appended since the last snapshot
+        self.__batch = None  # key -> pending record while a batch is open, see batch
+
+        os.makedirs(directory, exist_ok=True)
+
+    # Getters
+    def get_generation(self):
+        return self.__generation
+
+    def get_record_count(self):
+        return self.__record_count
+
+    # Setters
+    def put(self, kind: str, *entities):
+        if not self.__hold(('put', kind, *map(id, entities)), (kind, 'put', entities)):
+            self.__append((kind, 'put', DUMPERS[kind](*entities)))
+
+    def put_many(self, kind: str, entities: list):
+        '''Append the states of many entities with a single write'''
+        if self.__batch is not None:
+            for entity in entities:
+                self.put(kind, entity)
+            return
+        dump = DUMPERS[kind]
+        self.__append_all([(kind, 'put', dump(entity)) for entity in entities])
+
+    def delete(self, kind: str, entity_id: str):
+        if not self.__hold(('delete', kind, entity_id), (kind, 'delete', entity_id)):
+            self.__append((kind, 'delete', entity_id))
+
+    # Utility methods
+    def open(self):
+        '''Load the latest snapshot, replay the journal tail and start recording'''
+        snapshot_path = os.path.join(self.__directory, SNAPSHOT_FILE)
+        if os.path.exists(snapshot_path) and os.path.getsize(snapshot_path) > 0:
+            with open(snapshot_path, 'rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                check_header(data, SNAPSHOT_MAGIC, snapshot_path)
+                snapshot = orjson.loads(data[FILE_HEADER.size:])
+            self.__generation = self.__snapshot_generation = snapshot['generation']
+            self.__load_snapshot(snapshot)
+
+        self.__record_count = 0
+        for generation, path in self.__journal_paths():
+            if generation >= self.__generation:
+                self.__record_count += self.__replay(path)
+                self.__generation = generation
+
+        self.__file = self.__open_journal(self.__generation)
+        for catalog in (self.__roadtrips, self.__accounts, self.__landmarks, self.__magazines):
+            catalog.set_journal(self)
+
+    @contextmanager
+    def batch(self):
+        '''
+        Hold the records of a block and append them when it ends, one per
+        entity with its final state, so an entity changed by several setters
+        is written once. Nested batches join the outermost one.
+        '''
+        if self.__batch is not None:
+            yield
+            return
+        self.__batch = {}
+        try:
+            yield
+        finally:
+            with self.__lock:
+                pending, self.__batch = self.__batch, None
+            self.__append_all([(kind, op, DUMPERS[kind](*payload) if op == 'put' else payload)
+                               for kind, op, payload in pending.values()])
+
+    def capture(self):
+        '''Copy the current state at once and switch appends to a new journal, see capture_pages'''
+        for state in self.capture_pages():
+            pass
+        return state
+
+    def capture_pages(self, page_size: int = 1000):
+        '''
+        Switch appends to a new journal, then copy the state one page of
+        entities at a time, yielding the state dict after each page so the
+        caller may let other work run in between. Changes made meanwhile go
+        to the new journal, which is replayed over the snapshot, so the copy
+        needs no pause. After the last page the state is complete and is
+        written with write_snapshot, possibly from another thread.
+        '''
+        with self.__lock:
+            self.__generation += 1
+            state = {'generation': self.__generation, 'magazines': [], 'landmarks': [], 'accounts': [], 'roadtrips': []}
+            self.__file.close()
+            self.__file = self.__open_journal(self.__generation)
+            self.__record_count = 0
+        yield state
+
+        sections = (
+            ('magazines', self.__magazines.get_magazines_page, dump_magazine),
+            ('landmarks', self.__landmarks.get_landmarks_page,
+             lambda landmark: (dump_landmark(landmark), [dump_review(landmark, review) for review in landmark.get_reviews()])),
+            ('accounts', self.__accounts.get_accounts_page, dump_account),
+            ('roadtrips', self.__roadtrips.get_roadtrips_page, dump_roadtrip),
+        )
+        for section, get_page, dump in sections:
+            after = 0
+            while after is not None:
+                entities, after = get_page(after, page_size)
+                state[section].extend(dump(entity) for entity in entities)
+                yield state
+
+    def write_snapshot(self, state: dict):
+        snapshot_path = os.path.join(self.__directory, SNAPSHOT_FILE)
+        temporary_path = snapshot_path + '.tmp'
+        with self.__snapshot_lock:
+            if state['generation'] <= self.__snapshot_generation:
+                return
+            with open(temporary_path, 'wb') as file:
+                file.write(FILE_HEADER.pack(SNAPSHOT_MAGIC, FORMAT_VERSION))
+                file.write(orjson.dumps(state))
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(temporary_path, snapshot_path)
+            self.__snapshot_generation = state['generation']
+            # compaction: everything before this generation now lives in the snapshot
+            for generation, path in self.__journal_paths():
+                if generation < state['generation']:
+                    os.remove(path)
+
+    def snapshot(self):
+        self.write_snapshot(self.capture())
+
+    def close(self):
+        self.snapshot()
+        with self.__lock:
+            self.__file.close()
+            self.__file = None
+        for catalog in (self.__roadtrips, self.__accounts, self.__landmarks, self.__magazines):
+            catalog.set_journal(None)
+
+    def __hold(self, key: tuple, record: tuple):
+        '''Keep a record for the open batch, if any, in place of an earlier one for the same entity'''
+        with self.__lock:
+            if self.__batch is None:
+                return False
+            # moved to the end, a put after a delete of the same id must replay after it
+            self.__batch.pop(key, None)
+            self.__batch[key] = record
+            return True
+
+    def __append(self, record: tuple):
+        self.__append_all([record])
+
+    def __append_all(self, records: list):
+        payloads = [orjson.dumps(record) for record in records]
+        data = b''.join(RECORD_HEADER.pack(len(payload)) + payload for payload in payloads)
+        with self.__lock:
+            self.__file.write(data)
+            self.__file.flush()
+            if self.__fsync:
+                os.fsync(self.__file.fileno())
+            self.__record_count += len(records)
+
+    def __journal_path(self, generation: int):
+        return os.path.join(self.__directory, JOURNAL_PATTERN.format(generation))
+
+    def __open_journal(self, generation: int):
+        file = open(self.__journal_path(generation), 'ab')
+        if file.tell() == 0:
+            file.write(FILE_HEADER.pack(JOURNAL_MAGIC, FORMAT_VERSION))
+            file.flush()
+        return file
+
+    def __journal_paths(self):
+        paths = glob.glob(os.path.join(self.__directory, JOURNAL_PATTERN.replace('{:08d}', '*')))
+        return sorted((int(os.path.basename(path)[8:-4]), path) for path in paths)
+
+    def __replay(self, path: str):
+        '''Apply the records of a journal file, returns how many there were'''
+        size = os.path.getsize(path)
+        if size < FILE_HEADER.size:
+            # created but its header never fully written, rewritten on open
+            os.truncate(path, 0)
+            return 0
+        offset = FILE_HEADER.size
+        count = 0
+        with open(path, 'rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            check_header(data, JOURNAL_MAGIC, path)
+            while offset + RECORD_HEADER.size <= size:
+                (length,) = RECORD_HEADER.unpack_from(data, offset)
+                end = offset + RECORD_HEADER.size + length
+                if end > size:
+                    break
+                self.__apply(*orjson.loads(data[offset + RECORD_HEADER.size:end]))
+                offset = end
+                count += 1
+        if offset < size:
+            # drop a record torn by a crash mid-append
+            os.truncate(path, offset)
+        return count
+
+    def __load_snapshot(self, snapshot: dict):
+        for state in snapshot['magazines']:
+            self.__put_magazine(state)
+        for landmark_state, review_states in snapshot['landmarks']:
+            self.__put_landmark(landmark_state)
+            for review_state in review_states:
+                self.__put_review(review_state)
+        for state in snapshot['accounts']:
+            self.__put_account(state)
+        for state in snapshot['roadtrips']:
+            self.__put_roadtrip(state)
+
+    def __apply(self, kind: str, op: str, payload):
+        if op == 'put':
+            {
+                'account': self.__put_account,
+                'magazine': self.__put_magazine,
+                'landmark': self.__put_landmark,
+                'review': self.__put_review,
+                'roadtrip': self.__put_roadtrip,
+            }[kind](payload)
+        elif kind == 'account':
+            user = self.__accounts.get_account_by_id(payload)
+            if user is not None:
+                self.__accounts.remove_account(user)
+        elif kind == 'magazine':
+            magazine = self.__magazines.get_magazine_by_id(payload)
+            if magazine is not None:
+                self.__magazines.remove_magazine(magazine)
+        elif kind == 'landmark':
+            landmark = self.__landmarks.get_landmark_by_id(payload)
+            if landmark is not None:
+                self.__landmarks.remove_landmark(landmark)
+        elif kind == 'review':
+            landmark = self.__landmarks.get_landmark_by_review_id(payload)
+            if landmark is not None:
+                landmark.remove_review(landmark.get_review_by_id(payload))
+        elif kind == 'roadtrip':
+            roadtrip = self.__roadtrips.get_roadtrip_by_id(payload)
+            if roadtrip is not None:
+                self.__roadtrips.remove_roadtrip(roadtrip)
+
+    # Replaying a put updates the entity in place, keeping its list position
+    def __put_account(self, state: tuple):
+        user_id, kind, email, username, password, favorites, version = state
+        user = self.__accounts.get_account_by_id(user_id)
+        if user is None:
+            user = (Admin if kind == 'admin' else User)(email, username, password, user_id)
+            self.__accounts.add_account(user)
+        else:
+            if user.get_email() != email:
+                user.set_email(email)
+            if user.get_username() != username:
+                user.set_username(username)
+            if user.get_password() != password:
+                user.set_password(password)
+        favorite_ids = {favorite[0] for favorite in favorites}
+        for landmark in user.get_favorite_landmarks():
+            if landmark.get_id() not in favorite_ids:
+                user.remove_favorite_landmark(landmark)
+        for favorite in favorites:
+            if user.get_favorite_landmark_by_id(favorite[0]) is None:
+                landmark = self.__landmarks.get_landmark_by_id(favorite[0]) or Landmark(*favorite)
+                user.add_favorite_landmark(landmark)
+        user.set_version(version)
+
+    def __put_magazine(self, state: tuple):
+        magazine_id, title, description, version = state
+        magazine = self.__magazines.get_magazine_by_id(magazine_id)
+        if magazine is None:
+            magazine = Magazine(title, description, magazine_id)
+            self.__magazines.add_magazine(magazine)
+        else:
+            magazine.set_title(title)
+            magazine.set_description(description)
+        magazine.set_version(version)
+
+    def __put_landmark(self, state: tuple):
+        *fields, version = state
+        landmark = self.__landmarks.get_landmark_by_id(fields[0])
+        if landmark is None:
+            landmark = Landmark(*fields)
+            self.__landmarks.add_landmark(landmark)
+        landmark.set_version(version)
+
+    def __put_review(self, state: tuple):
+        landmark_id, review_id, review_text, reviewer, rating, version = state
+        landmark = self.__landmarks.get_landmark_by_id(landmark_id)
+        if landmark is None:
+            return
+        review = landmark.get_review_by_id(review_id)
+        if review is None:
+            review = Review(review_text, reviewer, rating, review_id)
+            landmark.add_review(review)
+        else:
+            review.set_review_text(review_text)
+            if review.get_reviewer() != reviewer:
+                review.set_reviewer(reviewer)
+            if review.get_rating() != rating:
+                review.set_rating(rating)
+        review.set_version(version)
+
+    def __put_roadtrip(self, state: tuple):
+        (roadtrip_id, author, title, sub_title, description, category, summary, waypoints,
+         distance_between_waypoints, total_distance, total_time, magazine_ids, version) = state
+        roadtrip = self.__roadtrips.get_roadtrip_by_id(roadtrip_id)
+        is_new = roadtrip is None
+        if is_new:
+            roadtrip = Roadtrip(author, roadtrip_id)
+        roadtrip.set_title(title)
+        roadtrip.set_sub_title(sub_title)
+        roadtrip.set_description(description)
+        if roadtrip.get_category() != category:
+            roadtrip.set_category(category)
+        roadtrip.set_summary(summary)
+        roadtrip.set_waypoints([Waypoint(*waypoint) for waypoint in waypoints])
+        roadtrip.set_distance_between_waypoints(distance_between_waypoints)
+        roadtrip.set_total_distance(total_distance)
+        roadtrip.set_total_time(total_time)
+        for magazine in roadtrip.get_magazines():
+            if magazine.get_id() not in magazine_ids:
+                roadtrip.remove_magazine(magazine)
+        for magazine_id in magazine_ids:
+            magazine = self.__magazines.get_magazine_by_id(magazine_id)
+            if magazine is not None and roadtrip.get_magazine_by_id(magazine_id) is None:
+                roadtrip.add_magazine(magazine)
+        if is_new:
+            self.__roadtrips.add_roadtrip(roadtrip)
+        roadtrip.set_version(version)
@@ -1,17 +1,48 @@
+import math
+from numbers import Real
+
+from .compact import pack_id, pack_position, unpack_id, unpack_position
 from .review import Review
 
+STARS = range(1, 6)
+
+
+def rating_star(rating):
+    '''The 1-5 histogram bucket of a rating, or None for a missing or non-finite rating'''
+    if not isinstance(rating, Real) or isinstance(rating, bool) or not math.isfinite(rating):
+        return None
+    return min(max(round(rating), STARS[0]), STARS[-1])
+
 
 class Landmark:
+    __slots__ = ('__id', '__name', '__amenity', '__position', '__opening_hours', '__reviews',
+                 '__reviews_by_reviewer', '__catalog', '__rating_count', '__rating_sum',
+                 '__rating_histogram', '__version', '__weakref__')
+
+    # shared until the first review, most landmarks and every waypoint never get one
+    NO_REVIEWS = {}
+    NO_RATINGS = (0,) * len(STARS)
+
     def __init__(self, id: str, name: str, amenity: str, position: list, opening_hours: str):
-        self.__id = id
+        self.__id = pack_id(id)
         self.__name = name
         self.__amenity = amenity
-        self.__position = position
+        self.__position = pack_position(position) # 16 bytes, see compact.pack_position
         self.__opening_hours = opening_hours
-        self.__reviews = list()
+        self.__reviews = self.NO_REVIEWS # review key -> review, keeps insertion order
+        self.__reviews_by_reviewer = self.NO_REVIEWS
+        self.__catalog = None # pointer to the catalog indexing this landmark
+        self.__rating_count = 0
+        self.__rating_sum = 0
+        self.__rating_histogram = self.NO_RATINGS
+        self.__version = 0 # bumped on every change, see bump_version
 
     # Getters
     def get_id(self):
+        return unpack_id(self.__id)
+
+    def get_key(self):
+        '''The compact id catalogs index by, see compact.pack_id'''
         return self.__id
 
     def get_name(self):
@@ -21,26 +52,102 @@ class Landmark:
         return self.__amenity
 
     def get_position(self):
-        return self.__position
+        return unpack_position(self.__position)
 
     def get_opening_hours(self):
         return self.__opening_hours
 
     def get_reviews(self):
-        return self.__reviews
+        return list(self.__reviews.values())
 
     def get_review_by_id(self, review_id: str):
-        return next((review for review in self.__reviews if review.get_id() == review_id), None)
+        return self.__reviews.get(pack_id(review_id))
 
     def get_review_by_username(self, username: str):
-        return next((review for review in self.__reviews if review.get_reviewer() == username), None)
+        return self.__reviews_by_reviewer.get(username)
+
+    def get_catalog(self):
+        return self.__catalog
 
     def get_average_rating(self):
-        return sum([review.get_rating() for review in self.__reviews]) / len(self.__reviews) if len(self.__reviews) > 0 else 0
+        return self.__rating_sum / self.__rating_count if self.__rating_count > 0 else 0
+
+    def get_rating_count(self):
+        return self.__rating_count
+
+    def get_rating_histogram(self):
+        return dict(zip(STARS, self.__rating_histogram))
+
+    def get_version(self):
+        return self.__version
 
     # Setters
     def add_review(self, review: Review):
-        self.__reviews.append(review)
+        # the rating is counted first, so nothing is stored if it cannot be
+        self.__add_rating(review.get_rating())
+        if self.__reviews is self.NO_REVIEWS:
+            self.__reviews, self.__reviews_by_reviewer = {}, {}
+        self.__reviews[review.get_key()] = review
+        self.__reviews_by_reviewer[review.get_reviewer()] = review
+        review.set_landmark(self)
+        if self.__catalog is not None:
+            self.__catalog.index_review(self, review)
+        self.bump_version()
 
     def remove_review(self, review: Review):
-        self.__reviews.remove(review)
+        del self.__reviews[review.get_key()]
+        if self.__reviews_by_reviewer.get(review.get_reviewer()) is review:
+            del self.__reviews_by_reviewer[review.get_reviewer()]
+        review.set_landmark(None)
+        self.__remove_rating(review.get_rating())
+        if self.__catalog is not None:
+            self.__catalog.unindex_review(review)
+        self.bump_version()
+
+    def set_catalog(self, catalog):
+        self.__catalog = catalog
+
+    def set_version(self, version: int):
+        self.__version = version
+
+    def bump_version(self):
+        self.__version += 1
+        if self.__catalog is not None:
+            self.__catalog.update_landmark(self)
+
+    # Index maintenance, called by Review setters
+    def reindex_reviewer(self, review: Review, old_reviewer: str):
+        if self.__reviews_by_reviewer.get(old_reviewer) is review:
+            del self.__reviews_by_reviewer[old_reviewer]
+        self.__reviews_by_reviewer[review.get_reviewer()] = review
+        if self.__catalog is not None:
+            self.__catalog.reindex_reviewer(self, review, old_reviewer)
+
+    def rerate_review(self, review: Review, old_rating: float):
+        self.__remove_rating(old_rating)
+        self.__add_rating(review.get_rating())
+
+    def update_review(self, review: Review):
+        if self.__catalog is not None:
+            self.__catalog.update_review(self, review)
+        # the landmark embeds its reviews, so it changes with them
+        self.bump_version()
+
+    # Utility methods
+    def __add_rating(self, rating: float):
+        star = rating_star(rating)
+        if star is None:
+            return
+        if self.__rating_histogram is self.NO_RATINGS:
+            self.__rating_histogram = list(self.NO_RATINGS)
+        self.__rating_count += 1
+        self.__rating_sum += rating
+        self.__rating_histogram[star - 1] += 1
+
+    def __remove_rating(self, rating: float):
+        star = rating_star(rating)
+        if star is None:
+            return
+        self.__rating_count -= 1
+        self.__rating_sum = self.__rating_sum - rating if self.__rating_count > 0 else 0
+        self.__rating_histogram[star - 1] -= 1
@@ -1,23 +1,145 @@
+from itertools import count
+
+from .compact import pack_id
 from .landmark import Landmark
+from .ordered_collection import OrderedCollection
+from .spatial_index import GeoGrid, parse_position
 
 
 class LandmarkCatalog:
     def __init__(self):
-        self.__landmarks = []
+        self.__landmarks = OrderedCollection()  # key -> landmark, see compact.pack_id
+        self.__spatial_index = GeoGrid()
+        self.__reviews = OrderedCollection()  # review key -> review, which points to its landmark
+        self.__reviews_by_reviewer = {}  # reviewer -> OrderedCollection of reviews
+        self.__bucket_sequence = count(1)  # shared by the reviewer buckets, see OrderedCollection
+        self.__version = 0  # bumped whenever the catalog or one of its entities changes
+        self.__journal = None  # records every change when persistence is on, see Journal
 
     # Getters
     def get_landmarks(self):
-        return self.__landmarks
+        return self.__landmarks.get_items()
+
+    def get_landmarks_page(self, after: int, limit: int):
+        return self.__landmarks.get_page(after, limit)
 
     def get_landmark_by_id(self, landmark_id: str):
-        return next((landmark for landmark in self.__landmarks if landmark.get_id() == landmark_id), None)
+        return self.__landmarks.get(pack_id(landmark_id))
+
+    def get_landmarks_by_ids(self, landmark_ids: list):
+        '''The landmark of each id, None where there is none'''
+        return [self.__landmarks.get(pack_id(landmark_id)) for landmark_id in landmark_ids]
 
     def get_landmark_by_review_id(self, review_id: str):
-        return next((landmark for landmark in self.__landmarks if landmark.get_review_by_id(review_id) is not None), None)
+        review = self.__reviews.get(pack_id(review_id))
+        return review.get_landmark() if review is not None else None
+
+    def get_review_by_id(self, review_id: str):
+        return self.__reviews.get(pack_id(review_id))
+
+    def get_reviews_page(self, after: int, limit: int):
+        '''Page of `(landmark, review)` pairs across every landmark'''
+        return self.__with_landmarks(*self.__reviews.get_page(after, limit))
+
+    def get_reviews_by_reviewer_page(self, reviewer: str, after: int, limit: int):
+        '''Page of `(landmark, review)` pairs written by one reviewer'''
+        bucket = self.__reviews_by_reviewer.get(reviewer)
+        return self.__with_landmarks(*bucket.get_page(after, limit)) if bucket is not None else ([], None)
+
+    def get_nearby_landmarks(self, lat: float, lon: float, radius: float, limit: int):
+        '''
+        Landmarks within `radius` meters of the point, closest first,
+        as `(distance, landmark)` pairs
+        '''
+        return self.__spatial_index.nearest(lat, lon, radius, limit)
+
+    def get_version(self):
+        return self.__version
 
     # Setters
     def add_landmark(self, landmark: Landmark):
-        self.__landmarks.append(landmark)
+        self.__landmarks.add(landmark.get_key(), landmark)
+        if self.__journal is not None:
+            # before its reviews, which replay into the landmark
+            self.__journal.put('landmark', landmark)
+        self.__index_landmark(landmark)
+        self.bump_version()
+
+    def add_landmarks(self, landmarks: list):
+        '''Add many new landmarks as a single change'''
+        for landmark in landmarks:
+            self.__landmarks.add(landmark.get_key(), landmark)
+        if self.__journal is not None:
+            self.__journal.put_many('landmark', landmarks)
+        for landmark in landmarks:
+            self.__index_landmark(landmark)
+        self.bump_version()
 
     def remove_landmark(self, landmark: Landmark):
-        self.__landmarks.remove(landmark)
+        self.__landmarks.remove(landmark.get_key())
+        self.__spatial_index.remove(landmark.get_key())
+        for review in landmark.get_reviews():
+            self.unindex_review(review)
+        landmark.set_catalog(None)
+        if self.__journal is not None:
+            self.__journal.delete('landmark', landmark.get_id())
+        self.bump_version()
+
+    def update_landmark(self, landmark: Landmark):
+        if self.__journal is not None:
+            self.__journal.put('landmark', landmark)
+        self.bump_version()
+
+    def set_journal(self, journal):
+        self.__journal = journal
+
+    def bump_version(self):
+        self.__version += 1
+
+    # Index maintenance, called by Landmark setters
+    def index_review(self, landmark: Landmark, review):
+        self.__reviews.add(review.get_key(), review)
+        self.__index_reviewer(review.get_reviewer(), review)
+        if self.__journal is not None:
+            self.__journal.put('review', landmark, review)
+
+    def unindex_review(self, review):
+        self.__reviews.discard(review.get_key())
+        self.__unindex_reviewer(review.get_reviewer(), review)
+        if self.__journal is not None:
+            self.__journal.delete('review', review.get_id())
+
+    def reindex_reviewer(self, landmark: Landmark, review, old_reviewer: str):
+        self.__unindex_reviewer(old_reviewer, review)
+        self.__index_reviewer(review.get_reviewer(), review)
+
+    def update_review(self, landmark: Landmark, review):
+        # reviews live inside their landmark, update_landmark follows
+        if self.__journal is not None:
+            self.__journal.put('review', landmark, review)
+
+    # Utility methods
+    def __with_landmarks(self, reviews: list, next_position: int | None):
+        return [(review.get_landmark(), review) for review in reviews], next_position
+
+    def __index_landmark(self, landmark: Landmark):
+        position = parse_position(landmark.get_position())
+        if position is not None:
+            self.__spatial_index.insert(landmark.get_key(), *position, landmark)
+        for review in landmark.get_reviews():
+            self.index_review(landmark, review)
+        landmark.set_catalog(self)
+
+    def __index_reviewer(self, reviewer: str, review):
+        bucket = self.__reviews_by_reviewer.get(reviewer)
+        if bucket is None:
+            bucket = self.__reviews_by_reviewer[reviewer] = OrderedCollection(self.__bucket_sequence)
+        bucket.add(review.get_key(), review)
+
+    def __unindex_reviewer(self, reviewer: str, review):
+        bucket = self.__reviews_by_reviewer.get(reviewer)
+        if bucket is None:
+            return
+        bucket.discard(review.get_key())
+        if not len(bucket):
+            del self.__reviews_by_reviewer[reviewer]
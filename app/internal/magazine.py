@@ -1,10 +1,14 @@
-import uuid
+from .compact import new_id, pack_id, unpack_id
 
 class Magazine:
-    def __init__(self, title, description):
-        self.__id = str(uuid.uuid4())
+    __slots__ = ('__id', '__title', '__description', '__version', '__catalog', '__weakref__')
+
+    def __init__(self, title, description, id: str | None = None):
+        self.__id = pack_id(id) if id is not None else new_id()
         self.__title = title
         self.__description = description
+        self.__version = 0 # bumped on every change, see bump_version
+        self.__catalog = None # pointer to the catalog holding this magazine
 
     # Getters
     def get_title(self):
@@ -14,11 +18,34 @@ class Magazine:
         return self.__description
 
     def get_id(self):
+        return unpack_id(self.__id)
+
+    def get_key(self):
+        '''The compact id catalogs index by, see compact.pack_id'''
         return self.__id
 
+    def get_version(self):
+        return self.__version
+
+    def get_catalog(self):
+        return self.__catalog
+
     # Setters
     def set_title(self, title: str):
         self.__title = title
+        self.bump_version()
 
     def set_description(self, text: str):
-        self.__description = text
\ No newline at end of file
+        self.__description = text
+        self.bump_version()
+
+    def set_catalog(self, catalog):
+        self.__catalog = catalog
+
+    def set_version(self, version: int):
+        self.__version = version
+
+    def bump_version(self):
+        self.__version += 1
+        if self.__catalog is not None:
+            self.__catalog.update_magazine(self)
@@ -1,19 +1,48 @@
+from app.internal.compact import pack_id
 from app.internal.magazine import Magazine
+from app.internal.ordered_collection import OrderedCollection
 
 class MagazineCatalog:
     def __init__(self):
-        self.__magazines = []
+        self.__magazines = OrderedCollection()  # id -> magazine
+        self.__version = 0  # bumped whenever the catalog or one of its entities changes
+        self.__journal = None  # records every change when persistence is on, see Journal
 
     # Getters
     def get_magazines(self):
-        return self.__magazines
+        return self.__magazines.get_items()
+
+    def get_magazines_page(self, after: int, limit: int):
+        return self.__magazines.get_page(after, limit)
 
     def get_magazine_by_id(self, magazine_id: str):
-        return next((magazine for magazine in self.__magazines if magazine.get_id() == magazine_id), None)
+        return self.__magazines.get(pack_id(magazine_id))
+
+    def get_version(self):
+        return self.__version
 
     # Setters
     def add_magazine(self, new_magazine: Magazine):
-        self.__magazines.append(new_magazine)
+        self.__magazines.add(new_magazine.get_key(), new_magazine)
+        new_magazine.set_catalog(self)
+        if self.__journal is not None:
+            self.__journal.put('magazine', new_magazine)
+        self.bump_version()
 
     def remove_magazine(self, magazine: Magazine):
-        self.__magazines.remove(magazine)
+        self.__magazines.remove(magazine.get_key())
+        magazine.set_catalog(None)
+        if self.__journal is not None:
+            self.__journal.delete('magazine', magazine.get_id())
+        self.bump_version()
+
+    def update_magazine(self, magazine: Magazine):
+        if self.__journal is not None:
+            self.__journal.put('magazine', magazine)
+        self.bump_version()
+
+    def set_journal(self, journal):
+        self.__journal = journal
+
+    def bump_version(self):
+        self.__version += 1
@@ -0,0 +1,88 @@
+from bisect import bisect_right
+from itertools import count
+
+
+class OrderedCollection:
+    '''
+    Keyed items kept in insertion order, pageable by sequence number.
+
+    Every item gets an increasing sequence number when it is added. A page
+    starts right after a given sequence number, so paging stays stable while
+    items are added or removed, and costs time in proportion to the page.
+
+    Collections that come and go under one index (e.g. per-author buckets)
+    can share a `sequence` counter, so a recreated collection never hands
+    out a sequence number that an old cursor already points past.
+    '''
+
+    def __init__(self, sequence=None):
+        self.__positions = {}  # key -> position in entries
+        self.__entries = []  # (key, item), None where an item was removed
+        self.__sequences = []  # sequence number of each entry, ascending
+        self.__sequence = sequence if sequence is not None else count(1)
+        self.__removed = 0
+
+    def __len__(self):
+        return len(self.__positions)
+
+    def __contains__(self, key):
+        return key in self.__positions
+
+    def __iter__(self):
+        return (entry[1] for entry in self.__entries if entry is not None)
+
+    # Getters
+    def get(self, key, default=None):
+        position = self.__positions.get(key)
+        return default if position is None else self.__entries[position][1]
+
+    def get_items(self):
+        return list(self)
+
+    def get_page(self, after: int, limit: int):
+        '''
+        Return up to `limit` items added after sequence number `after`, and
+        the sequence number to continue from, or None on the last page
+        '''
+        position = bisect_right(self.__sequences, after)
+        items = []
+        last_sequence = None
+        while position < len(self.__entries):
+            entry = self.__entries[position]
+            if entry is not None:
+                if len(items) == limit:
+                    return items, last_sequence
+                items.append(entry[1])
+                last_sequence = self.__sequences[position]
+            position += 1
+        return items, None
+
+    # Setters
+    def add(self, key, item):
+        position = self.__positions.get(key)
+        if position is not None:
+            # replacing an item keeps its place in the order
+            self.__entries[position] = (key, item)
+            return
+        self.__positions[key] = len(self.__entries)
+        self.__entries.append((key, item))
+        self.__sequences.append(next(self.__sequence))
+
+    def remove(self, key):
+        position = self.__positions.pop(key)
+        self.__entries[position] = None
+        self.__removed += 1
+        if self.__removed > len(self.__positions):
+            self.__compact()
+
+    def discard(self, key):
+        if key in self.__positions:
+            self.remove(key)
+
+    # Utility methods
+    def __compact(self):
+        kept = [position for position, entry in enumerate(self.__entries) if entry is not None]
+        self.__entries = [self.__entries[position] for position in kept]
+        self.__sequences = [self.__sequences[position] for position in kept]
+        self.__positions = {entry[0]: position for position, entry in enumerate(self.__entries)}
+        self.__removed = 0
@@ -1,15 +1,23 @@
-import uuid
+from .compact import new_id, pack_id, unpack_id
 
 class Review:
-    def __init__(self, review_text:str , reviewer:str, rating: float):
-        self.__id = str(uuid.uuid4())
+    __slots__ = ('__id', '__review_text', '__reviewer', '__rating', '__landmark', '__version', '__weakref__')
+
+    def __init__(self, review_text:str , reviewer:str, rating: float, id: str | None = None):
+        self.__id = pack_id(id) if id is not None else new_id()
         self.__review_text = review_text
         self.__reviewer = reviewer
         self.__rating = rating
+        self.__landmark = None # pointer to the landmark holding this review
+        self.__version = 0 # bumped on every change, see bump_version
 
     # Getters
     def get_id(self):
-        return self.__id 
+        return unpack_id(self.__id)
+
+    def get_key(self):
+        '''The compact id reviews are indexed by, see compact.pack_id'''
+        return self.__id
     
     def get_review_text(self):
         return self.__review_text
@@ -19,13 +27,39 @@ class Review:
     
     def get_rating(self):
         return self.__rating
+
+    def get_landmark(self):
+        return self.__landmark
+
+    def get_version(self):
+        return self.__version
     
     # Setters
     def set_review_text(self, text: str):
         self.__review_text = text 
+        self.bump_version()
 
     def set_reviewer(self, reviewer: str):
+        old_reviewer = self.__reviewer
         self.__reviewer = reviewer
+        if self.__landmark is not None:
+            self.__landmark.reindex_reviewer(self, old_reviewer)
+        self.bump_version()
     
     def set_rating(self, rating: float):
-        self.__rating = rating  
\ No newline at end of file
+        old_rating = self.__rating
+        self.__rating = rating
+        if self.__landmark is not None:
+            self.__landmark.rerate_review(self, old_rating)
+        self.bump_version()
+
+    def set_landmark(self, landmark):
+        self.__landmark = landmark
+
+    def set_version(self, version: int):
+        self.__version = version
+
+    def bump_version(self):
+        self.__version += 1
+        if self.__landmark is not None:
+            self.__landmark.update_review(self)
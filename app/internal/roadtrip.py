@@ -1,13 +1,19 @@
 from .waypoint import Waypoint
 from .magazine import Magazine
-import uuid
+from .compact import new_id, pack_id, unpack_id
 
 
 class Roadtrip:
     '''A roadtrip is a collection of waypoints'''
 
-    def __init__(self, author: str):
-        self.__id = str(uuid.uuid4())
+    __slots__ = ('__id', '__author', '__title', '__sub_title', '__description', '__waypoints',
+                 '__distance_between_waypoints', '__total_distance', '__total_time', '__magazines',
+                 '__category', '__summary', '__catalog', '__version', '__weakref__')
+
+    NO_MAGAZINES = {}  # shared until the first magazine, most roadtrips are in none
+
+    def __init__(self, author: str, id: str | None = None):
+        self.__id = pack_id(id) if id is not None else new_id()
         self.__author = author
         self.__title = ''
         self.__sub_title = ''
@@ -16,12 +22,18 @@ class Roadtrip:
         self.__distance_between_waypoints = list()
         self.__total_distance = 0
         self.__total_time = 0
-        self.__magazines = list() # pointer to magazines
+        self.__magazines = self.NO_MAGAZINES # pointer to magazines, keyed by magazine key
         self.__category = ''
         self.__summary = ''
+        self.__catalog = None # pointer to the catalog indexing this roadtrip
+        self.__version = 0 # bumped on every change, see bump_version
 
     # Getters
     def get_id(self):
+        return unpack_id(self.__id)
+
+    def get_key(self):
+        '''The compact id catalogs index by, see compact.pack_id'''
         return self.__id
 
     def get_waypoints(self):
@@ -55,42 +67,90 @@ class Roadtrip:
         return self.__summary
 
     def get_magazines(self):
-        return self.__magazines
+        return list(self.__magazines.values())
+
+    def get_catalog(self):
+        return self.__catalog
+
+    def get_version(self):
+        return self.__version
 
     # Setters
     def set_title(self, title: str):
         self.__title = title
+        if self.__catalog is not None:
+            self.__catalog.reindex_search(self)
+        self.bump_version()
 
     def set_sub_title(self, sub_title: str):
         self.__sub_title = sub_title
+        self.bump_version()
 
     def set_description(self, description: str):
         self.__description = description
+        self.bump_version()
 
     def set_waypoints(self, waypoints: list):
         self.__waypoints = waypoints
+        if self.__catalog is not None:
+            self.__catalog.reindex_search(self)
+        self.bump_version()
 
     def set_distance_between_waypoints(self, distance_between_waypoints: list):
         self.__distance_between_waypoints = distance_between_waypoints
+        self.bump_version()
 
     def set_total_distance(self, total_distance: int):
         self.__total_distance = total_distance
+        self.bump_version()
 
     def set_total_time(self, total_time: int):
         self.__total_time = total_time
+        self.bump_version()
+
+    def set_route(self, distance_between_waypoints: list, total_distance: float, total_time: float):
+        '''Set the leg distances and totals together, as a single change'''
+        self.__distance_between_waypoints = distance_between_waypoints
+        self.__total_distance = total_distance
+        self.__total_time = total_time
+        self.bump_version()
 
     def set_category(self, category: str):
+        old_category = self.__category
         self.__category = category
+        if self.__catalog is not None:
+            self.__catalog.reindex_category(self, old_category)
+        self.bump_version()
 
     def set_summary(self, summary: str):
         self.__summary = summary
+        self.bump_version()
 
     def add_magazine(self, magazine: Magazine):
-        self.__magazines.append(magazine)
+        if self.__magazines is self.NO_MAGAZINES:
+            self.__magazines = {}
+        self.__magazines[magazine.get_key()] = magazine
+        if self.__catalog is not None:
+            self.__catalog.index_magazine(self, magazine.get_id())
+        self.bump_version()
 
     def remove_magazine(self, magazine: Magazine):
-        self.__magazines.remove(magazine)
+        del self.__magazines[magazine.get_key()]
+        if self.__catalog is not None:
+            self.__catalog.unindex_magazine(self, magazine.get_id())
+        self.bump_version()
+
+    def set_catalog(self, catalog):
+        self.__catalog = catalog
+
+    def set_version(self, version: int):
+        self.__version = version
+
+    def bump_version(self):
+        self.__version += 1
+        if self.__catalog is not None:
+            self.__catalog.update_roadtrip(self)
 
     # Utility methods
     def get_magazine_by_id(self, magazine_id: str):
-        return next((magazine for magazine in self.__magazines if magazine.get_id() == magazine_id), None)
\ No newline at end of file
+        return self.__magazines.get(pack_id(magazine_id))
@@ -1,40 +1,149 @@
-import re
+from itertools import count
+
+from .compact import pack_id
+from .search_index import SearchIndex
+from .ordered_collection import OrderedCollection
 
 
 class RoadtripCatalog:
+    EMPTY_BUCKET = OrderedCollection()
+    SEARCH_FIELD_WEIGHTS = {
+        'title': 3.0,
+        'category': 2.0,
+        'author': 1.5,
+        'waypoints': 1.0,
+    }
+
     def __init__(self):
-        self.__roadtrips = []
+        self.__roadtrips = OrderedCollection()  # key -> roadtrip, see compact.pack_id
+        self.__roadtrips_by_author = {}  # author -> OrderedCollection of roadtrips
+        self.__roadtrips_by_category = {}  # category -> OrderedCollection of roadtrips
+        self.__roadtrips_by_magazine = {}  # magazine id -> OrderedCollection of roadtrips
+        self.__bucket_sequence = count(1)  # shared by the index buckets, see OrderedCollection
+        self.__search_index = SearchIndex(self.SEARCH_FIELD_WEIGHTS)
+        self.__version = 0  # bumped whenever the catalog or one of its entities changes
+        self.__journal = None  # records every change when persistence is on, see Journal
 
     # Getters
     def get_roadtrips(self):
-        return self.__roadtrips
+        return self.__roadtrips.get_items()
+
+    def get_roadtrips_page(self, after: int, limit: int):
+        return self.__roadtrips.get_page(after, limit)
+
+    def get_version(self):
+        return self.__version
 
     # Setters
     def add_roadtrip(self, roadtrip):
-        self.__roadtrips.append(roadtrip)
+        self.__insert(roadtrip)
+        if self.__journal is not None:
+            self.__journal.put('roadtrip', roadtrip)
+        self.bump_version()
+
+    def add_roadtrips(self, roadtrips: list):
+        '''Add many new roadtrips as a single change'''
+        for roadtrip in roadtrips:
+            self.__insert(roadtrip)
+        if self.__journal is not None:
+            self.__journal.put_many('roadtrip', roadtrips)
+        self.bump_version()
 
     def remove_roadtrip(self, roadtrip):
-        self.__roadtrips.remove(roadtrip)
+        self.__roadtrips.remove(roadtrip.get_key())
+        self.__unindex(self.__roadtrips_by_author, roadtrip.get_author(), roadtrip)
+        self.__unindex(self.__roadtrips_by_category, roadtrip.get_category(), roadtrip)
+        for magazine in roadtrip.get_magazines():
+            self.__unindex(self.__roadtrips_by_magazine, magazine.get_id(), roadtrip)
+        self.__search_index.remove_document(roadtrip.get_key())
+        roadtrip.set_catalog(None)
+        if self.__journal is not None:
+            self.__journal.delete('roadtrip', roadtrip.get_id())
+        self.bump_version()
+
+    def update_roadtrip(self, roadtrip):
+        if self.__journal is not None:
+            self.__journal.put('roadtrip', roadtrip)
+        self.bump_version()
+
+    def set_journal(self, journal):
+        self.__journal = journal
+
+    def bump_version(self):
+        self.__version += 1
+
+    # Index maintenance, called by Roadtrip setters
+    def reindex_category(self, roadtrip, old_category: str):
+        self.__unindex(self.__roadtrips_by_category, old_category, roadtrip)
+        self.__index(self.__roadtrips_by_category, roadtrip.get_category(), roadtrip)
+        self.reindex_search(roadtrip)
+
+    def reindex_search(self, roadtrip):
+        self.__search_index.add_document(roadtrip.get_key(), self.__search_fields(roadtrip))
+
+    def index_magazine(self, roadtrip, magazine_id: str):
+        self.__index(self.__roadtrips_by_magazine, magazine_id, roadtrip)
+
+    def unindex_magazine(self, roadtrip, magazine_id: str):
+        self.__unindex(self.__roadtrips_by_magazine, magazine_id, roadtrip)
 
     # Utility methods
+    def __insert(self, roadtrip):
+        self.__roadtrips.add(roadtrip.get_key(), roadtrip)
+        self.__index(self.__roadtrips_by_author, roadtrip.get_author(), roadtrip)
+        self.__index(self.__roadtrips_by_category, roadtrip.get_category(), roadtrip)
+        for magazine in roadtrip.get_magazines():
+            self.__index(self.__roadtrips_by_magazine, magazine.get_id(), roadtrip)
+        self.__search_index.add_document(roadtrip.get_key(), self.__search_fields(roadtrip))
+        roadtrip.set_catalog(self)
+
     def get_roadtrip_by_id(self, roadtrip_id: str):
-        return next((roadtrip for roadtrip in self.__roadtrips if roadtrip.get_id() == roadtrip_id), None)
+        return self.__roadtrips.get(pack_id(roadtrip_id))
+
+    def get_roadtrips_by_ids(self, roadtrip_ids: list):
+        '''The roadtrip of each id, None where there is none'''
+        return [self.__roadtrips.get(pack_id(roadtrip_id)) for roadtrip_id in roadtrip_ids]
 
     def get_roadtrips_by_username(self, username: str):
-        return [roadtrip for roadtrip in self.__roadtrips if roadtrip.get_author() == username]
-    
+        return self.__bucket(self.__roadtrips_by_author, username).get_items()
+
+    def get_roadtrips_by_username_page(self, username: str, after: int, limit: int):
+        return self.__bucket(self.__roadtrips_by_author, username).get_page(after, limit)
 
     def get_roadtrips_by_category(self, category: str):
-        return [roadtrip for roadtrip in self.__roadtrips if roadtrip.get_category() == category]
+        return self.__bucket(self.__roadtrips_by_category, category).get_items()
 
-    def get_roadtrips_by_keyword(self, keyword: str):
-        regex = re.compile(keyword, re.IGNORECASE)
-        search_result = set(item for item in self.__roadtrips if
-                            any(regex.search(attr) for attr in [item.get_title(), item.get_author(),
-                                                                item.get_category()]) or
-                            any(regex.search(waypoint.get_name()) for waypoint in item.get_waypoints()))
+    def get_roadtrips_by_category_page(self, category: str, after: int, limit: int):
+        return self.__bucket(self.__roadtrips_by_category, category).get_page(after, limit)
 
-        return search_result
+    def get_roadtrips_by_keyword(self, keyword: str):
+        '''Roadtrips matching every word of the keyword, best match first'''
+        return [self.__roadtrips.get(key) for key in self.__search_index.search(keyword)]
 
     def get_roadtrips_by_magazine_id(self, magazine_id: str):
-        return [roadtrip for roadtrip in self.__roadtrips if roadtrip.get_magazine_by_id(magazine_id) is not None]
\ No newline at end of file
+        return self.__bucket(self.__roadtrips_by_magazine, magazine_id).get_items()
+
+    def __search_fields(self, roadtrip):
+        return {
+            'title': roadtrip.get_title(),
+            'category': roadtrip.get_category(),
+            'author': roadtrip.get_author(),
+            'waypoints': ' '.join(waypoint.get_name() for waypoint in roadtrip.get_waypoints()),
+        }
+
+    def __bucket(self, index: dict, key):
+        return index.get(key, self.EMPTY_BUCKET)
+
+    def __index(self, index: dict, key, roadtrip):
+        bucket = index.get(key)
+        if bucket is None:
+            bucket = index[key] = OrderedCollection(self.__bucket_sequence)
+        bucket.add(roadtrip.get_key(), roadtrip)
+
+    def __unindex(self, index: dict, key, roadtrip):
+        bucket = index.get(key)
+        if bucket is None:
+            return
+        bucket.discard(roadtrip.get_key())
+        if not len(bucket):
+            del index[key]
@@ -0,0 +1,134 @@
+import time
+
+import numpy as np
+
+# moves must gain more than this many meters, so float noise cannot loop forever
+MIN_GAIN = 1e-6
+OR_OPT_SEGMENT_LENGTHS = (1, 2, 3)
+
+
+def path_length(matrix, order):
+    '''Length in meters of the open path visiting the points of `order`'''
+    order = np.asarray(order, dtype=np.intp)
+    return float(matrix[order[:-1], order[1:]].sum())
+
+
+def optimize_order(matrix, pin_start: bool = False, pin_end: bool = False, time_budget: float = 0.25):
+    '''
+    A short open path through every point of the `(n, n)` distance matrix,
+    as a list of point indices. Pinned points keep the first and last place
+    of the original order.
+
+    Nearest neighbour builds a first path, then the best 2-opt or Or-opt
+    move is applied until none helps or `time_budget` seconds run out. An
+    anchor node closes the path into a tour: it is 0 meters from every
+    point that may end the path and far from the others, so both move kinds
+    work on a cycle and pinned points stay next to the anchor.
+    '''
+    size = len(matrix)
+    if size < 3:
+        return list(range(size))
+
+    deadline = time.perf_counter() + time_budget
+    closed = with_anchor(matrix, pin_start, pin_end)
+    # starting from the given order when it is shorter, a result is never longer than the input
+    start = min(nearest_neighbour(matrix, pin_end), list(range(size)), key=lambda order: path_length(matrix, order))
+    tour = np.array([size] + start)
+    while time.perf_counter() < deadline:
+        if not (two_opt_move(closed, tour) or or_opt_move(closed, tour)):
+            break
+
+    order = tour[1:]
+    # the tour may run either way round the anchor
+    if (pin_start and order[0] != 0) or (not pin_start and pin_end and order[-1] != size - 1):
+        order = order[::-1]
+    return order.tolist()
+
+
+def nearest_neighbour(matrix, pin_end: bool):
+    '''Greedy path from the first point, keeping the last one for the end when it is pinned'''
+    size = len(matrix)
+    visited = np.zeros(size, dtype=bool)
+    visited[0] = True
+    visited[size - 1] |= pin_end
+    order = [0]
+    for _ in range(size - 1 - pin_end):
+        order.append(int(np.where(visited, np.inf, matrix[order[-1]]).argmin()))
+        visited[order[-1]] = True
+    if pin_end:
+        order.append(size - 1)
+    return order
+
+
+def with_anchor(matrix, pin_start: bool, pin_end: bool):
+    '''The matrix with the anchor node added as its last row and column'''
+    size = len(matrix)
+    # more than any path, so a tour never leaves the anchor towards a point that may not end the path
+    far = float(matrix.max()) * size + 1.0
+    anchor = np.full(size, far) if pin_start or pin_end else np.zeros(size)
+    if pin_start:
+        anchor[0] = 0.0
+    if pin_end:
+        anchor[size - 1] = 0.0
+    closed = np.zeros((size + 1, size + 1))
+    closed[:size, :size] = matrix
+    closed[size, :size] = closed[:size, size] = anchor
+    return closed
+
+
+def two_opt_move(matrix, tour):
+    '''Apply the best segment reversal to `tour` in place, the anchor at position 0 stays put'''
+    previous = np.roll(tour, 1)
+    following = np.roll(tour, -1)
+    edges = matrix[previous, tour]  # edges[i] joins tour[i - 1] and tour[i]
+    # reversing tour[i..j] swaps edges (i - 1, i) and (j, j + 1) for (i - 1, j) and (i, j + 1)
+    gains = (matrix[previous[:, None], tour[None, :]] + matrix[tour[:, None], following[None, :]]
+             - edges[:, None] - np.roll(edges, -1)[None, :])
+    gains[0] = np.inf
+    gains[np.tril_indices(len(tour))] = np.inf
+
+    best = int(gains.argmin())
+    if gains.flat[best] >= -MIN_GAIN:
+        return False
+    i, j = divmod(best, len(tour))
+    tour[i:j + 1] = tour[i:j + 1][::-1].copy()
+    return True
+
+
+def or_opt_move(matrix, tour):
+    '''Apply the best move of a 1 to 3 point segment, possibly reversed, to another edge of `tour` in place'''
+    size = len(tour)
+    following = np.roll(tour, -1)
+    insert_after = np.arange(size)
+    best = (-MIN_GAIN, None)
+    for length in OR_OPT_SEGMENT_LENGTHS:
+        starts = np.arange(1, size - length + 1)
+        if not len(starts):
+            break
+        before, first = tour[starts - 1], tour[starts]
+        last, after = tour[starts + length - 1], tour[(starts + length) % size]
+        removal = matrix[before, first] + matrix[last, after] - matrix[before, after]
+
+        edge = matrix[tour, following][None, :]
+        forward = matrix[tour[None, :], first[:, None]] + matrix[last[:, None], following[None, :]] - edge
+        backward = matrix[tour[None, :], last[:, None]] + matrix[first[:, None], following[None, :]] - edge
+        gains = np.minimum(forward, backward) - removal[:, None]
+        # edges touching the segment are not places to move it to
+        offset = insert_after[None, :] - starts[:, None]
+        gains[(offset >= -1) & (offset <= length - 1)] = np.inf
+
+        index = int(gains.argmin())
+        if gains.flat[index] < best[0]:
+            row, column = divmod(index, size)
+            best = (gains.flat[index], (int(starts[row]), length, column, backward[row, column] < forward[row, column]))
+
+    if best[1] is None:
+        return False
+    start, length, column, reverse = best[1]
+    segment = tour[start:start + length]
+    if reverse:
+        segment = segment[::-1]
+    rest = np.delete(tour, np.s_[start:start + length])
+    position = column if column < start else column - length
+    tour[:] = np.insert(rest, position + 1, segment)
+    return True
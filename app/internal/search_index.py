@@ -0,0 +1,134 @@
+import heapq
+import math
+import re
+import sys
+from bisect import bisect_left, insort
+
+TOKEN_PATTERN = re.compile(r'\w+')
+
+
+def tokenize(text: str):
+    return TOKEN_PATTERN.findall(text.lower()) if text else []
+
+
+class SearchIndex:
+    '''
+    Inverted index over weighted text fields, ranked with BM25F.
+
+    Every document is a mapping of field name to text. Term frequencies are
+    weighted per field before BM25 saturation, so a title hit outranks the
+    same word in a waypoint name.
+    '''
+
+    K1 = 1.2
+    B = 0.75
+    PREFIX_WEIGHT = 0.5  # a prefix match counts half of an exact match
+    MAX_PREFIX_TERMS = 64  # the most frequent terms a prefix expands to
+
+    def __init__(self, field_weights: dict):
+        self.__field_weights = field_weights
+        self.__postings = {}  # term -> {doc_id -> weighted term frequency}
+        self.__documents = {}  # doc_id -> ({term -> weighted tf}, weighted length)
+        self.__vocabulary = []  # sorted terms, for prefix lookups
+        self.__total_length = 0.0
+
+    # Getters
+    def get_document_count(self):
+        return len(self.__documents)
+
+    # Setters
+    def add_document(self, doc_id: str, fields: dict):
+        for field, text in fields.items():
+            if not isinstance(text, str):
+                raise TypeError(f"{field} must be a string")
+        if doc_id in self.__documents:
+            self.remove_document(doc_id)
+
+        terms = {}
+        length = 0.0
+        for field, text in fields.items():
+            weight = self.__field_weights.get(field, 1.0)
+            for token in tokenize(text):
+                terms[token] = terms.get(token, 0.0) + weight
+                length += weight
+
+        for term, frequency in terms.items():
+            posting = self.__postings.get(term)
+            if posting is None:
+                posting = self.__postings[term] = {}
+                insort(self.__vocabulary, term)
+            posting[doc_id] = frequency
+
+        self.__documents[doc_id] = (terms, length)
+        self.__total_length += length
+
+    def remove_document(self, doc_id: str):
+        document = self.__documents.pop(doc_id, None)
+        if document is None:
+            return
+
+        terms, length = document
+        for term in terms:
+            posting = self.__postings[term]
+            del posting[doc_id]
+            if not posting:
+                del self.__postings[term]
+                del self.__vocabulary[bisect_left(self.__vocabulary, term)]
+        self.__total_length -= length
+
+    # Utility methods
+    def search(self, query: str):
+        '''
+        Return the ids of documents matching every query token, best first.
+        Each token matches exactly or as a prefix of an indexed term.
+        '''
+        tokens = list(dict.fromkeys(tokenize(query)))
+        if not tokens or not self.__documents:
+            return []
+
+        scores = None
+        for token in tokens:
+            token_scores = self.__score_token(token)
+            if scores is None:
+                scores = token_scores
+            else:
+                scores = {doc_id: score + token_scores[doc_id]
+                          for doc_id, score in scores.items() if doc_id in token_scores}
+            if not scores:
+                return []
+
+        return sorted(scores, key=scores.get, reverse=True)
+
+    def __expand(self, token: str):
+        '''
+        The token itself, then the terms it is a prefix of. A short prefix may
+        cover thousands of terms, only the MAX_PREFIX_TERMS found in the most
+        documents are kept so common words like "paris" for "par" stay in.
+        '''
+        yield token, 1.0
+        start = bisect_left(self.__vocabulary, token)
+        end = bisect_left(self.__vocabulary, token + chr(sys.maxunicode), start)
+        terms = self.__vocabulary[start:end]
+        if len(terms) > self.MAX_PREFIX_TERMS:
+            terms = heapq.nlargest(self.MAX_PREFIX_TERMS, terms, key=lambda term: len(self.__postings[term]))
+        for term in terms:
+            if term != token:
+                yield term, self.PREFIX_WEIGHT
+
+    def __score_token(self, token: str):
+        document_count = len(self.__documents)
+        average_length = self.__total_length / document_count or 1.0
+        scores = {}
+        for term, term_weight in self.__expand(token):
+            posting = self.__postings.get(term)
+            if not posting:
+                continue
+            idf = math.log(1 + (document_count - len(posting) + 0.5) / (len(posting) + 0.5))
+            for doc_id, frequency in posting.items():
+                length = self.__documents[doc_id][1]
+                norm = self.K1 * (1 - self.B + self.B * length / average_length)
+                score = term_weight * idf * frequency * (self.K1 + 1) / (frequency + norm)
+                # a document takes its best scoring expansion of the token
+                if score > scores.get(doc_id, 0.0):
+                    scores[doc_id] = score
+        return scores
@@ -0,0 +1,142 @@
+import heapq
+import math
+
+EARTH_RADIUS_METERS = 6371008.8
+METERS_PER_DEGREE = math.pi * EARTH_RADIUS_METERS / 180
+
+
+def parse_position(position):
+    '''Return `(lat, lon)` floats for a `[lat, lon]` position, or None if it is not one'''
+    try:
+        lat, lon = float(position[0]), float(position[1])
+    except (TypeError, ValueError, IndexError, KeyError):
+        return None
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        return None
+    return lat, lon
+
+
+def haversine(lat1: float, lon1: float, lat2: float, lon2: float):
+    '''Great-circle distance in meters'''
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lon2 - lon1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_METERS * math.asin(min(1.0, math.sqrt(a)))
+
+
+class GeoGrid:
+    '''
+    Uniform lat/lon grid of buckets for nearest-neighbour queries.
+
+    Cells are searched in growing square rings around the query point and
+    the search stops as soon as no unvisited cell can hold anything closer
+    than the k-th best hit, or anything inside the radius.
+    '''
+
+    def __init__(self, cell_degrees: float = 0.01):
+        self.__cell_degrees = cell_degrees
+        self.__columns = round(360 / cell_degrees)
+        self.__rows = round(180 / cell_degrees)
+        self.__cells = {}  # (row, column) -> {key -> (lat, lon, item)}
+        self.__locations = {}  # key -> (row, column)
+
+    # Getters
+    def get_size(self):
+        return len(self.__locations)
+
+    # Setters
+    def insert(self, key: str, lat: float, lon: float, item):
+        self.remove(key)
+        cell = self.__cell(lat, lon)
+        self.__cells.setdefault(cell, {})[key] = (lat, lon, item)
+        self.__locations[key] = cell
+
+    def remove(self, key: str):
+        cell = self.__locations.pop(key, None)
+        if cell is None:
+            return
+        bucket = self.__cells[cell]
+        del bucket[key]
+        if not bucket:
+            del self.__cells[cell]
+
+    # Utility methods
+    def nearest(self, lat: float, lon: float, radius: float, limit: int):
+        '''
+        Return up to `limit` `(distance, item)` pairs within `radius` meters
+        of the point, closest first.
+
+        Only the cells of the box around the circle are visited, and when the
+        box holds more cells than are occupied (near the poles, where it spans
+        every longitude) the occupied cells are scanned instead, so a query
+        never costs more than the grid holds.
+        '''
+        if limit <= 0 or not self.__locations:
+            return []
+
+        center_row, center_column = self.__cell(lat, lon)
+        # widest latitude the radius can reach, longitude degrees are shortest there
+        lat_span = radius / METERS_PER_DEGREE
+        reach = abs(lat) + lat_span + self.__cell_degrees
+        if reach >= 90:
+            # the circle may hold a pole, rows past it take every longitude
+            lon_span = 360.0
+        else:
+            lon_span = min(360.0, lat_span / math.cos(math.radians(reach)))
+        row_reach = int(lat_span / self.__cell_degrees) + 1
+        column_reach = int(lon_span / self.__cell_degrees) + 1
+        rows = (max(center_row - row_reach, 0), min(center_row + row_reach, self.__rows - 1))
+
+        best = []  # max-heap of (-distance, key, item) holding the k closest so far
+
+        def visit(bucket):
+            for key, (item_lat, item_lon, item) in bucket.items():
+                distance = haversine(lat, lon, item_lat, item_lon)
+                if distance > radius:
+                    continue
+                if len(best) < limit:
+                    heapq.heappush(best, (-distance, key, item))
+                elif distance < -best[0][0]:
+                    heapq.heapreplace(best, (-distance, key, item))
+
+        box_cells = (rows[1] - rows[0] + 1) * min(2 * column_reach + 1, self.__columns)
+        if 2 * column_reach + 1 >= self.__columns or box_cells > len(self.__cells):
+            for (row, column), bucket in self.__cells.items():
+                offset = abs(column - center_column)
+                if rows[0] <= row <= rows[1] and min(offset, self.__columns - offset) <= column_reach:
+                    visit(bucket)
+        else:
+            # a ring step is at least this far on the ground at the widest latitude
+            step = self.__cell_degrees * METERS_PER_DEGREE * math.cos(math.radians(min(reach, 90.0)))
+            for ring in range(max(row_reach, column_reach) + 1):
+                # nothing in this ring or beyond can be closer than this
+                bound = max(0.0, (ring - 1) * step)
+                if bound > radius or (len(best) == limit and bound > -best[0][0]):
+                    break
+                for cell in self.__ring(center_row, center_column, ring, rows, column_reach):
+                    visit(self.__cells.get(cell, {}))
+
+        return [(-negative_distance, item) for negative_distance, _, item in sorted(best, reverse=True)]
+
+    def __cell(self, lat: float, lon: float):
+        row = min(int((lat + 90) // self.__cell_degrees), self.__rows - 1)
+        column = int((lon + 180) // self.__cell_degrees) % self.__columns
+        return row, column
+
+    def __ring(self, center_row: int, center_column: int, ring: int, rows: tuple, column_reach: int):
+        '''The cells of the square ring around the center that lie inside `rows` and `column_reach`'''
+        if ring == 0:
+            yield center_row, center_column
+            return
+        width = min(ring, column_reach)
+        columns = range(center_column - width, center_column + width + 1)
+        for row in (center_row - ring, center_row + ring):
+            if rows[0] <= row <= rows[1]:
+                for column in columns:
+                    yield row, column % self.__columns
+        if ring > column_reach:
+            return
+        for row in range(max(center_row - ring + 1, rows[0]), min(center_row + ring, rows[1] + 1)):
+            yield row, (center_column - ring) % self.__columns
+            yield row, (center_column + ring) % self.__columns
@@ -0,0 +1,720 @@
+import heapq
+import json
+import math
+from collections import OrderedDict
+from weakref import WeakValueDictionary
+
+from .account_catalog import normalize_email
+from .admin import Admin
+from .landmark import Landmark
+from .magazine import Magazine
+from .review import Review
+from .roadtrip import Roadtrip
+from .roadtrip_catalog import RoadtripCatalog
+from .search_index import tokenize
+from .spatial_index import METERS_PER_DEGREE, haversine, parse_position
+from .sqlite_storage import SQLiteStorage
+from .user import User
+from .waypoint import Waypoint
+
+
+def dump(value):
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':'))
+
+
+class SQLiteCatalog:
+    '''
+    Shared plumbing of the SQLite catalogs.
+
+    Rows are hydrated into the usual domain objects. An identity map makes
+    sure one id maps to one live object, so changes made through its setters
+    are seen by every holder, and a small LRU keeps hot objects alive
+    between requests. Entities write themselves back through the update_*
+    hooks they already call on their catalog. Changes made by other
+    processes evict the affected entities, see SQLiteStorage.sync.
+    '''
+
+    KIND = None
+    MAX_QUERY_IDS = 500  # bound parameters per IN (...) lookup
+
+    def __init__(self, storage: SQLiteStorage, cache_size: int = 10000):
+        self.__storage = storage
+        self.__identity = WeakValueDictionary()  # id -> live entity
+        self.__recent = OrderedDict()  # id -> entity, strong refs to the hottest entities
+        self.__cache_size = cache_size
+
+        storage.subscribe(self.KIND, self.__on_change)
+
+    # Getters
+    def get_storage(self):
+        return self.__storage
+
+    def get_version(self):
+        return self.__storage.get_change_version(self.KIND)
+
+    def get_cached_entity(self, entity_id: str):
+        entity = self.__identity.get(entity_id)
+        if entity is not None:
+            self.__recent[entity_id] = entity
+            self.__recent.move_to_end(entity_id)
+        return entity
+
+    # Setters
+    def cache_entity(self, entity_id: str, entity):
+        self.__identity[entity_id] = entity
+        self.__recent[entity_id] = entity
+        self.__recent.move_to_end(entity_id)
+        if len(self.__recent) > self.__cache_size:
+            self.__recent.popitem(last=False)
+
+    def evict_entity(self, entity_id: str):
+        self.__identity.pop(entity_id, None)
+        self.__recent.pop(entity_id, None)
+
+    def evict_all(self):
+        self.__identity.clear()
+        self.__recent.clear()
+
+    def bump_version(self):
+        # the version is the latest change of this kind, moved by record_change
+        pass
+
+    # Utility methods
+    def record_change(self, connection, entity_id: str):
+        self.__storage.record_change(connection, self.KIND, entity_id)
+
+    def take_version(self, entity, row):
+        '''
+        Adopt the version the database assigned on update. Versions are
+        counted in the row, not per process, so two workers saving the same
+        entity never both produce version N + 1, see etags.ETAG_PREFIX.
+        '''
+        if row is not None:
+            entity.set_version(row['version'])
+
+    def load(self, row, hydrate):
+        '''The live entity for a row, hydrating it only if nobody holds it yet'''
+        entity = self.get_cached_entity(row['id'])
+        if entity is None:
+            entity = hydrate(row)
+            self.cache_entity(row['id'], entity)
+        return entity
+
+    def __on_change(self, entity_id: str | None):
+        if entity_id is None:
+            self.evict_all()
+        else:
+            self.evict_entity(entity_id)
+
+    def load_many(self, table: str, ids: list, load):
+        '''
+        The entity of each id, None where there is none. Live entities are
+        reused and the rest come from a single query per chunk of ids.
+        '''
+        found = {}
+        for entity_id in ids:
+            entity = self.get_cached_entity(entity_id)
+            if entity is not None:
+                found[entity_id] = entity
+        missing = [entity_id for entity_id in ids if entity_id not in found]
+        rows = []
+        with self.__storage.read() as connection:
+            for start in range(0, len(missing), self.MAX_QUERY_IDS):
+                chunk = missing[start:start + self.MAX_QUERY_IDS]
+                rows += connection.execute(
+                    f'SELECT * FROM {table} WHERE id IN ({",".join("?" * len(chunk))})', chunk).fetchall()
+        for row in rows:
+            found[row['id']] = load(row)
+        return [found.get(entity_id) for entity_id in ids]
+
+    def page(self, rows: list, limit: int, load):
+        '''Split `limit + 1` rows into a page of entities and the next cursor'''
+        next_position = rows[limit - 1]['seq'] if len(rows) > limit else None
+        return [load(row) for row in rows[:limit]], next_position
+
+
+class SQLiteAccountCatalog(SQLiteCatalog):
+    KIND = 'account'
+
+    # Getters
+    def get_accounts(self):
+        return self.__query('SELECT * FROM accounts ORDER BY seq')
+
+    def get_accounts_page(self, after: int, limit: int):
+        with self.get_storage().read() as connection:
+            rows = connection.execute(
+                'SELECT * FROM accounts WHERE seq > ? ORDER BY seq LIMIT ?', (after, limit + 1)).fetchall()
+        return self.page(rows, limit, self.__load)
+
+    def get_account_by_email(self, email: str):
+        return self.__query_one(
+            'SELECT * FROM accounts WHERE email_key = ? ORDER BY seq DESC LIMIT 1', normalize_email(email))
+
+    def get_account_by_username(self, username: str):
+        return self.__query_one(
+            'SELECT * FROM accounts WHERE username = ? ORDER BY seq DESC LIMIT 1', username)
+
+    def get_account_by_id(self, user_id: str):
+        user = self.get_cached_entity(user_id)
+        if user is not None:
+            return user
+        return self.__query_one('SELECT * FROM accounts WHERE id = ?', user_id)
+
+    def get_accounts_by_ids(self, user_ids: list):
+        return self.load_many('accounts', user_ids, self.__load)
+
+    # Setters
+    def add_account(self, user: User | Admin):
+        with self.get_storage().write() as connection:
+            connection.execute(
+                'INSERT INTO accounts (id, kind, username, email, email_key, password, version) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (user.get_id(), self.__kind(user), user.get_username(), user.get_email(),
+                 normalize_email(user.get_email()), user.get_password(), user.get_version()))
+            self.__save_favorites(connection, user)
+            self.record_change(connection, user.get_id())
+        user.set_catalog(self)
+        self.cache_entity(user.get_id(), user)
+
+    def remove_account(self, user: User | Admin):
+        with self.get_storage().write() as connection:
+            connection.execute('DELETE FROM accounts WHERE id = ?', (user.get_id(),))
+            connection.execute('DELETE FROM favorites WHERE user_id = ?', (user.get_id(),))
+            self.record_change(connection, user.get_id())
+        user.set_catalog(None)
+        self.evict_entity(user.get_id())
+
+    # Index maintenance, called by Account setters
+    def reindex_username(self, user: User | Admin, old_username: str):
+        # the row is rewritten by update_account
+        pass
+
+    def reindex_email(self, user: User | Admin, old_email: str):
+        pass
+
+    def update_account(self, user: User | Admin):
+        self.get_storage().defer((self.KIND, user.get_id()), lambda: self.__save_account(user))
+
+    def __save_account(self, user: User | Admin):
+        with self.get_storage().write() as connection:
+            row = connection.execute(
+                'UPDATE accounts SET username = ?, email = ?, email_key = ?, password = ?, version = version + 1 '
+                'WHERE id = ? RETURNING version',
+                (user.get_username(), user.get_email(), normalize_email(user.get_email()),
+                 user.get_password(), user.get_id())).fetchone()
+            self.take_version(user, row)
+            self.__save_favorites(connection, user)
+            self.record_change(connection, user.get_id())
+
+    # Utility methods
+    def __kind(self, user: User | Admin):
+        return 'admin' if isinstance(user, Admin) else 'user'
+
+    def __save_favorites(self, connection, user: User | Admin):
+        stored = {row[0] for row in connection.execute(
+            'SELECT landmark_id FROM favorites WHERE user_id = ?', (user.get_id(),))}
+        current = {landmark.get_id(): landmark for landmark in user.get_favorite_landmarks()}
+        connection.executemany(
+            'DELETE FROM favorites WHERE user_id = ? AND landmark_id = ?',
+            [(user.get_id(), landmark_id) for landmark_id in stored - current.keys()])
+        connection.executemany(
+            'INSERT INTO favorites (user_id, landmark_id, data) VALUES (?, ?, ?)',
+            [(user.get_id(), landmark_id, dump({
+                'id': landmark.get_id(),
+                'name': landmark.get_name(),
+                'amenity': landmark.get_amenity(),
+                'position': landmark.get_position(),
+                'opening_hours': landmark.get_opening_hours(),
+            })) for landmark_id, landmark in current.items() if landmark_id not in stored])
+
+    def __hydrate(self, row):
+        account_class = Admin if row['kind'] == 'admin' else User
+        user = account_class(row['email'], row['username'], row['password'], row['id'])
+        with self.get_storage().read() as connection:
+            favorites = connection.execute(
+                'SELECT data FROM favorites WHERE user_id = ? ORDER BY seq', (row['id'],)).fetchall()
+        for favorite in favorites:
+            user.add_favorite_landmark(Landmark(**json.loads(favorite['data'])))
+        user.set_version(row['version'])
+        user.set_catalog(self)
+        return user
+
+    def __load(self, row):
+        return self.load(row, self.__hydrate)
+
+    def __query(self, sql: str, *params):
+        with self.get_storage().read() as connection:
+            rows = connection.execute(sql, params).fetchall()
+        return [self.__load(row) for row in rows]
+
+    def __query_one(self, sql: str, *params):
+        rows = self.__query(sql, *params)
+        return rows[0] if rows else None
+
+
+class SQLiteMagazineCatalog(SQLiteCatalog):
+    KIND = 'magazine'
+
+    # Getters
+    def get_magazines(self):
+        with self.get_storage().read() as connection:
+            rows = connection.execute('SELECT * FROM magazines ORDER BY seq').fetchall()
+        return [self.__load(row) for row in rows]
+
+    def get_magazines_page(self, after: int, limit: int):
+        with self.get_storage().read() as connection:
+            rows = connection.execute(
+                'SELECT * FROM magazines WHERE seq > ? ORDER BY seq LIMIT ?', (after, limit + 1)).fetchall()
+        return self.page(rows, limit, self.__load)
+
+    def get_magazine_by_id(self, magazine_id: str):
+        magazine = self.get_cached_entity(magazine_id)
+        if magazine is not None:
+            return magazine
+        with self.get_storage().read() as connection:
+            row = connection.execute('SELECT * FROM magazines WHERE id = ?', (magazine_id,)).fetchone()
+        return self.__load(row) if row is not None else None
+
+    # Setters
+    def add_magazine(self, new_magazine: Magazine):
+        with self.get_storage().write() as connection:
+            connection.execute(
+                'INSERT INTO magazines (id, title, description, version) VALUES (?, ?, ?, ?)',
+                (new_magazine.get_id(), new_magazine.get_title(), new_magazine.get_description(),
+                 new_magazine.get_version()))
+            self.record_change(connection, new_magazine.get_id())
+        new_magazine.set_catalog(self)
+        self.cache_entity(new_magazine.get_id(), new_magazine)
+
+    def remove_magazine(self, magazine: Magazine):
+        with self.get_storage().write() as connection:
+            connection.execute('DELETE FROM magazines WHERE id = ?', (magazine.get_id(),))
+            self.record_change(connection, magazine.get_id())
+        magazine.set_catalog(None)
+        self.evict_entity(magazine.get_id())
+
+    def update_magazine(self, magazine: Magazine):
+        self.get_storage().defer((self.KIND, magazine.get_id()), lambda: self.__save_magazine(magazine))
+
+    def __save_magazine(self, magazine: Magazine):
+        with self.get_storage().write() as connection:
+            row = connection.execute(
+                'UPDATE magazines SET title = ?, description = ?, version = version + 1 WHERE id = ? RETURNING version',
+                (magazine.get_title(), magazine.get_description(), magazine.get_id())).fetchone()
+            self.take_version(magazine, row)
+            self.record_change(connection, magazine.get_id())
+
+    # Utility methods
+    def __hydrate(self, row):
+        magazine = Magazine(row['title'], row['description'], row['id'])
+        magazine.set_version(row['version'])
+        magazine.set_catalog(self)
+        return magazine
+
+    def __load(self, row):
+        return self.load(row, self.__hydrate)
+
+
+class SQLiteRoadtripCatalog(SQLiteCatalog):
+    KIND = 'roadtrip'
+
+    SEARCH_SQL = (
+        'SELECT roadtrips.* FROM roadtrips_fts JOIN roadtrips ON roadtrips.seq = roadtrips_fts.rowid '
+        'WHERE roadtrips_fts MATCH ? ORDER BY bm25(roadtrips_fts, 0, {title}, {category}, {author}, {waypoints})'
+    ).format(**RoadtripCatalog.SEARCH_FIELD_WEIGHTS)
+
+    def __init__(self, storage: SQLiteStorage, magazines: SQLiteMagazineCatalog, cache_size: int = 10000):
+        super().__init__(storage, cache_size)
+        self.__magazines = magazines
+
+    # Getters
+    def get_roadtrips(self):
+        return self.__query('SELECT * FROM roadtrips ORDER BY seq')
+
+    def get_roadtrips_page(self, after: int, limit: int):
+        return self.__query_page('SELECT * FROM roadtrips WHERE seq > ? ORDER BY seq LIMIT ?', after, limit)
+
+    # Setters
+    def add_roadtrip(self, roadtrip):
+        with self.get_storage().write() as connection:
+            seq = connection.execute(
+                'INSERT INTO roadtrips (id, author, title, sub_title, description, category, summary, '
+                'waypoints, distance_between_waypoints, total_distance, total_time, version) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (roadtrip.get_id(), roadtrip.get_author()) + self.__columns(roadtrip)).lastrowid
+            connection.executemany(
+                'INSERT OR IGNORE INTO roadtrip_magazines (roadtrip_id, magazine_id) VALUES (?, ?)',
+                [(roadtrip.get_id(), magazine.get_id()) for magazine in roadtrip.get_magazines()])
+            self.__index_search(connection, seq, roadtrip)
+            self.record_change(connection, roadtrip.get_id())
+        roadtrip.set_catalog(self)
+        self.cache_entity(roadtrip.get_id(), roadtrip)
+
+    def add_roadtrips(self, roadtrips: list):
+        '''Add many new roadtrips in one transaction'''
+        with self.get_storage().write() as connection:
+            connection.executemany(
+                'INSERT INTO roadtrips (id, author, title, sub_title, description, category, summary, '
+                'waypoints, distance_between_waypoints, total_distance, total_time, version) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                [(roadtrip.get_id(), roadtrip.get_author()) + self.__columns(roadtrip) for roadtrip in roadtrips])
+            connection.executemany(
+                'INSERT OR IGNORE INTO roadtrip_magazines (roadtrip_id, magazine_id) VALUES (?, ?)',
+                [(roadtrip.get_id(), magazine.get_id()) for roadtrip in roadtrips for magazine in roadtrip.get_magazines()])
+            connection.executemany(
+                'INSERT INTO roadtrips_fts (rowid, roadtrip_id, title, category, author, waypoints) '
+                'SELECT seq, id, ?, ?, ?, ? FROM roadtrips WHERE id = ?',
+                [self.__search_columns(roadtrip) + (roadtrip.get_id(),) for roadtrip in roadtrips])
+            # new rows, no process holds them yet, so one change moves the version
+            self.record_change(connection, '')
+        for roadtrip in roadtrips:
+            roadtrip.set_catalog(self)
+            self.cache_entity(roadtrip.get_id(), roadtrip)
+
+    def remove_roadtrip(self, roadtrip):
+        with self.get_storage().write() as connection:
+            connection.execute(
+                'DELETE FROM roadtrips_fts WHERE rowid = (SELECT seq FROM roadtrips WHERE id = ?)',
+                (roadtrip.get_id(),))
+            connection.execute('DELETE FROM roadtrips WHERE id = ?', (roadtrip.get_id(),))
+            connection.execute('DELETE FROM roadtrip_magazines WHERE roadtrip_id = ?', (roadtrip.get_id(),))
+            self.record_change(connection, roadtrip.get_id())
+        roadtrip.set_catalog(None)
+        self.evict_entity(roadtrip.get_id())
+
+    # Index maintenance, called by Roadtrip setters
+    def reindex_category(self, roadtrip, old_category: str):
+        # the row and its search entry are rewritten by update_roadtrip
+        pass
+
+    def reindex_search(self, roadtrip):
+        pass
+
+    def index_magazine(self, roadtrip, magazine_id: str):
+        with self.get_storage().write() as connection:
+            connection.execute(
+                'INSERT OR IGNORE INTO roadtrip_magazines (roadtrip_id, magazine_id) VALUES (?, ?)',
+                (roadtrip.get_id(), magazine_id))
+
+    def unindex_magazine(self, roadtrip, magazine_id: str):
+        with self.get_storage().write() as connection:
+            connection.execute(
+                'DELETE FROM roadtrip_magazines WHERE roadtrip_id = ? AND magazine_id = ?',
+                (roadtrip.get_id(), magazine_id))
+
+    def update_roadtrip(self, roadtrip):
+        self.get_storage().defer((self.KIND, roadtrip.get_id()), lambda: self.__save_roadtrip(roadtrip))
+
+    def __save_roadtrip(self, roadtrip):
+        with self.get_storage().write() as connection:
+            # the version column is left out of the columns, the database moves it
+            row = connection.execute(
+                'UPDATE roadtrips SET title = ?, sub_title = ?, description = ?, category = ?, summary = ?, '
+                'waypoints = ?, distance_between_waypoints = ?, total_distance = ?, total_time = ?, '
+                'version = version + 1 WHERE id = ? RETURNING seq, version',
+                self.__columns(roadtrip)[:-1] + (roadtrip.get_id(),)).fetchone()
+            self.take_version(roadtrip, row)
+            if row is not None:
+                connection.execute('DELETE FROM roadtrips_fts WHERE rowid = ?', (row['seq'],))
+                self.__index_search(connection, row['seq'], roadtrip)
+            self.record_change(connection, roadtrip.get_id())
+
+    # Utility methods
+    def get_roadtrip_by_id(self, roadtrip_id: str):
+        roadtrip = self.get_cached_entity(roadtrip_id)
+        if roadtrip is not None:
+            return roadtrip
+        rows = self.__query('SELECT * FROM roadtrips WHERE id = ?', roadtrip_id)
+        return rows[0] if rows else None
+
+    def get_roadtrips_by_ids(self, roadtrip_ids: list):
+        return self.load_many('roadtrips', roadtrip_ids, self.__load)
+
+    def get_roadtrips_by_username(self, username: str):
+        return self.__query('SELECT * FROM roadtrips WHERE author = ? ORDER BY seq', username)
+
+    def get_roadtrips_by_username_page(self, username: str, after: int, limit: int):
+        return self.__query_page(
+            'SELECT * FROM roadtrips WHERE author = ? AND seq > ? ORDER BY seq LIMIT ?', username, after, limit)
+
+    def get_roadtrips_by_category(self, category: str):
+        return self.__query('SELECT * FROM roadtrips WHERE category = ? ORDER BY seq', category)
+
+    def get_roadtrips_by_category_page(self, category: str, after: int, limit: int):
+        return self.__query_page(
+            'SELECT * FROM roadtrips WHERE category = ? AND seq > ? ORDER BY seq LIMIT ?', category, after, limit)
+
+    def get_roadtrips_by_keyword(self, keyword: str):
+        '''Roadtrips matching every word of the keyword, best match first'''
+        tokens = list(dict.fromkeys(tokenize(keyword)))
+        if not tokens:
+            return []
+        # every token is quoted and prefix matched, never parsed as FTS syntax
+        return self.__query(self.SEARCH_SQL, ' AND '.join(f'"{token}"*' for token in tokens))
+
+    def get_roadtrips_by_magazine_id(self, magazine_id: str):
+        return self.__query(
+            'SELECT roadtrips.* FROM roadtrip_magazines JOIN roadtrips ON roadtrips.id = roadtrip_magazines.roadtrip_id '
+            'WHERE roadtrip_magazines.magazine_id = ? ORDER BY roadtrip_magazines.seq', magazine_id)
+
+    def __columns(self, roadtrip):
+        return (
+            roadtrip.get_title(),
+            roadtrip.get_sub_title(),
+            roadtrip.get_description(),
+            roadtrip.get_category(),
+            roadtrip.get_summary(),
+            dump([{
+                'id': waypoint.get_id(),
+                'name': waypoint.get_name(),
+                'amenity': waypoint.get_amenity(),
+                'position': waypoint.get_position(),
+                'opening_hours': waypoint.get_opening_hours(),
+                'note': waypoint.get_note(),
+                'description': waypoint.get_description(),
+            } for waypoint in roadtrip.get_waypoints()]),
+            dump(roadtrip.get_distance_between_waypoints()),
+            roadtrip.get_total_distance(),
+            roadtrip.get_total_time(),
+            roadtrip.get_version(),
+        )
+
+    def __search_columns(self, roadtrip):
+        return (roadtrip.get_title(), roadtrip.get_category(), roadtrip.get_author(),
+                ' '.join(waypoint.get_name() for waypoint in roadtrip.get_waypoints()))
+
+    def __index_search(self, connection, seq: int, roadtrip):
+        connection.execute(
+            'INSERT INTO roadtrips_fts (rowid, roadtrip_id, title, category, author, waypoints) '
+            'VALUES (?, ?, ?, ?, ?, ?)',
+            (seq, roadtrip.get_id()) + self.__search_columns(roadtrip))
+
+    def __hydrate(self, row):
+        roadtrip = Roadtrip(row['author'], row['id'])
+        roadtrip.set_title(row['title'])
+        roadtrip.set_sub_title(row['sub_title'])
+        roadtrip.set_description(row['description'])
+        roadtrip.set_category(row['category'])
+        roadtrip.set_summary(row['summary'])
+        roadtrip.set_waypoints([Waypoint(**waypoint) for waypoint in json.loads(row['waypoints'])])
+        roadtrip.set_distance_between_waypoints(json.loads(row['distance_between_waypoints']))
+        roadtrip.set_total_distance(row['total_distance'])
+        roadtrip.set_total_time(row['total_time'])
+        with self.get_storage().read() as connection:
+            magazine_ids = [magazine_row[0] for magazine_row in connection.execute(
+                'SELECT magazine_id FROM roadtrip_magazines WHERE roadtrip_id = ? ORDER BY seq', (row['id'],))]
+        for magazine_id in magazine_ids:
+            magazine = self.__magazines.get_magazine_by_id(magazine_id)
+            if magazine is not None:
+                roadtrip.add_magazine(magazine)
+        roadtrip.set_version(row['version'])
+        roadtrip.set_catalog(self)
+        return roadtrip
+
+    def __load(self, row):
+        return self.load(row, self.__hydrate)
+
+    def __query(self, sql: str, *params):
+        with self.get_storage().read() as connection:
+            rows = connection.execute(sql, params).fetchall()
+        return [self.__load(row) for row in rows]
+
+    def __query_page(self, sql: str, *params):
+        *params, after, limit = params
+        with self.get_storage().read() as connection:
+            rows = connection.execute(sql, (*params, after, limit + 1)).fetchall()
+        return self.page(rows, limit, self.__load)
+
+
+class SQLiteLandmarkCatalog(SQLiteCatalog):
+    KIND = 'landmark'
+
+    # Getters
+    def get_landmarks(self):
+        with self.get_storage().read() as connection:
+            rows = connection.execute('SELECT * FROM landmarks ORDER BY seq').fetchall()
+        return [self.__load(row) for row in rows]
+
+    def get_landmarks_page(self, after: int, limit: int):
+        with self.get_storage().read() as connection:
+            rows = connection.execute(
+                'SELECT * FROM landmarks WHERE seq > ? ORDER BY seq LIMIT ?', (after, limit + 1)).fetchall()
+        return self.page(rows, limit, self.__load)
+
+    def get_landmark_by_id(self, landmark_id: str):
+        landmark = self.get_cached_entity(landmark_id)
+        if landmark is not None:
+            return landmark
+        with self.get_storage().read() as connection:
+            row = connection.execute('SELECT * FROM landmarks WHERE id = ?', (landmark_id,)).fetchone()
+        return self.__load(row) if row is not None else None
+
+    def get_landmarks_by_ids(self, landmark_ids: list):
+        return self.load_many('landmarks', landmark_ids, self.__load)
+
+    def get_landmark_by_review_id(self, review_id: str):
+        with self.get_storage().read() as connection:
+            row = connection.execute('SELECT landmark_id FROM reviews WHERE id = ?', (review_id,)).fetchone()
+        return self.get_landmark_by_id(row[0]) if row is not None else None
+
+    def get_review_by_id(self, review_id: str):
+        landmark = self.get_landmark_by_review_id(review_id)
+        return landmark.get_review_by_id(review_id) if landmark is not None else None
+
+    def get_reviews_page(self, after: int, limit: int):
+        '''Page of `(landmark, review)` pairs across every landmark'''
+        with self.get_storage().read() as connection:
+            rows = connection.execute(
+                'SELECT seq, id, landmark_id FROM reviews WHERE seq > ? ORDER BY seq LIMIT ?',
+                (after, limit + 1)).fetchall()
+        return self.page(rows, limit, self.__load_review)
+
+    def get_reviews_by_reviewer_page(self, reviewer: str, after: int, limit: int):
+        '''Page of `(landmark, review)` pairs written by one reviewer'''
+        with self.get_storage().read() as connection:
+            rows = connection.execute(
+                'SELECT seq, id, landmark_id FROM reviews WHERE reviewer = ? AND seq > ? ORDER BY seq LIMIT ?',
+                (reviewer, after, limit + 1)).fetchall()
+        return self.page(rows, limit, self.__load_review)
+
+    def get_nearby_landmarks(self, lat: float, lon: float, radius: float, limit: int):
+        '''
+        Landmarks within `radius` meters of the point, closest first,
+        as `(distance, landmark)` pairs
+        '''
+        d_lat = radius / METERS_PER_DEGREE
+        d_lon = min(180.0, radius / (METERS_PER_DEGREE * max(math.cos(math.radians(min(89.9, abs(lat) + d_lat))), 1e-6)))
+        # split the box where it crosses the antimeridian
+        lon_ranges = [(max(lon - d_lon, -180.0), min(lon + d_lon, 180.0))]
+        if lon - d_lon < -180:
+            lon_ranges.append((lon - d_lon + 360, 180.0))
+        if lon + d_lon > 180:
+            lon_ranges.append((-180.0, lon + d_lon - 360))
+
+        candidates = []
+        with self.get_storage().read() as connection:
+            for min_lon, max_lon in lon_ranges:
+                for row in connection.execute(
+                        'SELECT landmarks.id, landmarks.position FROM landmarks_rtree '
+                        'JOIN landmarks ON landmarks.seq = landmarks_rtree.seq '
+                        'WHERE landmarks_rtree.max_lat >= ? AND landmarks_rtree.min_lat <= ? '
+                        'AND landmarks_rtree.max_lon >= ? AND landmarks_rtree.min_lon <= ?',
+                        (lat - d_lat, lat + d_lat, min_lon, max_lon)):
+                    position = parse_position(json.loads(row['position']))
+                    if position is None:
+                        continue
+                    distance = haversine(lat, lon, *position)
+                    if distance <= radius:
+                        candidates.append((distance, row['id']))
+
+        return [(distance, self.get_landmark_by_id(landmark_id))
+                for distance, landmark_id in heapq.nsmallest(limit, set(candidates))]
+
+    # Setters
+    def add_landmark(self, landmark: Landmark):
+        with self.get_storage().write() as connection:
+            seq = connection.execute(
+                'INSERT INTO landmarks (id, name, amenity, position, opening_hours, version) VALUES (?, ?, ?, ?, ?, ?)',
+                (landmark.get_id(), landmark.get_name(), landmark.get_amenity(), dump(landmark.get_position()),
+                 landmark.get_opening_hours(), landmark.get_version())).lastrowid
+            position = parse_position(landmark.get_position())
+            if position is not None:
+                connection.execute(
+                    'INSERT INTO landmarks_rtree (seq, min_lat, max_lat, min_lon, max_lon) VALUES (?, ?, ?, ?, ?)',
+                    (seq, position[0], position[0], position[1], position[1]))
+            for review in landmark.get_reviews():
+                self.index_review(landmark, review)
+            self.record_change(connection, landmark.get_id())
+        landmark.set_catalog(self)
+        self.cache_entity(landmark.get_id(), landmark)
+
+    def add_landmarks(self, landmarks: list):
+        '''Add many new landmarks in one transaction'''
+        with self.get_storage().write() as connection:
+            connection.executemany(
+                'INSERT INTO landmarks (id, name, amenity, position, opening_hours, version) VALUES (?, ?, ?, ?, ?, ?)',
+                [(landmark.get_id(), landmark.get_name(), landmark.get_amenity(), dump(landmark.get_position()),
+                  landmark.get_opening_hours(), landmark.get_version()) for landmark in landmarks])
+            boxes = []
+            for landmark in landmarks:
+                position = parse_position(landmark.get_position())
+                if position is not None:
+                    boxes.append((position[0], position[0], position[1], position[1], landmark.get_id()))
+            connection.executemany(
+                'INSERT INTO landmarks_rtree (seq, min_lat, max_lat, min_lon, max_lon) '
+                'SELECT seq, ?, ?, ?, ? FROM landmarks WHERE id = ?', boxes)
+            for landmark in landmarks:
+                for review in landmark.get_reviews():
+                    self.index_review(landmark, review)
+            # new rows, no process holds them yet, so one change moves the version
+            self.record_change(connection, '')
+        for landmark in landmarks:
+            landmark.set_catalog(self)
+            self.cache_entity(landmark.get_id(), landmark)
+
+    def remove_landmark(self, landmark: Landmark):
+        with self.get_storage().write() as connection:
+            connection.execute(
+                'DELETE FROM landmarks_rtree WHERE seq = (SELECT seq FROM landmarks WHERE id = ?)',
+                (landmark.get_id(),))
+            connection.execute('DELETE FROM landmarks WHERE id = ?', (landmark.get_id(),))
+            connection.execute('DELETE FROM reviews WHERE landmark_id = ?', (landmark.get_id(),))
+            self.record_change(connection, landmark.get_id())
+        landmark.set_catalog(None)
+        self.evict_entity(landmark.get_id())
+
+    def update_landmark(self, landmark: Landmark):
+        self.get_storage().defer((self.KIND, landmark.get_id()), lambda: self.__save_landmark(landmark))
+
+    def __save_landmark(self, landmark: Landmark):
+        with self.get_storage().write() as connection:
+            row = connection.execute(
+                'UPDATE landmarks SET version = version + 1 WHERE id = ? RETURNING version',
+                (landmark.get_id(),)).fetchone()
+            self.take_version(landmark, row)
+            self.record_change(connection, landmark.get_id())
+
+    # Index maintenance, called by Landmark setters
+    def index_review(self, landmark: Landmark, review):
+        with self.get_storage().write() as connection:
+            connection.execute(
+                'INSERT INTO reviews (id, landmark_id, reviewer, review_text, rating, version) VALUES (?, ?, ?, ?, ?, ?)',
+                (review.get_id(), landmark.get_id(), review.get_reviewer(), review.get_review_text(),
+                 review.get_rating(), review.get_version()))
+
+    def unindex_review(self, review):
+        with self.get_storage().write() as connection:
+            connection.execute('DELETE FROM reviews WHERE id = ?', (review.get_id(),))
+
+    def reindex_reviewer(self, landmark: Landmark, review, old_reviewer: str):
+        # the row is rewritten by update_review
+        pass
+
+    def update_review(self, landmark: Landmark, review):
+        with self.get_storage().write() as connection:
+            row = connection.execute(
+                'UPDATE reviews SET reviewer = ?, review_text = ?, rating = ?, version = version + 1 '
+                'WHERE id = ? RETURNING version',
+                (review.get_reviewer(), review.get_review_text(), review.get_rating(), review.get_id())).fetchone()
+            self.take_version(review, row)
+
+    # Utility methods
+    def __hydrate(self, row):
+        landmark = Landmark(row['id'], row['name'], row['amenity'], json.loads(row['position']), row['opening_hours'])
+        with self.get_storage().read() as connection:
+            reviews = connection.execute(
+                'SELECT * FROM reviews WHERE landmark_id = ? ORDER BY seq', (row['id'],)).fetchall()
+        for review_row in reviews:
+            review = Review(review_row['review_text'], review_row['reviewer'], review_row['rating'], review_row['id'])
+            landmark.add_review(review)
+            review.set_version(review_row['version'])
+        landmark.set_version(row['version'])
+        landmark.set_catalog(self)
+        return landmark
+
+    def __load(self, row):
+        return self.load(row, self.__hydrate)
+
+    def __load_review(self, row):
+        landmark = self.get_landmark_by_id(row['landmark_id'])
+        return landmark, landmark.get_review_by_id(row['id'])
@@ -0,0 +1,265 @@
+import queue
+import sqlite3
+import threading
+import uuid
+from contextlib import contextmanager
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS accounts (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    id TEXT NOT NULL UNIQUE,
+    kind TEXT NOT NULL,
+    username TEXT NOT NULL,
+    email TEXT,
+    email_key TEXT,
+    password TEXT NOT NULL,
+    version INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS accounts_username ON accounts (username);
+CREATE INDEX IF NOT EXISTS accounts_email_key ON accounts (email_key);
+
+CREATE TABLE IF NOT EXISTS favorites (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id TEXT NOT NULL,
+    landmark_id TEXT NOT NULL,
+    data TEXT NOT NULL,
+    UNIQUE (user_id, landmark_id)
+);
+
+CREATE TABLE IF NOT EXISTS landmarks (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    id TEXT NOT NULL UNIQUE,
+    name TEXT,
+    amenity TEXT,
+    position TEXT,
+    opening_hours TEXT,
+    version INTEGER NOT NULL DEFAULT 0
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS landmarks_rtree USING rtree (
+    seq, min_lat, max_lat, min_lon, max_lon
+);
+
+CREATE TABLE IF NOT EXISTS reviews (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    id TEXT NOT NULL UNIQUE,
+    landmark_id TEXT NOT NULL,
+    reviewer TEXT,
+    review_text TEXT,
+    rating,
+    version INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS reviews_landmark ON reviews (landmark_id, seq);
+CREATE INDEX IF NOT EXISTS reviews_reviewer ON reviews (reviewer, seq);
+
+CREATE TABLE IF NOT EXISTS magazines (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    id TEXT NOT NULL UNIQUE,
+    title TEXT,
+    description TEXT,
+    version INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS roadtrips (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    id TEXT NOT NULL UNIQUE,
+    author TEXT NOT NULL,
+    title TEXT,
+    sub_title TEXT,
+    description TEXT,
+    category TEXT,
+    summary TEXT,
+    waypoints TEXT NOT NULL,
+    distance_between_waypoints TEXT NOT NULL,
+    total_distance,
+    total_time,
+    version INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS roadtrips_author ON roadtrips (author, seq);
+CREATE INDEX IF NOT EXISTS roadtrips_category ON roadtrips (category, seq);
+CREATE VIRTUAL TABLE IF NOT EXISTS roadtrips_fts USING fts5 (
+    roadtrip_id UNINDEXED, title, category, author, waypoints
+);
+
+CREATE TABLE IF NOT EXISTS roadtrip_magazines (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    roadtrip_id TEXT NOT NULL,
+    magazine_id TEXT NOT NULL,
+    UNIQUE (roadtrip_id, magazine_id)
+);
+CREATE INDEX IF NOT EXISTS roadtrip_magazines_magazine ON roadtrip_magazines (magazine_id, seq);
+
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+-- tells this database from any other, e.g. one recreated at the same path
+INSERT OR IGNORE INTO meta (key, value) VALUES ('instance_id', lower(hex(randomblob(8))));
+
+CREATE TABLE IF NOT EXISTS changes (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    entity_id TEXT NOT NULL,
+    origin TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS changes_kind ON changes (kind, seq);
+'''
+
+
+class SQLiteStorage:
+    '''
+    A SQLite database in WAL mode shared by the SQLite catalogs.
+
+    Reads borrow a connection from a small pool, so readers never wait on
+    each other or on the writer. Writes go through one connection behind a
+    re-entrant lock, and `write()` blocks nest into the outermost
+    transaction. Every write also appends a row to `changes`, whose
+    sequence numbers act as the version of each kind of entity.
+
+    Entity rows are saved through `defer()`, so an entity changed by several
+    setters inside one `write()` block is written, and logged, once.
+
+    Several processes may share the file. `sync()` picks up the changes
+    committed by the others and hands them to the subscribed catalogs, which
+    drop the entities they hold for those ids.
+    '''
+
+    PRUNE_EVERY = 1000  # change rows written between two prunes
+    CHANGE_RETENTION = 100000  # change rows kept by a prune
+
+    def __init__(self, path: str, pool_size: int = 4):
+        self.__path = path
+        self.__origin = uuid.uuid4().hex  # tells this process' changes from the others'
+        self.__pool = queue.LifoQueue()
+        for _ in range(pool_size):
+            self.__pool.put(self.__connect())
+        self.__writer = self.__connect()
+        self.__write_lock = threading.RLock()
+        self.__write_depth = 0
+        self.__deferred = {}  # key -> write run once before the outermost commit, see defer
+        self.__watcher = self.__connect()  # only polls for commits of other connections
+        self.__sync_lock = threading.Lock()
+        self.__listeners = {}  # kind -> callbacks taking a changed id, or None when everything may have changed
+
+        self.__writer.executescript(SCHEMA)
+        self.__instance_id = self.__writer.execute("SELECT value FROM meta WHERE key = 'instance_id'").fetchone()[0]
+        self.__versions = dict(self.__writer.execute('SELECT kind, MAX(seq) FROM changes GROUP BY kind').fetchall())
+        self.__seen = max(self.__versions.values(), default=0)  # last change handed to the listeners
+        self.__data_version = self.__watcher.execute('PRAGMA data_version').fetchone()[0]
+
+    # Getters
+    def get_path(self):
+        return self.__path
+
+    def get_instance_id(self):
+        '''Random id stored with the schema, the same for every process sharing the file'''
+        return self.__instance_id
+
+    def get_change_version(self, kind: str):
+        return self.__versions.get(kind, 0)
+
+    # Setters
+    def subscribe(self, kind: str, callback):
+        self.__listeners.setdefault(kind, []).append(callback)
+
+    # Utility methods
+    @contextmanager
+    def read(self):
+        connection = self.__pool.get()
+        try:
+            yield connection
+        finally:
+            self.__pool.put(connection)
+
+    @contextmanager
+    def write(self):
+        with self.__write_lock:
+            outermost = self.__write_depth == 0
+            if outermost:
+                self.__writer.execute('BEGIN IMMEDIATE')
+            self.__write_depth += 1
+            try:
+                yield self.__writer
+                if outermost:
+                    # deferred writes may defer again, the loop runs until none is left
+                    while self.__deferred:
+                        self.__deferred.pop(next(iter(self.__deferred)))()
+            except BaseException:
+                self.__write_depth -= 1
+                if outermost:
+                    self.__deferred.clear()
+                    self.__writer.execute('ROLLBACK')
+                raise
+            self.__write_depth -= 1
+            if outermost:
+                self.__writer.execute('COMMIT')
+
+    def defer(self, key, write):
+        '''
+        Run `write()` once before the current transaction commits, however
+        many times it is deferred under the same key. Entities changed by
+        several setters in one write() block are saved once.
+        '''
+        with self.write():
+            self.__deferred.setdefault(key, write)
+
+    def record_change(self, connection, kind: str, entity_id: str):
+        '''Log a change inside the current write, returning its sequence number'''
+        seq = connection.execute(
+            'INSERT INTO changes (kind, entity_id, origin) VALUES (?, ?, ?)',
+            (kind, entity_id, self.__origin)).lastrowid
+        self.__versions[kind] = seq
+        if seq % self.PRUNE_EVERY == 0 and seq > self.CHANGE_RETENTION:
+            self.__prune(connection, seq - self.CHANGE_RETENTION)
+        return seq
+
+    def sync(self):
+        '''
+        Hand the changes other processes committed since the last call to the
+        listeners. Cheap when nothing changed: it only reads `data_version`.
+        '''
+        with self.__sync_lock:
+            data_version = self.__watcher.execute('PRAGMA data_version').fetchone()[0]
+            if data_version == self.__data_version:
+                return
+            self.__data_version = data_version
+
+            floor = self.__watcher.execute('PRAGMA user_version').fetchone()[0]
+            rows = self.__watcher.execute(
+                'SELECT seq, kind, entity_id, origin FROM changes WHERE seq > ? ORDER BY seq',
+                (self.__seen,)).fetchall()
+            if self.__seen < floor:
+                # the changes we missed were pruned, anything may be stale
+                for callbacks in self.__listeners.values():
+                    for callback in callbacks:
+                        callback(None)
+            for row in rows:
+                self.__versions[row['kind']] = max(self.__versions.get(row['kind'], 0), row['seq'])
+                if row['origin'] != self.__origin and self.__seen >= floor:
+                    for callback in self.__listeners.get(row['kind'], ()):
+                        callback(row['entity_id'])
+            if rows:
+                self.__seen = rows[-1]['seq']
+
+    def close(self):
+        while not self.__pool.empty():
+            self.__pool.get().close()
+        self.__writer.close()
+        self.__watcher.close()
+
+    def __prune(self, connection, floor: int):
+        # the latest change of each kind stays, it is that kind's version
+        connection.execute(
+            'DELETE FROM changes WHERE seq <= ? AND seq NOT IN (SELECT MAX(seq) FROM changes GROUP BY kind)',
+            (floor,))
+        # user_version is a free header field, it tells readers how far the log was pruned
+        connection.execute(f'PRAGMA user_version = {int(floor)}')
+
+    def __connect(self):
+        # isolation_level=None leaves transaction control to write()
+        connection = sqlite3.connect(
+            self.__path, check_same_thread=False, isolation_level=None, cached_statements=256)
+        connection.row_factory = sqlite3.Row
+        connection.execute('PRAGMA journal_mode = WAL')
+        connection.execute('PRAGMA synchronous = NORMAL')
+        connection.execute('PRAGMA busy_timeout = 5000')
+        return connection
@@ -1,21 +1,34 @@
 from .account import Account
+from .compact import pack_id
 from .landmark import Landmark
+from .ordered_collection import OrderedCollection
 
 class User(Account):
-    def __init__(self, email, username, password):
-        super().__init__(email, username, password)
-        self.__favorite_landmarks = []
+    __slots__ = ('__favorite_landmarks',)
+
+    NO_FAVORITES = OrderedCollection()  # shared until the first favorite
+
+    def __init__(self, email, username, password, id: str | None = None):
+        super().__init__(email, username, password, id)
+        self.__favorite_landmarks = self.NO_FAVORITES  # landmark key -> landmark
 
     # Getters
     def get_favorite_landmarks(self):
-        return self.__favorite_landmarks
+        return self.__favorite_landmarks.get_items()
+
+    def get_favorite_landmarks_page(self, after: int, limit: int):
+        return self.__favorite_landmarks.get_page(after, limit)
 
     def get_favorite_landmark_by_id(self, landmark_id: str):
-        return next((landmark for landmark in self.__favorite_landmarks if landmark.get_id() == landmark_id), None)
+        return self.__favorite_landmarks.get(pack_id(landmark_id))
 
     # Setters
     def add_favorite_landmark(self, new_favorite_landmark: Landmark):
-        self.__favorite_landmarks.append(new_favorite_landmark)
+        if self.__favorite_landmarks is self.NO_FAVORITES:
+            self.__favorite_landmarks = OrderedCollection()
+        self.__favorite_landmarks.add(new_favorite_landmark.get_key(), new_favorite_landmark)
+        self.bump_version()
 
     def remove_favorite_landmark(self, landmark: Landmark):
-        self.__favorite_landmarks.remove(landmark)
+        self.__favorite_landmarks.remove(landmark.get_key())
+        self.bump_version()
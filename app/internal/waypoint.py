@@ -2,6 +2,8 @@ from ..internal.landmark import Landmark
 
 
 class Waypoint(Landmark):
+    __slots__ = ('__note', '__description')
+
     def __init__(self, id: str, name: str, amenity: str, position: list, opening_hours: str, note: str, description: str):
         super().__init__(id, name, amenity, position, opening_hours)
         self.__note = note
@@ -17,6 +19,8 @@ class Waypoint(Landmark):
     # Setters
     def set_note(self, note: str):
         self.__note = note
+        self.bump_version()
 
     def set_description(self, description: str):
         self.__description = description
+        self.bump_version()
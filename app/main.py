@@ -1,10 +1,24 @@
+import asyncio
+import logging
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Depends, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, ORJSONResponse
+from starlette.concurrency import run_in_threadpool
 
-from .routers import users, auth, roadtrips, magazines, favorites, reviews, landmarks
+from .compression import CompressionMiddleware
+from .config import get_settings
+from .databases import journal, initialize
+from .dependencies import sync_storage
+from .routers import users, auth, roadtrips, magazines, favorites, reviews, landmarks, exports
+from .warmup import warm_up
 
-app = FastAPI()
+# handlers returning dicts are encoded by orjson, the hot ones return pre-encoded bytes
+app = FastAPI(default_response_class=ORJSONResponse, dependencies=[Depends(sync_storage)])
+app.state.ready = False
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
 
 app.add_middleware(
     CORSMiddleware,
@@ -15,6 +29,13 @@ app.add_middleware(
     expose_headers=["Authorization"]
 )
 
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=settings.COMPRESSION_MINIMUM_SIZE,
+    levels={"gzip": settings.GZIP_LEVEL, "br": settings.BROTLI_QUALITY, "zstd": settings.ZSTD_LEVEL},
+    cache_bytes=settings.COMPRESSION_CACHE_BYTES
+)
+
 app.include_router(users.router)
 app.include_router(auth.router)
 app.include_router(magazines.router)
@@ -22,8 +43,56 @@ app.include_router(roadtrips.router)
 app.include_router(landmarks.router)
 app.include_router(reviews.router)
 app.include_router(favorites.router)
+app.include_router(exports.router)
+
+
+async def snapshot_periodically():
+    while True:
+        await asyncio.sleep(settings.SNAPSHOT_CHECK_SECONDS)
+        if journal.get_record_count() >= settings.SNAPSHOT_EVERY:
+            # copy on the event loop a page at a time, letting requests run in between, and write off it
+            for state in journal.capture_pages():
+                await asyncio.sleep(0)
+            await run_in_threadpool(journal.write_snapshot, state)
+
+
+async def warm_up_then_ready():
+    try:
+        await warm_up()
+    except Exception:
+        # the data is already loaded, a failed warm-up only leaves the first requests slower
+        logger.exception("Warm-up failed, serving without it")
+    app.state.ready = True
+
+
+@app.on_event("startup")
+async def start():
+    # data must be loaded before the first request, the warm-up only makes requests faster
+    initialize()
+    app.state.warm_up_task = asyncio.create_task(warm_up_then_ready())
+    if journal is not None:
+        app.state.snapshot_task = asyncio.create_task(snapshot_periodically())
+
+
+@app.on_event("shutdown")
+async def stop_snapshots():
+    if journal is not None:
+        app.state.snapshot_task.cancel()
+        journal.close()
 
 
 @app.get("/")
 def read_root():
     return {"Hello": "world"}
+
+
+@app.get("/ready")
+async def read_ready():
+    '''
+    # Readiness probe
+
+    503 until the startup warm-up is done, then 200
+    '''
+    if not app.state.ready:
+        return JSONResponse(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, content={"status": "warming up"})
+    return {"status": "ready"}
@@ -0,0 +1,49 @@
+import base64
+from typing import Annotated
+
+from fastapi import HTTPException, Query, status
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+def encode_cursor(position: int | None):
+    if position is None:
+        return None
+    return base64.urlsafe_b64encode(str(position).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str | None):
+    if not cursor:
+        return 0
+    try:
+        position = int(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except ValueError:
+        position = -1
+    if position < 0:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+    return position
+
+
+def paginate_list(items: list, after: int, limit: int):
+    '''Page through an already materialized list, using offsets as positions'''
+    page = items[after:after + limit]
+    return page, after + limit if after + limit < len(items) else None
+
+
+class PageParams:
+    '''
+    Query parameters shared by every list endpoint
+
+    - limit: `int` page size
+    - cursor: `str` opaque `next_cursor` from the previous page
+    '''
+
+    def __init__(
+        self,
+        limit: Annotated[int, Query(ge=1, le=MAX_PAGE_SIZE)] = DEFAULT_PAGE_SIZE,
+        cursor: str | None = None
+    ):
+        self.limit = limit
+        self.after = decode_cursor(cursor)
@@ -0,0 +1,105 @@
+import math
+import time
+
+from fastapi import HTTPException, Request, status
+
+from .config import get_settings
+
+settings = get_settings()
+
+PERIODS = {
+    'second': 1,
+    'minute': 60,
+    'hour': 3600,
+    'day': 86400,
+}
+
+
+def parse_limit(limit: str):
+    '''`"10/minute"` -> `(tokens per second, burst)`'''
+    count, _, period = limit.partition('/')
+    burst = int(count)
+    return burst / PERIODS[period.strip()], burst
+
+
+class TokenBuckets:
+    '''
+    Token buckets by key, refilled at `rate` tokens per second up to `burst`.
+    Buckets are kept in order of last use, so the ones idle long enough to
+    be full again, which behave like no bucket at all, are dropped from the
+    front. Every check is amortised O(1).
+    '''
+
+    def __init__(self, rate: float, burst: int, max_keys: int):
+        self.__rate = rate
+        self.__burst = burst
+        self.__max_keys = max_keys
+        self.__refill_seconds = burst / rate
+        self.__buckets = {}  # key -> (tokens, updated at), least recently used first
+
+    # Getters
+    def get_size(self):
+        return len(self.__buckets)
+
+    # Utility methods
+    def take(self, key: str):
+        '''Take a token for `key`; returns 0 when allowed, else the seconds until one is available'''
+        now = time.monotonic()
+        self.__expire(now)
+
+        tokens, updated = self.__buckets.pop(key, (self.__burst, now))
+        tokens = min(self.__burst, tokens + (now - updated) * self.__rate)
+        if tokens >= 1:
+            tokens -= 1
+            wait = 0.0
+        else:
+            wait = (1 - tokens) / self.__rate
+        self.__buckets[key] = (tokens, now)
+
+        if len(self.__buckets) > self.__max_keys:
+            del self.__buckets[next(iter(self.__buckets))]
+        return wait
+
+    def __expire(self, now: float):
+        while self.__buckets:
+            key = next(iter(self.__buckets))
+            if now - self.__buckets[key][1] < self.__refill_seconds:
+                break
+            del self.__buckets[key]
+
+
+def client_ip(request: Request):
+    if settings.CLIENT_IP_HEADER:
+        forwarded = request.headers.get(settings.CLIENT_IP_HEADER)
+        if forwarded:
+            return forwarded.split(',')[0].strip()
+    return request.client.host if request.client is not None else 'unknown'
+
+
+class RateLimit:
+    '''
+    Limit of one route, from `RATE_LIMITS[route]`, applied per client IP
+    and per username. Used as a dependency it checks the client IP; the
+    route checks the username with `check_username` once it has read it.
+    Both run before any password hashing.
+    '''
+
+    def __init__(self, route: str):
+        rate, burst = parse_limit(settings.RATE_LIMITS[route])
+        self.__by_ip = TokenBuckets(rate, burst, settings.RATE_LIMIT_MAX_KEYS)
+        self.__by_username = TokenBuckets(rate, burst, settings.RATE_LIMIT_MAX_KEYS)
+
+    async def __call__(self, request: Request):
+        self.__enforce(self.__by_ip, client_ip(request))
+
+    def check_username(self, username: str):
+        self.__enforce(self.__by_username, username)
+
+    def __enforce(self, buckets: TokenBuckets, key: str):
+        wait = buckets.take(key)
+        if wait > 0:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many requests",
+                headers={"Retry-After": str(math.ceil(wait))},
+            )
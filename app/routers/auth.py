@@ -7,7 +7,8 @@ from fastapi.responses import JSONResponse
 
 from ..databases import accounts_collection, User
 from ..config import get_settings
-from ..utils import get_password_hash, create_access_token, verify_password
+from ..utils import hash_password, create_access_token, verify_and_update_password
+from ..rate_limit import RateLimit
 
 router = APIRouter(
     prefix="/auth",
@@ -21,16 +22,23 @@ router = APIRouter(
 
 settings = get_settings()
 
+register_limit = RateLimit('register')
+login_limit = RateLimit('login')
 
-def authenticate_user(username: str, password: str):
+
+async def authenticate_user(username: str, password: str):
     user = accounts_collection.get_account_by_username(username)
     if not user:
         return False
-    if not verify_password(password, user.get_password()):
+    valid, new_hash = await verify_and_update_password(password, user.get_password())
+    if not valid:
         return False
+    if new_hash is not None:
+        # the stored hash predates the configured scheme or cost
+        user.set_password(new_hash)
     return user
 
-@router.post("/register", status_code=status.HTTP_201_CREATED)
+@router.post("/register", status_code=status.HTTP_201_CREATED, dependencies=[Depends(register_limit)])
 async def register(body: dict):
     '''
     # Register a new user
@@ -55,13 +63,20 @@ async def register(body: dict):
     if not body["password"]:
         raise HTTPException(status_code=400, detail="Password is required")
 
+    register_limit.check_username(body["username"])
+
+    # check if user already exists, before paying for the hash
+    if accounts_collection.get_account_by_username(body["username"]):
+        raise HTTPException(
+            status_code=400, detail="User already exists")
+
     # create new user
     new_user = User(
         email=body["email"],
         username=body["username"],
-        password=get_password_hash(body["password"])
+        password=await hash_password(body["password"])
     )
-    # check if user already exists
+    # the username may have been taken while hashing
     if accounts_collection.get_account_by_username(new_user.get_username()):
         raise HTTPException(
             status_code=400, detail="User already exists")
@@ -85,7 +100,7 @@ async def register(body: dict):
         })
 
 
-@ router.post("/login", status_code=status.HTTP_200_OK)
+@ router.post("/login", status_code=status.HTTP_200_OK, dependencies=[Depends(login_limit)])
 async def login(
     form_data: Annotated[OAuth2PasswordRequestForm, Depends()]
 ):
@@ -97,7 +112,8 @@ async def login(
     - password: `str`
     '''
 
-    user = authenticate_user(form_data.username, form_data.password)
+    login_limit.check_username(form_data.username)
+    user = await authenticate_user(form_data.username, form_data.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
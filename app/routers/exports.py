@@ -0,0 +1,134 @@
+import asyncio
+from typing import Annotated
+
+from fastapi import APIRouter, HTTPException, status, Depends
+from fastapi.responses import StreamingResponse
+
+from ..databases import roadtrips_collection, landmarks_collection, accounts_collection
+from ..dependencies import get_current_user
+from ..pagination import MAX_PAGE_SIZE
+from ..serializers import (ViewParams, ROADTRIP_FIELDS, LANDMARK_FIELDS, LANDMARK_VIEWS, roadtrip_fragment,
+                           landmark_fragment, review_fragment, extend_fragment)
+
+NDJSON_MEDIA_TYPE = 'application/x-ndjson'
+
+router = APIRouter(
+    prefix="/exports",
+    tags=["exports"],
+    responses={
+        404: {
+            'message': 'Not Found'
+        }
+    },
+    dependencies=[Depends(get_current_user)]
+)
+
+
+async def stream_lines(get_page, encode, keep=None):
+    '''
+    Yield NDJSON one catalog page at a time. Each chunk is awaited by the
+    server before the next page is read, so a slow client slows the export
+    down instead of growing a buffer, and memory stays at one page. A
+    selective `keep` can leave many pages empty, so every page also ends
+    with a pause for other requests.
+    '''
+    after = 0
+    while True:
+        items, next_position = get_page(after, MAX_PAGE_SIZE)
+        lines = [encode(item) for item in items if keep is None or keep(item)]
+        if lines:
+            yield b'\n'.join(lines) + b'\n'
+        if next_position is None:
+            return
+        after = next_position
+        await asyncio.sleep(0)
+
+
+def ndjson_response(lines, filename: str):
+    return StreamingResponse(lines, media_type=NDJSON_MEDIA_TYPE, headers={
+        'Content-Disposition': f'attachment; filename="{filename}"'
+    })
+
+
+def check_user_exists(username: str):
+    if accounts_collection.get_account_by_username(username) is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+
+
+@router.get("/roadtrips", status_code=status.HTTP_200_OK)
+async def export_roadtrips(
+    view: Annotated[ViewParams, Depends()],
+    user: str | None = None,
+    category: str | None = None
+):
+    '''
+    # Stream every roadtrip as newline delimited JSON
+    @param user: `str` only roadtrips by this user
+    @param category: `str` only roadtrips of this category
+    @param view: `summary | full` summary skips waypoints
+    @param fields: `str` comma separated roadtrip fields to return
+    '''
+    fields = view.resolve(view.get_roadtrip_fields(), ROADTRIP_FIELDS)
+
+    if user:
+        check_user_exists(user)
+        lines = stream_lines(
+            lambda after, limit: roadtrips_collection.get_roadtrips_by_username_page(user, after, limit),
+            lambda roadtrip: roadtrip_fragment(roadtrip, fields),
+            (lambda roadtrip: roadtrip.get_category() == category) if category else None)
+    elif category:
+        lines = stream_lines(
+            lambda after, limit: roadtrips_collection.get_roadtrips_by_category_page(category, after, limit),
+            lambda roadtrip: roadtrip_fragment(roadtrip, fields))
+    else:
+        lines = stream_lines(
+            roadtrips_collection.get_roadtrips_page,
+            lambda roadtrip: roadtrip_fragment(roadtrip, fields))
+
+    return ndjson_response(lines, 'roadtrips.ndjson')
+
+
+@router.get("/landmarks", status_code=status.HTTP_200_OK)
+async def export_landmarks(view: Annotated[ViewParams, Depends()], amenity: str | None = None):
+    '''
+    # Stream every landmark as newline delimited JSON
+    @param amenity: `str` only landmarks with this amenity
+    @param view: `summary | full` summary skips reviews and ratings
+    @param fields: `str` comma separated landmark fields to return
+    '''
+    fields = view.resolve(LANDMARK_VIEWS[view.view], LANDMARK_FIELDS)
+
+    lines = stream_lines(
+        landmarks_collection.get_landmarks_page,
+        lambda landmark: landmark_fragment(landmark, fields),
+        (lambda landmark: landmark.get_amenity() == amenity) if amenity else None)
+
+    return ndjson_response(lines, 'landmarks.ndjson')
+
+
+@router.get("/reviews", status_code=status.HTTP_200_OK)
+async def export_reviews(user: str | None = None, min_rating: float | None = None):
+    '''
+    # Stream every review as newline delimited JSON
+    @param user: `str` only reviews written by this user
+    @param min_rating: `float` only reviews rated at least this
+    '''
+    if user:
+        check_user_exists(user)
+        get_page = lambda after, limit: landmarks_collection.get_reviews_by_reviewer_page(user, after, limit)
+    else:
+        get_page = landmarks_collection.get_reviews_page
+
+    def keep(entry):
+        rating = entry[1].get_rating()
+        return isinstance(rating, (int, float)) and rating >= min_rating
+
+    lines = stream_lines(
+        get_page,
+        lambda entry: extend_fragment(review_fragment(entry[1]), {
+            "landmark_id": entry[0].get_id(),
+            "landmark_name": entry[0].get_name()
+        }),
+        keep if min_rating is not None else None)
+
+    return ndjson_response(lines, 'reviews.ndjson')
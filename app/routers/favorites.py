@@ -4,6 +4,8 @@ from typing import Annotated
 from ..dependencies import get_current_user, User
 from ..databases import landmarks_collection
 from ..internal.landmark import Landmark
+from ..pagination import PageParams
+from ..serializers import LANDMARK_VIEWS, landmark_fragment, json_page_response
 
 router = APIRouter(
     prefix="/favorites",
@@ -18,18 +20,16 @@ router = APIRouter(
 
 
 @router.get("/", status_code=status.HTTP_200_OK)
-async def read_favorites(current_user: Annotated[User, Depends(get_current_user)]):
+async def read_favorites(page: Annotated[PageParams, Depends()], current_user: Annotated[User, Depends(get_current_user)]):
     '''
     # get all favorite landmarks by current user
+    @param limit: `int` page size
+    @param cursor: `str` `next_cursor` of the previous page
     '''
+    favorites, next_position = current_user.get_favorite_landmarks_page(page.after, page.limit)
 
-    return [{
-        "id": landmark.get_id(),
-        "name": landmark.get_name(),
-        "amenity": landmark.get_amenity(),
-        "position": landmark.get_position(),
-        "opening_hours": landmark.get_opening_hours(),
-    } for landmark in current_user.get_favorite_landmarks()]
+    return json_page_response(
+        [landmark_fragment(landmark, LANDMARK_VIEWS['summary']) for landmark in favorites], next_position)
 
 
 @router.post("/", status_code=status.HTTP_201_CREATED)
@@ -1,9 +1,14 @@
-from fastapi import APIRouter, HTTPException, status, Depends
-from typing import Annotated
+from fastapi import APIRouter, HTTPException, status, Depends, Query, Request
+from typing import Annotated, Literal
 
 from ..databases import landmarks_collection
 from ..internal.landmark import Landmark
 from ..dependencies import get_current_user, User
+from ..pagination import PageParams
+from ..serializers import LANDMARK_VIEWS, landmark_fragment, extend_fragment, encode_array, json_response, json_page_response
+from ..etags import make_etag, etag_headers, etag_matches, not_modified_response
+from ..bulk import BulkResults, InvalidItem, check_item_id, paced, read_bulk_items
+from ..batch import parse_ids, body_ids, batch_response
 
 
 router = APIRouter(
@@ -19,24 +24,16 @@ router = APIRouter(
 
 
 @router.get("/", status_code=status.HTTP_200_OK)
-async def read_landmarks(current_user: Annotated[User, Depends(get_current_user)]):
+async def read_landmarks(page: Annotated[PageParams, Depends()], current_user: Annotated[User, Depends(get_current_user)]):
     '''
     # get all landmarks
+    @param limit: `int` page size
+    @param cursor: `str` `next_cursor` of the previous page
     '''
+    landmarks, next_position = landmarks_collection.get_landmarks_page(page.after, page.limit)
 
-    return [{
-        "id": landmark.get_id(),
-        "name": landmark.get_name(),
-        "amenity": landmark.get_amenity(),
-        "position": landmark.get_position(),
-        "opening_hours": landmark.get_opening_hours(),
-        "reviews": [{
-            "id": review.get_id(),
-            "reviewer": review.get_reviewer(),
-            "review_text": review.get_review_text(),
-            "rating": review.get_rating()
-        } for review in landmark.get_reviews()]
-    } for landmark in landmarks_collection.get_landmarks()]
+    return json_page_response(
+        [landmark_fragment(landmark, LANDMARK_VIEWS['list']) for landmark in landmarks], next_position)
 
 
 @router.post("/", status_code=status.HTTP_201_CREATED)
@@ -62,8 +59,119 @@ async def create_landmark(body: dict, current_user: Annotated[User, Depends(get_
         'detail': 'Landmark created'
     }
 
+
+LANDMARK_TEXT_FIELDS = ('id', 'name', 'amenity', 'opening_hours')
+
+
+def check_landmark(item):
+    '''Why the item cannot become a landmark, or None'''
+    if isinstance(item, InvalidItem):
+        return item.detail
+    if not isinstance(item, dict):
+        return "Item must be an object"
+    # the path segments next to /landmarks/{landmark_id}
+    problem = check_item_id(item.get('id'), ('batch', 'bulk', 'nearby'))
+    if problem is not None:
+        return problem
+    for field in LANDMARK_TEXT_FIELDS:
+        if not isinstance(item.get(field), str):
+            return f"{field} must be a string"
+    position = item.get('position')
+    if (not isinstance(position, list) or len(position) != 2
+            or not all(isinstance(value, (int, float)) and not isinstance(value, bool) for value in position)):
+        return "position must be [lat, lon]"
+    if not (-90 <= position[0] <= 90 and -180 <= position[1] <= 180):
+        return "position is out of range"
+    if len(item) != len(LANDMARK_TEXT_FIELDS) + 1:
+        return f"Unknown fields: {', '.join(sorted(set(item) - {*LANDMARK_TEXT_FIELDS, 'position'}))}"
+    return None
+
+
+@router.post("/bulk", status_code=status.HTTP_200_OK)
+async def create_landmarks(request: Request, results: Literal['all', 'errors'] = 'all'):
+    '''
+    # create many landmarks at once
+
+    Body is a JSON array of landmark objects, or NDJSON (one per line) with
+    `Content-Type: application/x-ndjson`, at most 5000 items. Valid new
+    landmarks are added in a single operation, existing and repeated ids are
+    reported as duplicates. Ids are letters, digits and `._:-`.
+
+    @param results: `all | errors` errors only lists items that were not created
+    '''
+    items = await read_bulk_items(request)
+
+    outcome = BulkResults()
+    new_landmarks = []
+    seen = set()
+    async for index, item in paced(items):
+        problem = check_landmark(item)
+        if problem is not None:
+            outcome.invalid(index, problem)
+        elif item['id'] in seen or landmarks_collection.get_landmark_by_id(item['id']) is not None:
+            outcome.duplicate(index, item['id'])
+        else:
+            seen.add(item['id'])
+            new_landmarks.append(Landmark(**item))
+            outcome.created(index, item['id'])
+
+    if new_landmarks:
+        landmarks_collection.add_landmarks(new_landmarks)
+
+    return outcome.response(results)
+
+@router.get("/nearby", status_code=status.HTTP_200_OK)
+async def read_nearby_landmarks(
+    lat: Annotated[float, Query(ge=-90, le=90)],
+    lon: Annotated[float, Query(ge=-180, le=180)],
+    radius: Annotated[float, Query(gt=0, le=50000)] = 1000,
+    limit: Annotated[int, Query(ge=1, le=100)] = 20
+):
+    '''
+    # get the nearest landmarks to a point
+
+    @param lat: `float` latitude of the point
+    @param lon: `float` longitude of the point
+    @param radius: `float` search radius in meters
+    @param limit: `int` maximum number of landmarks
+    '''
+
+    return json_response(encode_array(
+        extend_fragment(landmark_fragment(landmark, LANDMARK_VIEWS['summary']), {"distance": round(distance, 1)})
+        for distance, landmark in landmarks_collection.get_nearby_landmarks(lat, lon, radius, limit)
+    ))
+
+
+@router.get("/batch", status_code=status.HTTP_200_OK)
+async def read_landmarks_batch(ids: str, view: Literal['summary', 'list', 'full'] = 'full'):
+    '''
+    # get many landmarks by id
+    @param ids: `str` comma separated landmark ids, ids not found are listed in `missing`
+    @param view: `summary | list | full` summary skips reviews and ratings
+    '''
+    landmark_ids = parse_ids(ids)
+
+    return batch_response(landmark_ids, landmarks_collection.get_landmarks_by_ids(landmark_ids),
+                          lambda landmark: landmark_fragment(landmark, LANDMARK_VIEWS[view]))
+
+
+@router.post("/batch", status_code=status.HTTP_200_OK)
+async def read_landmarks_batch_post(body: dict, view: Literal['summary', 'list', 'full'] = 'full'):
+    '''
+    # get many landmarks by id, for id lists too long for a query string
+    @param view: `summary | list | full` summary skips reviews and ratings
+
+    ### request body
+    - ids: `list` landmark ids, ids not found are listed in `missing`
+    '''
+    landmark_ids = body_ids(body)
+
+    return batch_response(landmark_ids, landmarks_collection.get_landmarks_by_ids(landmark_ids),
+                          lambda landmark: landmark_fragment(landmark, LANDMARK_VIEWS[view]))
+
+
 @router.get("/{landmark_id}", status_code=status.HTTP_200_OK)
-async def read_landmark(landmark_id: str, current_user: Annotated[User, Depends(get_current_user)]):
+async def read_landmark(landmark_id: str, request: Request, current_user: Annotated[User, Depends(get_current_user)]):
     '''
     # get landmark by id
 
@@ -75,17 +183,8 @@ async def read_landmark(landmark_id: str, current_user: Annotated[User, Depends(
     if not landmark:
         raise HTTPException(status_code=404, detail="Landmark not found")
 
-    return {
-        "id": landmark.get_id(),
-        "name": landmark.get_name(),
-        "amenity": landmark.get_amenity(),
-        "position": landmark.get_position(),
-        "opening_hours": landmark.get_opening_hours(),
-        "average_rating": landmark.get_average_rating(),
-        "reviews": [{
-            "id": review.get_id(),
-            "reviewer": review.get_reviewer(),
-            "review_text": review.get_review_text(),
-            "rating": review.get_rating()
-        } for review in landmark.get_reviews()]
-    }
\ No newline at end of file
+    etag = make_etag('landmark', landmark_id, landmark.get_version())
+    if etag_matches(request, etag):
+        return not_modified_response(etag)
+
+    return json_response(landmark_fragment(landmark, LANDMARK_VIEWS['full']), headers=etag_headers(etag))
@@ -1,11 +1,14 @@
-from fastapi import APIRouter, HTTPException, status, Depends
+from fastapi import APIRouter, HTTPException, status, Depends, Request
 from typing import Annotated
 
 from ..dependencies import check_admin_role, get_current_user
-from ..databases import magazines_collection, roadtrips_collection
+from ..databases import magazines_collection, roadtrips_collection, transaction
 
 from ..internal.admin import Admin
 from ..internal.magazine import Magazine
+from ..pagination import PageParams
+from ..serializers import ViewParams, MAGAZINE_FIELDS, MAGAZINE_DEFAULT_FIELDS, magazine_fragment, json_response, json_page_response
+from ..etags import make_etag, etag_headers, etag_matches, not_modified_response
 
 router = APIRouter(
     prefix="/magazines",
@@ -20,85 +23,57 @@ router = APIRouter(
 
 
 @router.get("/", status_code=status.HTTP_200_OK)
-async def get_magazines():
+async def get_magazines(request: Request, page: Annotated[PageParams, Depends()], view: Annotated[ViewParams, Depends()]):
     '''
     # get all magazine objects in magazine catalog
+    @param view: `summary | full` summary skips the waypoints of nested roadtrips
+    @param fields: `str` comma separated magazine fields to return
+    @param limit: `int` page size
+    @param cursor: `str` `next_cursor` of the previous page
     '''
-    magazines = magazines_collection.get_magazines()
-
-    return [
-        {
-            'id': magazine.get_id(),
-            'title': magazine.get_title(),
-            'description': magazine.get_description(),
-            'roadtrips': [
-                {
-                    'id': roadtrip.get_id(),
-                    'title': roadtrip.get_title(),
-                    'sub_title': roadtrip.get_sub_title(),
-                    'description': roadtrip.get_description(),
-                    'waypoints': [
-                        {
-                            'id': waypoint.get_id(),
-                            'name': waypoint.get_name(),
-                            'amenity': waypoint.get_amenity(),
-                            'opening_hours': waypoint.get_opening_hours(),
-                            'description': waypoint.get_description(),
-                            'position': waypoint.get_position(),
-                            'note': waypoint.get_note()
-                        } for waypoint in roadtrip.get_waypoints()
-                    ],
-                    'distance_between_waypoints': roadtrip.get_distance_between_waypoints(),
-                    'total_distance': roadtrip.get_total_distance(),
-                    'total_time': roadtrip.get_total_time(),
-                    'category': roadtrip.get_category(),
-                    'summary': roadtrip.get_summary(),
-                } for roadtrip in roadtrips_collection.get_roadtrips_by_magazine_id(magazine.get_id())
-            ]
-        } for magazine in magazines
-    ]
+    fields = view.resolve(MAGAZINE_DEFAULT_FIELDS, MAGAZINE_FIELDS)
+    # nested roadtrips make the listing depend on both catalogs
+    etag = make_etag('magazines', page.after, page.limit, fields, view.get_roadtrip_fields(),
+                     magazines_collection.get_version(), roadtrips_collection.get_version())
+    if etag_matches(request, etag):
+        return not_modified_response(etag)
+
+    magazines, next_position = magazines_collection.get_magazines_page(page.after, page.limit)
+
+    return json_page_response([
+        magazine_fragment(
+            magazine,
+            roadtrips_collection.get_roadtrips_by_magazine_id(magazine.get_id()),
+            fields,
+            view.get_roadtrip_fields()
+        ) for magazine in magazines
+    ], next_position, headers=etag_headers(etag))
 
 
 @router.get("/{magazine_id}", status_code=status.HTTP_200_OK)
-async def get_magazine_by_id(magazine_id: str):
+async def get_magazine_by_id(magazine_id: str, request: Request, view: Annotated[ViewParams, Depends()]):
     '''
     # get magazine by id
+    @param view: `summary | full` summary skips the waypoints of nested roadtrips
+    @param fields: `str` comma separated magazine fields to return
     '''
     magazine_exists = magazines_collection.get_magazine_by_id(magazine_id)
 
     if magazine_exists is None:
         raise HTTPException(status_code=404, detail="No magazines found")
 
-    return {
-        "id": magazine_exists.get_id(),
-        "title": magazine_exists.get_title(),
-        "description": magazine_exists.get_description(),
-        "roadtrips": [
-            {
-                'id': roadtrip.get_id(),
-                'title': roadtrip.get_title(),
-                'sub_title': roadtrip.get_sub_title(),
-                'description': roadtrip.get_description(),
-                'waypoints': [
-                    {
-                        'id': waypoint.get_id(),
-                        'name': waypoint.get_name(),
-                        'amenity': waypoint.get_amenity(),
-                        'opening_hours': waypoint.get_opening_hours(),
-                        'description': waypoint.get_description(),
-                        'position': waypoint.get_position(),
-                        'note': waypoint.get_note()
-                    } for waypoint in roadtrip.get_waypoints()
-                ],
-                'distance_between_waypoints': roadtrip.get_distance_between_waypoints(),
-                'total_distance': roadtrip.get_total_distance(),
-                'total_time': roadtrip.get_total_time(),
-                'category': roadtrip.get_category(),
-                'summary': roadtrip.get_summary(),
-            } for roadtrip in roadtrips_collection.get_roadtrips_by_magazine_id(magazine_exists.get_id())
-
-        ]
-    }
+    fields = view.resolve(MAGAZINE_DEFAULT_FIELDS, MAGAZINE_FIELDS)
+    etag = make_etag('magazine', magazine_id, fields, view.get_roadtrip_fields(),
+                     magazine_exists.get_version(), roadtrips_collection.get_version())
+    if etag_matches(request, etag):
+        return not_modified_response(etag)
+
+    return json_response(magazine_fragment(
+        magazine_exists,
+        roadtrips_collection.get_roadtrips_by_magazine_id(magazine_exists.get_id()),
+        fields,
+        view.get_roadtrip_fields()
+    ), headers=etag_headers(etag))
 
 
 @ router.post("/", status_code=status.HTTP_201_CREATED)
@@ -155,9 +130,10 @@ async def update_magazine(magazine_id: str, body: dict, current_user: Annotated[
     if magazine_exists is None:
         raise HTTPException(status_code=404, detail="Magazine not found")
 
-    magazine_exists.set_title(body.get("title", magazine_exists.get_title()))
-    magazine_exists.set_description(
-        body.get("description", magazine_exists.get_description()))
+    with transaction():
+        magazine_exists.set_title(body.get("title", magazine_exists.get_title()))
+        magazine_exists.set_description(
+            body.get("description", magazine_exists.get_description()))
 
     return {
         "detail": "magazine edited successfully",
@@ -175,6 +151,10 @@ async def delete_roadtrip(magazine_id: str, current_user: Annotated[Admin, Depen
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Magazine not found")
 
+    # detach the magazine from its roadtrips so the magazine index stays clean
+    for roadtrip in roadtrips_collection.get_roadtrips_by_magazine_id(magazine_id):
+        roadtrip.remove_magazine(magazine_exists)
+
     magazines_collection.remove_magazine(magazine_exists)
 
     return {
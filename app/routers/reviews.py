@@ -1,8 +1,13 @@
+import math
+from numbers import Real
+
 from fastapi import APIRouter, HTTPException, status, Depends
 from typing import Annotated
-from ..databases import landmarks_collection, accounts_collection
+from ..databases import landmarks_collection, accounts_collection, transaction
 from ..internal.review import Review
 from ..dependencies import get_current_user, User
+from ..pagination import PageParams
+from ..serializers import review_fragment, extend_fragment, json_page_response
 
 
 router = APIRouter(
@@ -17,10 +22,19 @@ router = APIRouter(
 )
 
 
+def check_rating(rating):
+    '''400 unless the rating is a finite number from 1 to 5, JSON bodies may carry NaN and Infinity'''
+    if not isinstance(rating, Real) or isinstance(rating, bool) or not math.isfinite(rating) or not 1 <= rating <= 5:
+        raise HTTPException(status_code=400, detail="rating must be a number from 1 to 5")
+
+
 @router.get('/',  status_code=status.HTTP_200_OK)
-async def read_reviews(user: str | None = None):
+async def read_reviews(page: Annotated[PageParams, Depends()], user: str | None = None):
     '''
     # get all reviews
+    @param user: `str` only reviews written by this user
+    @param limit: `int` page size
+    @param cursor: `str` `next_cursor` of the previous page
     '''
 
     if user:
@@ -28,30 +42,18 @@ async def read_reviews(user: str | None = None):
         if not user_exists:
             raise HTTPException(status_code=404, detail="User not found")
 
-        user_reviews = []
-
-        for landmark in landmarks_collection.get_landmarks():
-            for review in landmark.get_reviews():
-                if review.get_reviewer() == user:
-                    user_reviews.append({
-                        "id": review.get_id(),
-                        "reviewer": review.get_reviewer(),
-                        "review_text": review.get_review_text(),
-                        "rating": review.get_rating(),
-                        "landmark_id": landmark.get_id(),
-                        "landmark_name": landmark.get_name()
-                    })
-
-        return user_reviews
+        reviews, next_position = landmarks_collection.get_reviews_by_reviewer_page(
+            user, page.after, page.limit)
+    else:
+        reviews, next_position = landmarks_collection.get_reviews_page(
+            page.after, page.limit)
 
-    return [{
-        "id": review.get_id(),
-        "reviewer": review.get_reviewer(),
-        "review_text": review.get_review_text(),
-        "rating": review.get_rating(),
-        "landmark_id": landmark.get_id(),
-        "landmark_name": landmark.get_name()
-    } for landmark in landmarks_collection.get_landmarks() for review in landmark.get_reviews()]
+    return json_page_response([
+        extend_fragment(review_fragment(review), {
+            "landmark_id": landmark.get_id(),
+            "landmark_name": landmark.get_name()
+        }) for landmark, review in reviews
+    ], next_position)
 
 
 @router.post('/')
@@ -62,6 +64,7 @@ async def create_review(body: dict, current_user: Annotated[User, Depends(get_cu
 
     if not body:
         raise HTTPException(status_code=400, detail="Bad request")
+    check_rating(body.get('rating'))
 
     landmark_exists = landmarks_collection.get_landmark_by_id(
         body.get('landmark_id'))
@@ -96,6 +99,8 @@ async def edit_review(review_id, body: dict, current_user: Annotated[User, Depen
 
     if not body:
         raise HTTPException(status_code=400, detail="Bad request")
+    if 'rating' in body:
+        check_rating(body['rating'])
 
     landmark = landmarks_collection.get_landmark_by_review_id(review_id)
     if not landmark:
@@ -106,8 +111,9 @@ async def edit_review(review_id, body: dict, current_user: Annotated[User, Depen
     if review.get_reviewer() != current_user.get_username():
         raise HTTPException(403, "Forbidden")
 
-    review.set_review_text(body.get('review_text', review.get_review_text()))
-    review.set_rating(body.get('rating', review.get_rating()))
+    with transaction():
+        review.set_review_text(body.get('review_text', review.get_review_text()))
+        review.set_rating(body.get('rating', review.get_rating()))
 
     return {
         'detail': 'Review edited'
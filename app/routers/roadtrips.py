@@ -1,11 +1,23 @@
-from typing import Annotated
-from fastapi import APIRouter, HTTPException, status, Depends
+import time
+from typing import Annotated, Literal
+from fastapi import APIRouter, HTTPException, status, Depends, Request
+from starlette.concurrency import run_in_threadpool
 
-from ..databases import roadtrips_collection, magazines_collection, accounts_collection
-from ..dependencies import get_current_user, User
+from ..config import get_settings
+from ..databases import roadtrips_collection, magazines_collection, accounts_collection, transaction
+from ..dependencies import get_current_user, check_admin_role, User, Admin
 
+from ..internal.compact import is_uuid
 from ..internal.roadtrip import Roadtrip
 from ..internal.waypoint import Waypoint
+from ..internal.geometry import route_metrics_many, positions_array, distance_matrix
+from ..internal.route_optimizer import optimize_order, path_length
+from ..internal.spatial_index import parse_position
+from ..pagination import PageParams, paginate_list
+from ..serializers import ViewParams, ROADTRIP_FIELDS, roadtrip_fragment, roadtrip_state, json_response, json_page_response
+from ..etags import make_etag, etag_headers, etag_matches, not_modified_response
+from ..bulk import BulkResults, InvalidItem, paced, read_bulk_items
+from ..batch import parse_ids, body_ids, batch_response
 
 router = APIRouter(
     prefix="/roadtrips",
@@ -18,105 +30,190 @@ router = APIRouter(
     dependencies=[Depends(get_current_user)]
 )
 
+settings = get_settings()
+
+ROUTE_SPEED = settings.ROUTE_SPEED_KMH / 3.6  # meters per second
+RECOMPUTE_PAGE_SIZE = 10000
+
+ROADTRIP_TEXT_FIELDS = ('title', 'sub_title', 'description', 'category', 'summary')
+
+
+def check_text_fields(body: dict):
+    '''Raises ValueError when a text field of a request body is not a string'''
+    for field in ROADTRIP_TEXT_FIELDS:
+        if not isinstance(body.get(field, ''), str):
+            raise ValueError(f"{field} must be a string")
+
+
+def build_roadtrip(author: str, body: dict, roadtrip_id: str | None = None):
+    '''A new roadtrip from a request body, raises ValueError when the body is invalid'''
+    check_text_fields(body)
+
+    new_roadtrip = Roadtrip(author=author, id=roadtrip_id)
+
+    new_roadtrip.set_title(body.get('title', ''))
+    new_roadtrip.set_sub_title(body.get('sub_title', ''))
+    new_roadtrip.set_description(body.get('description', ''))
+    new_roadtrip.set_category(body.get('category', ''))
+    new_roadtrip.set_summary(body.get('summary', ''))
+    if body.get('waypoints'):
+        new_roadtrip.set_waypoints(parse_waypoints(body['waypoints']))
+
+    return new_roadtrip
+
+
+def parse_waypoints(items):
+    '''Waypoints of a request body, raises ValueError when one is invalid'''
+    try:
+        waypoints = [Waypoint(**waypoint) for waypoint in items]
+    except Exception as e:
+        raise ValueError(f"Invalid waypoints: {e}")
+    if not all(isinstance(waypoint.get_name(), str) for waypoint in waypoints):
+        raise ValueError("Invalid waypoints: name must be a string")
+    if not all(parse_position(waypoint.get_position()) is not None for waypoint in waypoints):
+        raise ValueError("Invalid waypoints: position must be [lat, lon]")
+    return waypoints
+
+
+def compute_routes(roadtrips: list):
+    '''
+    Fill the leg distances, total distance (meters) and total time (seconds)
+    of roadtrips from their waypoint positions, all in one vectorized pass.
+    Returns how many roadtrips changed.
+    '''
+    waypoint_lists = [roadtrip.get_waypoints() for roadtrip in roadtrips]
+    return apply_routes(roadtrips, waypoint_lists, measure_routes(waypoint_lists))
+
+
+def measure_routes(waypoint_lists: list):
+    return route_metrics_many(waypoint_lists, ROUTE_SPEED, settings.ROUTE_DISTANCE_METHOD)
+
+
+def apply_routes(roadtrips: list, waypoint_lists: list, routes: list):
+    '''Set routes measured from `waypoint_lists`, skipping roadtrips whose waypoints were replaced since'''
+    changed = 0
+    for roadtrip, waypoints, route in zip(roadtrips, waypoint_lists, routes):
+        if roadtrip.get_waypoints() is not waypoints:
+            continue
+        if route != (roadtrip.get_distance_between_waypoints(), roadtrip.get_total_distance(), roadtrip.get_total_time()):
+            roadtrip.set_route(*route)
+            changed += 1
+    return changed
+
+
+def plan_order(positions, pin_start: bool, pin_end: bool):
+    '''
+    The optimized order of positions with the path lengths before and after,
+    in meters. Haversine distances are close enough to rank orders, and
+    building the matrix counts against the time budget.
+    '''
+    started = time.perf_counter()
+    matrix = distance_matrix(positions, 'haversine')
+    time_budget = settings.OPTIMIZE_TIME_BUDGET_MS / 1000 - (time.perf_counter() - started)
+    order = optimize_order(matrix, pin_start, pin_end, max(time_budget, 0.0))
+    return order, path_length(matrix, range(len(positions))), path_length(matrix, order)
+
+
+async def optimize_waypoints(waypoints: list, pin_start: bool, pin_end: bool):
+    if len(waypoints) > settings.OPTIMIZE_MAX_WAYPOINTS:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                            detail=f"At most {settings.OPTIMIZE_MAX_WAYPOINTS} waypoints can be optimized")
+    # the search is CPU bound, it runs off the event loop on a snapshot of the positions
+    order, before, after = await run_in_threadpool(plan_order, positions_array(waypoints), pin_start, pin_end)
+    return order, {
+        "order": order,
+        "waypoint_ids": [waypoints[index].get_id() for index in order],
+        "distance_before": round(before, 1),
+        "distance_after": round(after, 1),
+        "distance_saved": round(before - after, 1),
+    }
+
 
 @router.get("/", status_code=status.HTTP_200_OK)
-async def read_roadtrips(user: str | None = None, search: str | None = None):
+async def read_roadtrips(
+    request: Request,
+    page: Annotated[PageParams, Depends()],
+    view: Annotated[ViewParams, Depends()],
+    user: str | None = None,
+    search: str | None = None
+):
     '''
     # Get all roadtrips
+    @param user: `str` only roadtrips by this user
+    @param search: `str` keywords, results are ranked best match first
+    @param view: `summary | full` summary skips waypoints
+    @param fields: `str` comma separated roadtrip fields to return
+    @param limit: `int` page size
+    @param cursor: `str` `next_cursor` of the previous page
     '''
+    fields = view.resolve(view.get_roadtrip_fields(), ROADTRIP_FIELDS)
+
+    if user and not accounts_collection.get_account_by_username(user):
+        raise HTTPException(status_code=404, detail="User not found")
+
+    etag = make_etag('roadtrips', page.after, page.limit, fields, user, search, roadtrips_collection.get_version())
+    if etag_matches(request, etag):
+        return not_modified_response(etag)
+
     if search:
-        return [
-            {
-                'id': roadtrip.get_id(),
-                'title': roadtrip.get_title(),
-                'sub_title': roadtrip.get_sub_title(),
-                'author': roadtrip.get_author(),
-                'waypoints': [
-                    {
-                        'id': waypoint.get_id(),
-                        'name': waypoint.get_name(),
-                        'description': waypoint.get_description(),
-                        'position': waypoint.get_position(),
-                        'amenity': waypoint.get_amenity(),
-                        'opening_hours': waypoint.get_opening_hours(),
-                        'note': waypoint.get_note(),
-                    } for waypoint in roadtrip.get_waypoints()
-                ],
-                'distance_between_waypoints': roadtrip.get_distance_between_waypoints(),
-                'total_distance': roadtrip.get_total_distance(),
-                'total_time': roadtrip.get_total_time(),
-                'description': roadtrip.get_description(),
-                'category': roadtrip.get_category(),
-                'summary': roadtrip.get_summary()
-            }
-            for roadtrip in roadtrips_collection.get_roadtrips_by_keyword(search)
-        ]
-
-    if user:
-        user_exists = accounts_collection.get_account_by_username(user)
-        if not user_exists:
-            raise HTTPException(status_code=404, detail="User not found")
-
-        return [
-            {
-                'id': roadtrip.get_id(),
-                'title': roadtrip.get_title(),
-                'sub_title': roadtrip.get_sub_title(),
-                'author': roadtrip.get_author(),
-                'waypoints': [
-                    {
-                        'id': waypoint.get_id(),
-                        'name': waypoint.get_name(),
-                        'description': waypoint.get_description(),
-                        'position': waypoint.get_position(),
-                        'amenity': waypoint.get_amenity(),
-                        'opening_hours': waypoint.get_opening_hours(),
-                        'note': waypoint.get_note(),
-                    } for waypoint in roadtrip.get_waypoints()
-                ],
-                'distance_between_waypoints': roadtrip.get_distance_between_waypoints(),
-                'total_distance': roadtrip.get_total_distance(),
-                'total_time': roadtrip.get_total_time(),
-                'description': roadtrip.get_description(),
-                'category': roadtrip.get_category(),
-                'summary': roadtrip.get_summary()
-            }
-            for roadtrip in roadtrips_collection.get_roadtrips_by_username(user_exists.get_username())
-        ]
-
-    return [
-        {
-            'id': roadtrip.get_id(),
-            'title': roadtrip.get_title(),
-            'sub_title': roadtrip.get_sub_title(),
-            'author': roadtrip.get_author(),
-            'waypoints': [
-                {
-                    'id': waypoint.get_id(),
-                    'name': waypoint.get_name(),
-                    'description': waypoint.get_description(),
-                    'position': waypoint.get_position(),
-                    'amenity': waypoint.get_amenity(),
-                    'opening_hours': waypoint.get_opening_hours(),
-                    'note': waypoint.get_note(),
-                } for waypoint in roadtrip.get_waypoints()
-            ],
-            'distance_between_waypoints': roadtrip.get_distance_between_waypoints(),
-            'total_distance': roadtrip.get_total_distance(),
-            'total_time': roadtrip.get_total_time(),
-            'description': roadtrip.get_description(),
-            'category': roadtrip.get_category(),
-            'summary': roadtrip.get_summary()
-        }
-        for roadtrip in roadtrips_collection.get_roadtrips()
-    ]
+        roadtrips, next_position = paginate_list(
+            roadtrips_collection.get_roadtrips_by_keyword(search), page.after, page.limit)
+
+    elif user:
+        roadtrips, next_position = roadtrips_collection.get_roadtrips_by_username_page(
+            user, page.after, page.limit)
+
+    else:
+        roadtrips, next_position = roadtrips_collection.get_roadtrips_page(
+            page.after, page.limit)
+
+    return json_page_response([roadtrip_fragment(roadtrip, fields) for roadtrip in roadtrips], next_position,
+                              headers=etag_headers(etag))
+
+
+@router.get("/batch", status_code=status.HTTP_200_OK)
+async def read_roadtrips_batch(request: Request, ids: str, view: Annotated[ViewParams, Depends()]):
+    '''
+    # Get many roadtrips by id
+    @param ids: `str` comma separated roadtrip ids, ids not found are listed in `missing`
+    @param view: `summary | full` summary skips waypoints
+    @param fields: `str` comma separated roadtrip fields to return
+    '''
+    roadtrip_ids = parse_ids(ids)
+    fields = view.resolve(view.get_roadtrip_fields(), ROADTRIP_FIELDS)
+
+    etag = make_etag('roadtrips-batch', roadtrip_ids, fields, roadtrips_collection.get_version())
+    if etag_matches(request, etag):
+        return not_modified_response(etag)
+
+    return batch_response(roadtrip_ids, roadtrips_collection.get_roadtrips_by_ids(roadtrip_ids),
+                          lambda roadtrip: roadtrip_fragment(roadtrip, fields), headers=etag_headers(etag))
+
+
+@router.post("/batch", status_code=status.HTTP_200_OK)
+async def read_roadtrips_batch_post(body: dict, view: Annotated[ViewParams, Depends()]):
+    '''
+    # Get many roadtrips by id, for id lists too long for a query string
+    @param view: `summary | full` summary skips waypoints
+    @param fields: `str` comma separated roadtrip fields to return
+
+    ### request body
+    - ids: `list` roadtrip ids, ids not found are listed in `missing`
+    '''
+    roadtrip_ids = body_ids(body)
+    fields = view.resolve(view.get_roadtrip_fields(), ROADTRIP_FIELDS)
+
+    return batch_response(roadtrip_ids, roadtrips_collection.get_roadtrips_by_ids(roadtrip_ids),
+                          lambda roadtrip: roadtrip_fragment(roadtrip, fields))
 
 
 @router.get("/{roadtrip_id}", status_code=status.HTTP_200_OK)
-async def read_roadtrip(roadtrip_id: str):
+async def read_roadtrip(roadtrip_id: str, request: Request, view: Annotated[ViewParams, Depends()]):
     '''
     # Get a roadtrip by id
     @param roadtrip_id: `str` id of the roadtrip
+    @param view: `summary | full` summary skips waypoints
+    @param fields: `str` comma separated roadtrip fields to return
     '''
     roadtrip_exists = roadtrips_collection.get_roadtrip_by_id(roadtrip_id)
 
@@ -124,30 +221,12 @@ async def read_roadtrip(roadtrip_id: str):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Roadtrip not found")
 
-    return {
-        'id': roadtrip_exists.get_id(),
-        'title': roadtrip_exists.get_title(),
-        'sub_title': roadtrip_exists.get_sub_title(),
-        'description': roadtrip_exists.get_description(),
-        'waypoints': [
-            {
-                'id': waypoint.get_id(),
-                'name': waypoint.get_name(),
-                'amenity': waypoint.get_amenity(),
-                'opening_hours': waypoint.get_opening_hours(),
-                'description': waypoint.get_description(),
-                'position': waypoint.get_position(),
-                'note': waypoint.get_note(),
-            } for waypoint in roadtrip_exists.get_waypoints()
-        ],
-        'distance_between_waypoints': roadtrip_exists.get_distance_between_waypoints(),
-        'total_distance': roadtrip_exists.get_total_distance(),
-        'total_time': roadtrip_exists.get_total_time(),
-        'category': roadtrip_exists.get_category(),
-        'description': roadtrip_exists.get_description(),
-        'summary': roadtrip_exists.get_summary(),
-        'author': roadtrip_exists.get_author()
-    }
+    fields = view.resolve(view.get_roadtrip_fields(), ROADTRIP_FIELDS)
+    etag = make_etag('roadtrip', roadtrip_id, fields, roadtrip_state(roadtrip_exists, fields))
+    if etag_matches(request, etag):
+        return not_modified_response(etag)
+
+    return json_response(roadtrip_fragment(roadtrip_exists, fields), headers=etag_headers(etag))
 
 
 @router.post("/", status_code=status.HTTP_201_CREATED)
@@ -161,32 +240,18 @@ async def create_roadtrip(body: dict, current_user: Annotated[User, Depends(get_
     - description: `str`
     - category: `str`
     - summary: `str`
+    - waypoints: `list` leg distances, total distance and total time are computed from their positions
     '''
     if not body:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST, detail="Body is required")
 
-    new_roadtrip = Roadtrip(
-        author=current_user.get_username(),
-    )
-
-    new_roadtrip.set_title(body.get('title', ''))
-    new_roadtrip.set_sub_title(body.get('sub_title', ''))
-    new_roadtrip.set_description(body.get('description', ''))
-    new_roadtrip.set_category(body.get('category', ''))
-    new_roadtrip.set_total_distance(body.get('total_distance', 0))
-    new_roadtrip.set_total_time(body.get('total_time', 0))
-    new_roadtrip.set_summary(body.get('summary', ''))
-    new_roadtrip.set_distance_between_waypoints(
-        body.get('distance_between_waypoints', []))
-    if body.get('waypoints'):
-        try:
-            waypoints = [Waypoint(**waypoint)
-                         for waypoint in body['waypoints']]
-            new_roadtrip.set_waypoints(waypoints)
-        except Exception as e:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST, detail=f"Invalid waypoints: {e}")
+    try:
+        new_roadtrip = build_roadtrip(current_user.get_username(), body)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    compute_routes([new_roadtrip])
 
     roadtrips_collection.add_roadtrip(new_roadtrip)
 
@@ -196,6 +261,150 @@ async def create_roadtrip(body: dict, current_user: Annotated[User, Depends(get_
     }
 
 
+@router.post("/bulk", status_code=status.HTTP_200_OK)
+async def create_roadtrips(
+    request: Request,
+    current_user: Annotated[User, Depends(get_current_user)],
+    results: Literal['all', 'errors'] = 'all'
+):
+    '''
+    # Create many roadtrips at once
+
+    Body is a JSON array of roadtrip objects as for `POST /roadtrips/`, or
+    NDJSON (one per line) with `Content-Type: application/x-ndjson`, at most
+    5000 items. An item may carry its own `id`, a UUID, so a retried import
+    reports it as a duplicate instead of adding it twice. Valid new
+    roadtrips are added in a single operation.
+
+    @param results: `all | errors` errors only lists items that were not created
+    '''
+    items = await read_bulk_items(request)
+
+    outcome = BulkResults()
+    new_roadtrips = []
+    seen = set()
+    async for index, item in paced(items):
+        if isinstance(item, InvalidItem):
+            outcome.invalid(index, item.detail)
+            continue
+        if not isinstance(item, dict):
+            outcome.invalid(index, "Item must be an object")
+            continue
+        roadtrip_id = item.get('id')
+        if roadtrip_id is not None and not is_uuid(roadtrip_id):
+            outcome.invalid(index, "id must be a UUID")
+            continue
+        if roadtrip_id is not None and (roadtrip_id in seen or roadtrips_collection.get_roadtrip_by_id(roadtrip_id)):
+            outcome.duplicate(index, roadtrip_id)
+            continue
+        try:
+            new_roadtrip = build_roadtrip(current_user.get_username(), item, roadtrip_id)
+        except ValueError as e:
+            outcome.invalid(index, str(e))
+            continue
+        seen.add(new_roadtrip.get_id())
+        new_roadtrips.append(new_roadtrip)
+        outcome.created(index, new_roadtrip.get_id())
+
+    if new_roadtrips:
+        waypoint_lists = [roadtrip.get_waypoints() for roadtrip in new_roadtrips]
+        routes = await run_in_threadpool(measure_routes, waypoint_lists)
+        apply_routes(new_roadtrips, waypoint_lists, routes)
+        roadtrips_collection.add_roadtrips(new_roadtrips)
+
+    return outcome.response(results)
+
+
+@router.post("/routes/recompute", status_code=status.HTTP_200_OK)
+async def recompute_routes(current_user: Annotated[Admin, Depends(check_admin_role)]):
+    '''
+    # Recompute the distances and times of every roadtrip from its waypoints
+    '''
+    checked = changed = 0
+    after = 0
+    while after is not None:
+        roadtrips, after = roadtrips_collection.get_roadtrips_page(after, RECOMPUTE_PAGE_SIZE)
+        waypoint_lists = [roadtrip.get_waypoints() for roadtrip in roadtrips]
+        # the vectorized pass runs off the event loop, the results are applied on it
+        routes = await run_in_threadpool(measure_routes, waypoint_lists)
+        with transaction():
+            changed += apply_routes(roadtrips, waypoint_lists, routes)
+        checked += len(roadtrips)
+
+    return {
+        "detail": "Routes recomputed",
+        "roadtrips": checked,
+        "changed": changed
+    }
+
+
+@router.post("/optimize", status_code=status.HTTP_200_OK)
+async def optimize_waypoint_order(body: dict, pin_start: bool = False, pin_end: bool = False):
+    '''
+    # Find a short order for waypoints, without storing anything
+    @param pin_start: `bool` keep the first waypoint first
+    @param pin_end: `bool` keep the last waypoint last
+
+    ### request body
+    - waypoints: `list` waypoints as for `POST /roadtrips/`
+
+    `order` lists indices into the given waypoints, distances are haversine meters
+    '''
+    if not body or not isinstance(body.get('waypoints'), list):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="waypoints is required")
+    try:
+        waypoints = parse_waypoints(body['waypoints'])
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    _, result = await optimize_waypoints(waypoints, pin_start, pin_end)
+    return result
+
+
+@router.post("/{roadtrip_id}/optimize", status_code=status.HTTP_200_OK)
+async def optimize_roadtrip(
+    roadtrip_id: str,
+    current_user: Annotated[User, Depends(get_current_user)],
+    pin_start: bool = False,
+    pin_end: bool = False
+):
+    '''
+    # Reorder the waypoints of a roadtrip into a short route
+    @param roadtrip_id: `str` id of the roadtrip
+    @param pin_start: `bool` keep the first waypoint first
+    @param pin_end: `bool` keep the last waypoint last
+
+    `order` lists indices into the previous waypoint order, distances are haversine meters
+    '''
+    roadtrip_exists = roadtrips_collection.get_roadtrip_by_id(roadtrip_id)
+
+    if not roadtrip_exists:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Roadtrip not found")
+
+    if roadtrip_exists.get_author() != current_user.get_username():
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN, detail="You don't have permission to update this roadtrip")
+
+    waypoints = roadtrip_exists.get_waypoints()
+    order, result = await optimize_waypoints(waypoints, pin_start, pin_end)
+    if roadtrip_exists.get_waypoints() is not waypoints:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT, detail="Roadtrip changed while optimizing, try again")
+
+    if order != list(range(len(waypoints))):
+        with transaction():
+            roadtrip_exists.set_waypoints([waypoints[index] for index in order])
+            compute_routes([roadtrip_exists])
+
+    return {
+        "detail": "Roadtrip optimized",
+        **result
+    }
+
+
 @router.patch("/{roadtrip_id}", status_code=status.HTTP_200_OK)
 async def update_roadtrip(roadtrip_id: str, body: dict, current_user: Annotated[User, Depends(get_current_user)]):
     '''
@@ -226,30 +435,29 @@ async def update_roadtrip(roadtrip_id: str, body: dict, current_user: Annotated[
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN, detail="You don't have permission to update this roadtrip")
 
-    # Update Roadtrip attributes with values from the request body
-    roadtrip_exists.set_title(body.get('title', roadtrip_exists.get_title()))
-    roadtrip_exists.set_sub_title(
-        body.get('sub_title', roadtrip_exists.get_sub_title()))
-    roadtrip_exists.set_description(
-        body.get('description', roadtrip_exists.get_description()))
-    roadtrip_exists.set_category(
-        body.get('category', roadtrip_exists.get_category()))
-    roadtrip_exists.set_summary(
-        body.get('summary', roadtrip_exists.get_summary()))
-    roadtrip_exists.set_total_distance(
-        body.get('total_distance', roadtrip_exists.get_total_distance()))
-    roadtrip_exists.set_total_time(
-        body.get('total_time', roadtrip_exists.get_total_time()))
-    roadtrip_exists.set_distance_between_waypoints(
-        body.get('distance_between_waypoints', roadtrip_exists.get_distance_between_waypoints()))
-    if body.get('waypoints'):
-        try:
-            waypoints = [Waypoint(**waypoint)
-                         for waypoint in body['waypoints']]
+    # the whole body is checked before anything changes, so a bad field leaves the roadtrip as it was
+    try:
+        check_text_fields(body)
+        waypoints = parse_waypoints(body['waypoints']) if body.get('waypoints') else None
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    # Update Roadtrip attributes with values from the request body, in a single write
+    with transaction():
+        if 'title' in body:
+            roadtrip_exists.set_title(body['title'])
+        if 'sub_title' in body:
+            roadtrip_exists.set_sub_title(body['sub_title'])
+        if 'description' in body:
+            roadtrip_exists.set_description(body['description'])
+        if 'category' in body:
+            roadtrip_exists.set_category(body['category'])
+        if 'summary' in body:
+            roadtrip_exists.set_summary(body['summary'])
+        if waypoints is not None:
             roadtrip_exists.set_waypoints(waypoints)
-        except Exception as e:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST, detail=f"Invalid waypoints: {e}")
+        compute_routes([roadtrip_exists])
 
     return {
         "detail": "Roadtrip updated successfully",
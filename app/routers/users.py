@@ -3,6 +3,9 @@ from typing import Annotated
 
 from ..databases import accounts_collection
 from ..dependencies import get_current_user, User, check_admin_role, Admin
+from ..pagination import PageParams
+from ..serializers import encode, json_page_response
+from ..batch import parse_ids, body_ids, batch_response
 
 router = APIRouter(
     prefix="/users",
@@ -15,20 +18,48 @@ router = APIRouter(
 )
 
 
+def profile_fragment(user):
+    return encode({
+        'id': user.get_id(),
+        'username': user.get_username(),
+        'email': user.get_email()
+    })
+
+
 @router.get('/', status_code=status.HTTP_200_OK)
-async def read_users(isAdmin: Annotated[bool, Depends(check_admin_role)]):
+async def read_users(page: Annotated[PageParams, Depends()], isAdmin: Annotated[bool, Depends(check_admin_role)]):
     '''
     # Get all users
+    @param limit: `int` page size
+    @param cursor: `str` `next_cursor` of the previous page
     '''
+    users, next_position = accounts_collection.get_accounts_page(page.after, page.limit)
 
-    return [
-        {
-            'id': user.get_id(),
-            'username': user.get_username(),
-            'email': user.get_email()
-        }
-        for user in accounts_collection.get_accounts()
-    ]
+    return json_page_response([profile_fragment(user) for user in users], next_position)
+
+
+@router.get('/batch', status_code=status.HTTP_200_OK, dependencies=[Depends(get_current_user)])
+async def read_users_batch(ids: str):
+    '''
+    # Get many profiles by user id
+    @param ids: `str` comma separated user ids, ids not found are listed in `missing`
+    '''
+    user_ids = parse_ids(ids)
+
+    return batch_response(user_ids, accounts_collection.get_accounts_by_ids(user_ids), profile_fragment)
+
+
+@router.post('/batch', status_code=status.HTTP_200_OK, dependencies=[Depends(get_current_user)])
+async def read_users_batch_post(body: dict):
+    '''
+    # Get many profiles by user id, for id lists too long for a query string
+
+    ### request body
+    - ids: `list` user ids, ids not found are listed in `missing`
+    '''
+    user_ids = body_ids(body)
+
+    return batch_response(user_ids, accounts_collection.get_accounts_by_ids(user_ids), profile_fragment)
 
 
 @router.get('/profile', status_code=status.HTTP_200_OK)
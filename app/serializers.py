@@ -0,0 +1,254 @@
+from collections import OrderedDict
+from typing import Literal
+from weakref import ref
+
+import orjson
+from fastapi import HTTPException, Response, status
+
+from .config import get_settings
+from .internal.roadtrip import Roadtrip
+from .internal.waypoint import Waypoint
+from .internal.landmark import Landmark
+from .internal.review import Review
+from .internal.magazine import Magazine
+from .pagination import encode_cursor
+
+
+class FragmentCache:
+    '''
+    LRU of encoded entity fragments, bounded in bytes across all entities.
+    Entries are keyed by entity identity and field set, and hold the entity
+    weakly so a recycled object id never serves another entity's bytes.
+    '''
+
+    ENTRY_OVERHEAD = 200  # bytes of key, weakref and bookkeeping per entry, roughly
+
+    def __init__(self, max_bytes: int):
+        self.__entries = OrderedDict()  # (id(entity), fields) -> (entity weakref, state, fragment)
+        self.__size = 0
+        self.__max_bytes = max_bytes
+
+    # Getters
+    def get(self, entity, fields: tuple, state):
+        key = (id(entity), fields)
+        entry = self.__entries.get(key)
+        if entry is None or entry[0]() is not entity or entry[1] != state:
+            return None
+        self.__entries.move_to_end(key)
+        return entry[2]
+
+    def get_size(self):
+        return self.__size
+
+    # Setters
+    def put(self, entity, fields: tuple, state, fragment: bytes):
+        size = len(fragment) + self.ENTRY_OVERHEAD
+        if size > self.__max_bytes:
+            return
+        key = (id(entity), fields)
+        old = self.__entries.pop(key, None)
+        if old is not None:
+            self.__size -= len(old[2]) + self.ENTRY_OVERHEAD
+        self.__entries[key] = (ref(entity), state, fragment)
+        self.__size += size
+        while self.__size > self.__max_bytes:
+            _, evicted = self.__entries.popitem(last=False)
+            self.__size -= len(evicted[2]) + self.ENTRY_OVERHEAD
+
+    def clear(self):
+        self.__entries.clear()
+        self.__size = 0
+
+
+fragment_cache = FragmentCache(get_settings().FRAGMENT_CACHE_BYTES)
+
+
+def encode(value):
+    # compact UTF-8 like json.dumps(ensure_ascii=False), int keys for the rating histogram
+    return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS)
+
+
+def encode_array(fragments):
+    return b'[' + b','.join(fragments) + b']'
+
+
+def extend_fragment(fragment: bytes, extra: dict):
+    '''Append the keys of `extra` to an encoded JSON object'''
+    if fragment == b'{}':
+        return encode(extra)
+    return fragment[:-1] + b',' + encode(extra)[1:]
+
+
+def cached_fragment(entity, fields: tuple, state, build):
+    '''
+    Return the encoded fragment of `entity` for `fields`, rebuilding it only
+    when `state` (the entity version counters) moved on since it was cached
+    '''
+    fragment = fragment_cache.get(entity, fields, state)
+    if fragment is None:
+        fragment = build()
+        fragment_cache.put(entity, fields, state, fragment)
+    return fragment
+
+
+def build_object(builders: dict, entity, fields: tuple):
+    '''
+    Encode the chosen fields of an entity. A builder may return an already
+    encoded fragment (bytes), which is spliced in as is.
+    '''
+    members = []
+    for field in fields:
+        value = builders[field](entity)
+        members.append(encode(field) + b':' + (value if isinstance(value, bytes) else encode(value)))
+    return b'{' + b','.join(members) + b'}'
+
+
+def json_response(fragment: bytes, status_code: int = 200, headers: dict | None = None):
+    return Response(content=fragment, status_code=status_code, media_type='application/json', headers=headers)
+
+
+def json_page_response(fragments, next_position: int | None, headers: dict | None = None):
+    return json_response(
+        b'{"items":' + encode_array(fragments) + b',"next_cursor":' + encode(encode_cursor(next_position)) + b'}',
+        headers=headers)
+
+
+# Waypoints
+WAYPOINT_FIELDS = {
+    'id': lambda waypoint: waypoint.get_id(),
+    'name': lambda waypoint: waypoint.get_name(),
+    'description': lambda waypoint: waypoint.get_description(),
+    'position': lambda waypoint: waypoint.get_position(),
+    'amenity': lambda waypoint: waypoint.get_amenity(),
+    'opening_hours': lambda waypoint: waypoint.get_opening_hours(),
+    'note': lambda waypoint: waypoint.get_note(),
+}
+
+WAYPOINT_DEFAULT_FIELDS = tuple(WAYPOINT_FIELDS)
+
+
+def waypoint_fragment(waypoint: Waypoint):
+    return cached_fragment(waypoint, WAYPOINT_DEFAULT_FIELDS, waypoint.get_version(),
+                           lambda: build_object(WAYPOINT_FIELDS, waypoint, WAYPOINT_DEFAULT_FIELDS))
+
+
+# Roadtrips
+ROADTRIP_FIELDS = {
+    'id': lambda roadtrip: roadtrip.get_id(),
+    'title': lambda roadtrip: roadtrip.get_title(),
+    'sub_title': lambda roadtrip: roadtrip.get_sub_title(),
+    'author': lambda roadtrip: roadtrip.get_author(),
+    'waypoints': lambda roadtrip: encode_array(waypoint_fragment(waypoint) for waypoint in roadtrip.get_waypoints()),
+    'waypoint_count': lambda roadtrip: len(roadtrip.get_waypoints()),
+    'distance_between_waypoints': lambda roadtrip: roadtrip.get_distance_between_waypoints(),
+    'total_distance': lambda roadtrip: roadtrip.get_total_distance(),
+    'total_time': lambda roadtrip: roadtrip.get_total_time(),
+    'description': lambda roadtrip: roadtrip.get_description(),
+    'category': lambda roadtrip: roadtrip.get_category(),
+    'summary': lambda roadtrip: roadtrip.get_summary(),
+}
+
+ROADTRIP_VIEWS = {
+    'summary': ('id', 'title', 'sub_title', 'author', 'category', 'summary',
+                'total_distance', 'total_time', 'waypoint_count'),
+    'full': ('id', 'title', 'sub_title', 'author', 'waypoints', 'distance_between_waypoints',
+             'total_distance', 'total_time', 'description', 'category', 'summary'),
+}
+
+
+def roadtrip_state(roadtrip: Roadtrip, fields: tuple):
+    if 'waypoints' not in fields:
+        return roadtrip.get_version()
+    # waypoints do not point back at their roadtrip, so check them too
+    return roadtrip.get_version(), tuple(waypoint.get_version() for waypoint in roadtrip.get_waypoints())
+
+
+def roadtrip_fragment(roadtrip: Roadtrip, fields: tuple = ROADTRIP_VIEWS['full']):
+    return cached_fragment(roadtrip, fields, roadtrip_state(roadtrip, fields),
+                           lambda: build_object(ROADTRIP_FIELDS, roadtrip, fields))
+
+
+# Reviews
+REVIEW_FIELDS = {
+    'id': lambda review: review.get_id(),
+    'reviewer': lambda review: review.get_reviewer(),
+    'review_text': lambda review: review.get_review_text(),
+    'rating': lambda review: review.get_rating(),
+}
+
+REVIEW_DEFAULT_FIELDS = tuple(REVIEW_FIELDS)
+
+
+def review_fragment(review: Review):
+    return cached_fragment(review, REVIEW_DEFAULT_FIELDS, review.get_version(),
+                           lambda: build_object(REVIEW_FIELDS, review, REVIEW_DEFAULT_FIELDS))
+
+
+# Landmarks
+LANDMARK_FIELDS = {
+    'id': lambda landmark: landmark.get_id(),
+    'name': lambda landmark: landmark.get_name(),
+    'amenity': lambda landmark: landmark.get_amenity(),
+    'position': lambda landmark: landmark.get_position(),
+    'opening_hours': lambda landmark: landmark.get_opening_hours(),
+    'average_rating': lambda landmark: landmark.get_average_rating(),
+    'rating_count': lambda landmark: landmark.get_rating_count(),
+    'rating_histogram': lambda landmark: landmark.get_rating_histogram(),
+    'reviews': lambda landmark: encode_array(review_fragment(review) for review in landmark.get_reviews()),
+}
+
+LANDMARK_VIEWS = {
+    'summary': ('id', 'name', 'amenity', 'position', 'opening_hours'),
+    'list': ('id', 'name', 'amenity', 'position', 'opening_hours', 'reviews'),
+    'full': ('id', 'name', 'amenity', 'position', 'opening_hours',
+             'average_rating', 'rating_count', 'rating_histogram', 'reviews'),
+}
+
+
+def landmark_fragment(landmark: Landmark, fields: tuple = LANDMARK_VIEWS['full']):
+    return cached_fragment(landmark, fields, landmark.get_version(),
+                           lambda: build_object(LANDMARK_FIELDS, landmark, fields))
+
+
+# Magazines
+MAGAZINE_FIELDS = ('id', 'title', 'description', 'roadtrips', 'roadtrip_count')
+
+MAGAZINE_DEFAULT_FIELDS = ('id', 'title', 'description', 'roadtrips')
+
+
+def magazine_fragment(magazine: Magazine, roadtrips: list, fields: tuple = MAGAZINE_DEFAULT_FIELDS,
+                      roadtrip_fields: tuple = ROADTRIP_VIEWS['full']):
+    # nested roadtrips are assembled per request from their own fragments
+    builders = {
+        'id': lambda magazine: magazine.get_id(),
+        'title': lambda magazine: magazine.get_title(),
+        'description': lambda magazine: magazine.get_description(),
+        'roadtrips': lambda magazine: encode_array(roadtrip_fragment(roadtrip, roadtrip_fields) for roadtrip in roadtrips),
+        'roadtrip_count': lambda magazine: len(roadtrips),
+    }
+    return build_object(builders, magazine, fields)
+
+
+class ViewParams:
+    '''
+    Query parameters choosing how much of an entity a response carries
+
+    - view: `summary | full` preset roadtrip field list, defaults to `full`
+    - fields: `str` comma separated field names of the listed entity
+    '''
+
+    def __init__(self, view: Literal['summary', 'full'] = 'full', fields: str | None = None):
+        self.view = view
+        self.fields = [field.strip() for field in fields.split(',') if field.strip()] if fields else None
+
+    def get_roadtrip_fields(self):
+        return ROADTRIP_VIEWS[self.view]
+
+    def resolve(self, default_fields, available):
+        if self.fields is None:
+            return default_fields
+        unknown = [field for field in self.fields if field not in available]
+        if unknown:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST, detail=f"Unknown fields: {', '.join(unknown)}")
+        return tuple(dict.fromkeys(self.fields))
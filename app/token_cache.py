@@ -0,0 +1,54 @@
+import hashlib
+import time
+from collections import OrderedDict
+
+
+class TokenCache:
+    '''
+    Bounded LRU of access tokens whose signature was already verified:
+    token digest -> (expires at, username, account). Entries die at the
+    token's `exp`; callers still check the account is live under that
+    username before trusting a hit.
+    '''
+
+    def __init__(self, max_size: int):
+        self.__entries = OrderedDict()
+        self.__max_size = max_size
+
+    # Getters
+    def get(self, token: str):
+        '''The `(username, account)` verified for this token, or None'''
+        key = self.__key(token)
+        entry = self.__entries.get(key)
+        if entry is None:
+            return None
+        expires_at, username, account = entry
+        if time.time() >= expires_at:
+            del self.__entries[key]
+            return None
+        self.__entries.move_to_end(key)
+        return username, account
+
+    def get_size(self):
+        return len(self.__entries)
+
+    # Setters
+    def put(self, token: str, expires_at: float, username: str, account):
+        if self.__max_size <= 0:
+            return
+        key = self.__key(token)
+        self.__entries[key] = (expires_at, username, account)
+        self.__entries.move_to_end(key)
+        if len(self.__entries) > self.__max_size:
+            self.__entries.popitem(last=False)
+
+    def discard(self, token: str):
+        self.__entries.pop(self.__key(token), None)
+
+    def clear(self):
+        self.__entries.clear()
+
+    # Utility methods
+    def __key(self, token: str):
+        # digests keep raw tokens out of memory dumps and are cheap to hash
+        return hashlib.blake2b(token.encode(), digest_size=16).digest()
@@ -1,23 +1,57 @@
-from passlib.context import CryptContext
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from jose import jwt
+from functools import lru_cache
 
 from .config import get_settings
 
 settings = get_settings()
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+@lru_cache()
+def get_pwd_context():
+    # passlib is slow to import, it loads on first use or during the warm-up
+    from passlib.context import CryptContext
+
+    return CryptContext(
+        # bcrypt stays listed so existing hashes verify after a scheme change
+        schemes=list(dict.fromkeys([settings.PASSWORD_SCHEME, "bcrypt"])),
+        deprecated="auto",
+        bcrypt__rounds=settings.BCRYPT_ROUNDS,
+        bcrypt__min_rounds=settings.BCRYPT_ROUNDS,
+        bcrypt__max_rounds=settings.BCRYPT_ROUNDS,
+    )
+
+
+# bcrypt releases the GIL, so a few threads hash in parallel without blocking the event loop
+password_executor = ThreadPoolExecutor(
+    max_workers=settings.PASSWORD_HASH_WORKERS, thread_name_prefix="password")
 
 
 def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+    return get_pwd_context().verify(plain_password, hashed_password)
 
 
 def get_password_hash(password):
-    return pwd_context.hash(password)
+    return get_pwd_context().hash(password)
+
+
+async def hash_password(password):
+    return await asyncio.get_running_loop().run_in_executor(password_executor, get_pwd_context().hash, password)
+
+
+async def verify_and_update_password(plain_password, hashed_password):
+    '''
+    Verify a password off the event loop. Returns `(valid, new_hash)`, where
+    new_hash is set when the stored hash uses an outdated scheme or cost.
+    '''
+    return await asyncio.get_running_loop().run_in_executor(
+        password_executor, get_pwd_context().verify_and_update, plain_password, hashed_password)
 
 
 def create_access_token(data: dict, expires_delta: timedelta | None = None):
+    from jose import jwt
+
     to_encode = data.copy()
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
@@ -26,4 +60,4 @@ def create_access_token(data: dict, expires_delta: timedelta | None = None):
     to_encode.update({"exp": expire})
     encoded_jwt = jwt.encode(
         to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
-    return encoded_jwt
\ No newline at end of file
+    return encoded_jwt
@@ -0,0 +1,33 @@
+from starlette.concurrency import run_in_threadpool
+
+from .databases import roadtrips_collection, landmarks_collection
+from .pagination import DEFAULT_PAGE_SIZE
+from .serializers import roadtrip_fragment, landmark_fragment, ROADTRIP_VIEWS, LANDMARK_VIEWS
+from .utils import get_pwd_context
+
+
+def load_auth_modules():
+    '''Import jose and load the passlib backend, which the first token check or login would pay for'''
+    from jose import jwt  # noqa: F401
+
+    handler = get_pwd_context().handler()
+    get_backend = getattr(handler, 'get_backend', None)
+    if get_backend is not None:
+        get_backend()
+
+
+def warm_fragment_caches():
+    '''Encode the first page of each list, the responses a fresh instance serves first'''
+    roadtrips, _ = roadtrips_collection.get_roadtrips_page(0, DEFAULT_PAGE_SIZE)
+    for roadtrip in roadtrips:
+        roadtrip_fragment(roadtrip, ROADTRIP_VIEWS['full'])
+    landmarks, _ = landmarks_collection.get_landmarks_page(0, DEFAULT_PAGE_SIZE)
+    for landmark in landmarks:
+        landmark_fragment(landmark, LANDMARK_VIEWS['list'])
+
+
+async def warm_up():
+    # imports hold the import lock, not the GIL for long, so they can load beside requests
+    await run_in_threadpool(load_auth_modules)
+    # catalogs are only touched from the event loop
+    warm_fragment_caches()
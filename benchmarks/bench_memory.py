@@ -0,0 +1,87 @@
+'''
+Memory benchmark for the domain entities: bytes allocated per entity, alone
+and once indexed by its catalog. Field values are shared strings, so the
+numbers are the per-object overhead plus ids and positions.
+
+    python benchmarks/bench_memory.py --count 100000
+'''
+import argparse
+import gc
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.internal.account import Account  # noqa: E402
+from app.internal.landmark import Landmark  # noqa: E402
+from app.internal.landmark_catalog import LandmarkCatalog  # noqa: E402
+from app.internal.magazine import Magazine  # noqa: E402
+from app.internal.review import Review  # noqa: E402
+from app.internal.roadtrip import Roadtrip  # noqa: E402
+from app.internal.roadtrip_catalog import RoadtripCatalog  # noqa: E402
+from app.internal.user import User  # noqa: E402
+from app.internal.waypoint import Waypoint  # noqa: E402
+
+TEXT = 'Mo-Su 08:00-20:00'
+
+
+def position(i: int):
+    return [48.0 + i * 1e-6, 2.0 + i * 1e-6]
+
+
+def landmarks_with_reviews(count: int, reviews_per_landmark: int = 10):
+    catalog = LandmarkCatalog()
+    for i in range(count // reviews_per_landmark):
+        landmark = Landmark(f'node/{i}', TEXT, 'cafe', position(i), TEXT)
+        catalog.add_landmark(landmark)
+        for j in range(reviews_per_landmark):
+            landmark.add_review(Review(TEXT, f'user{j}', 4))
+    return catalog
+
+
+def roadtrips_with_waypoints(count: int, waypoints_per_roadtrip: int = 20):
+    catalog = RoadtripCatalog()
+    for i in range(count // waypoints_per_roadtrip):
+        roadtrip = Roadtrip('author')
+        roadtrip.set_waypoints([Waypoint(f'{i}-{j}', TEXT, 'cafe', position(j), TEXT, TEXT, TEXT)
+                                for j in range(waypoints_per_roadtrip)])
+        catalog.add_roadtrip(roadtrip)
+    return catalog
+
+
+CASES = {
+    'Account': lambda count: [Account(TEXT, TEXT, TEXT) for _ in range(count)],
+    'User': lambda count: [User(TEXT, TEXT, TEXT) for _ in range(count)],
+    'Magazine': lambda count: [Magazine(TEXT, TEXT) for _ in range(count)],
+    'Review': lambda count: [Review(TEXT, TEXT, 4) for _ in range(count)],
+    'Landmark': lambda count: [Landmark(f'node/{i}', TEXT, 'cafe', position(i), TEXT) for i in range(count)],
+    'Waypoint': lambda count: [Waypoint(f'w{i}', TEXT, 'cafe', position(i), TEXT, TEXT, TEXT) for i in range(count)],
+    'Roadtrip': lambda count: [Roadtrip('author') for _ in range(count)],
+    'Review in catalog': landmarks_with_reviews,
+    'Waypoint in roadtrip': roadtrips_with_waypoints,
+}
+
+
+def measure(build, count: int):
+    gc.collect()
+    tracemalloc.start()
+    kept = build(count)
+    allocated = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del kept
+    return allocated / count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--count', type=int, default=100000, help='entities per case')
+    args = parser.parse_args()
+
+    print(f'{"entity":<22}{"bytes":>8}')
+    for name, build in CASES.items():
+        print(f'{name:<22}{measure(build, args.count):>8.0f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+'''
+Serialization benchmark for roadtrip listings: the original path (nested
+dicts through jsonable_encoder and the stdlib json module) against the
+current one (orjson-encoded fragments, cold and cached).
+
+    python benchmarks/bench_serialization.py --roadtrips 2000 --waypoints 20
+'''
+import argparse
+import json
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# app settings are read on import, the benchmark needs no real secrets
+for name, value in {'SECRET_KEY': 'benchmark', 'ALGORITHM': 'HS256', 'ACCESS_TOKEN_EXPIRE_MINUTES': '30'}.items():
+    os.environ.setdefault(name, value)
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+
+from app.internal.roadtrip import Roadtrip  # noqa: E402
+from app.internal.roadtrip_catalog import RoadtripCatalog  # noqa: E402
+from app.internal.waypoint import Waypoint  # noqa: E402
+from app.serializers import ROADTRIP_VIEWS, encode_array, fragment_cache, roadtrip_fragment  # noqa: E402
+
+
+def build_catalog(roadtrip_count: int, waypoint_count: int):
+    catalog = RoadtripCatalog()
+    for i in range(roadtrip_count):
+        roadtrip = Roadtrip(f'author{i % 50}')
+        roadtrip.set_title(f'Roadtrip {i}')
+        roadtrip.set_sub_title('Through the hills')
+        roadtrip.set_description('A long day on scenic roads. ' * 5)
+        roadtrip.set_category('scenic')
+        roadtrip.set_summary('Hills, lakes and a castle')
+        roadtrip.set_waypoints([
+            Waypoint(f'{i}-{j}', f'Stop {j}', 'cafe', [48.0 + j / 100, 2.0 + j / 100], 'Mo-Su 08:00-20:00',
+                     'Try the cake', 'A small cafe by the road')
+            for j in range(waypoint_count)
+        ])
+        roadtrip.set_distance_between_waypoints([1200] * max(waypoint_count - 1, 0))
+        roadtrip.set_total_distance(1200 * waypoint_count)
+        roadtrip.set_total_time(90 * waypoint_count)
+        catalog.add_roadtrip(roadtrip)
+    return catalog
+
+
+def roadtrip_dict(roadtrip: Roadtrip):
+    # the shape the handlers used to build before fragments
+    return {
+        'id': roadtrip.get_id(),
+        'title': roadtrip.get_title(),
+        'sub_title': roadtrip.get_sub_title(),
+        'author': roadtrip.get_author(),
+        'waypoints': [
+            {
+                'id': waypoint.get_id(),
+                'name': waypoint.get_name(),
+                'description': waypoint.get_description(),
+                'position': waypoint.get_position(),
+                'amenity': waypoint.get_amenity(),
+                'opening_hours': waypoint.get_opening_hours(),
+                'note': waypoint.get_note(),
+            } for waypoint in roadtrip.get_waypoints()
+        ],
+        'distance_between_waypoints': roadtrip.get_distance_between_waypoints(),
+        'total_distance': roadtrip.get_total_distance(),
+        'total_time': roadtrip.get_total_time(),
+        'description': roadtrip.get_description(),
+        'category': roadtrip.get_category(),
+        'summary': roadtrip.get_summary()
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--roadtrips', type=int, default=2000)
+    parser.add_argument('--waypoints', type=int, default=20)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    roadtrips = build_catalog(args.roadtrips, args.waypoints).get_roadtrips()
+    fields = ROADTRIP_VIEWS['full']
+
+    def original():
+        return json.dumps(jsonable_encoder([roadtrip_dict(roadtrip) for roadtrip in roadtrips])).encode()
+
+    def fragments_cold():
+        fragment_cache.clear()
+        return encode_array(roadtrip_fragment(roadtrip, fields) for roadtrip in roadtrips)
+
+    def fragments_cached():
+        return encode_array(roadtrip_fragment(roadtrip, fields) for roadtrip in roadtrips)
+
+    assert json.loads(original()) == json.loads(fragments_cold())
+    size = len(fragments_cached())
+    print(f'{args.roadtrips} roadtrips x {args.waypoints} waypoints, {size / 1024:.0f} KiB of JSON')
+
+    baseline = None
+    for name, run in (('jsonable_encoder + json', original),
+                      ('orjson fragments, cold', fragments_cold),
+                      ('orjson fragments, cached', fragments_cached)):
+        seconds = min(timeit.repeat(run, number=1, repeat=args.repeat))
+        baseline = baseline or seconds
+        print(f'{name:28} {seconds * 1000:9.1f} ms  {baseline / seconds:6.1f}x')
+
+
+if __name__ == '__main__':
+    main()
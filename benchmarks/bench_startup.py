@@ -0,0 +1,80 @@
+'''
+Cold start benchmark: time `import app.main` and the startup initialize()
+in fresh interpreters, and fail when the median import exceeds a budget.
+
+    python benchmarks/bench_startup.py --runs 7 --max-import-seconds 1.5
+    python benchmarks/bench_startup.py --profile  # slowest imports, from -X importtime
+'''
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = '''
+import time
+start = time.perf_counter()
+import app.main
+imported = time.perf_counter()
+app.main.initialize()
+initialized = time.perf_counter()
+print(imported - start, initialized - imported)
+'''
+
+# enough settings to boot without a .env file
+DEFAULT_ENV = {
+    'SECRET_KEY': 'benchmark',
+    'ALGORITHM': 'HS256',
+    'ACCESS_TOKEN_EXPIRE_MINUTES': '30',
+}
+
+
+def run_probe(env):
+    output = subprocess.run([sys.executable, '-c', PROBE], cwd=ROOT, env=env, check=True,
+                            capture_output=True, text=True).stdout
+    import_seconds, initialize_seconds = map(float, output.split())
+    return import_seconds, initialize_seconds
+
+
+def profile_imports(env, top: int):
+    stderr = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import app.main'], cwd=ROOT, env=env,
+                            check=True, capture_output=True, text=True).stderr
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, module = line[len('import time:'):].split('|')
+        rows.append((int(cumulative), module.strip()))
+    for cumulative, module in sorted(rows, reverse=True)[:top]:
+        print(f'{cumulative / 1000:9.1f} ms  {module}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--max-import-seconds', type=float, default=None,
+                        help='exit with status 1 when the median import time is above this')
+    parser.add_argument('--profile', action='store_true', help='list the slowest imports instead')
+    parser.add_argument('--top', type=int, default=15)
+    args = parser.parse_args()
+
+    env = {**DEFAULT_ENV, **os.environ}
+    if args.profile:
+        profile_imports(env, args.top)
+        return
+
+    samples = [run_probe(env) for _ in range(args.runs)]
+    import_median = statistics.median(sample[0] for sample in samples)
+    initialize_median = statistics.median(sample[1] for sample in samples)
+    print(f'import app.main  median {import_median * 1000:8.1f} ms over {args.runs} runs')
+    print(f'initialize()     median {initialize_median * 1000:8.1f} ms')
+
+    if args.max_import_seconds is not None and import_median > args.max_import_seconds:
+        print(f'import time above the {args.max_import_seconds}s budget', file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
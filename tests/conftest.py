@@ -0,0 +1,5 @@
+import os
+
+# app settings are read on import, tests need no real secrets
+for name, value in {'SECRET_KEY': 'test', 'ALGORITHM': 'HS256', 'ACCESS_TOKEN_EXPIRE_MINUTES': '30'}.items():
+    os.environ.setdefault(name, value)
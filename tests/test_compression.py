@@ -0,0 +1,36 @@
+from starlette.applications import Starlette
+from starlette.responses import Response
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from app.compression import CompressionMiddleware
+from app.etags import etag_matches, etag_headers, not_modified_response
+
+ETAG = '"abc-123"'
+
+
+async def listing(request):
+    if etag_matches(request, ETAG):
+        return not_modified_response(ETAG)
+    return Response(b'{"items":[]}' * 200, media_type='application/json', headers=etag_headers(ETAG))
+
+
+client = TestClient(CompressionMiddleware(Starlette(routes=[Route('/', listing)]), minimum_size=100))
+
+
+def test_not_modified_repeats_the_weak_tag_of_a_compressed_response():
+    response = client.get('/', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['content-encoding'] == 'gzip'
+    assert response.headers['etag'] == 'W/' + ETAG
+
+    revalidated = client.get('/', headers={'Accept-Encoding': 'gzip', 'If-None-Match': response.headers['etag']})
+    assert revalidated.status_code == 304
+    assert revalidated.headers['etag'] == response.headers['etag']
+    assert revalidated.headers['vary'] == response.headers['vary'] == 'Accept-Encoding'
+
+
+def test_identity_keeps_the_strong_tag():
+    response = client.get('/', headers={'Accept-Encoding': 'identity'})
+    assert 'content-encoding' not in response.headers
+    assert response.headers['etag'] == ETAG
+    assert client.get('/', headers={'Accept-Encoding': 'identity', 'If-None-Match': ETAG}).headers['etag'] == ETAG
@@ -0,0 +1,21 @@
+import time
+
+import numpy as np
+
+from app.internal.geometry import haversine_distances, vincenty_distances
+
+
+def test_vincenty_matches_reference_distance():
+    assert abs(float(vincenty_distances(50.06632, -5.71475, 58.64402, -3.07009)) - 969954.166) < 0.01
+
+
+def test_vincenty_antipodal_pair_falls_back_without_slowing_the_rest():
+    rng = np.random.default_rng(0)
+    positions = np.column_stack([48.8 + rng.normal(0, 0.1, 200), 2.3 + rng.normal(0, 0.1, 200)])
+    positions = np.vstack([positions, [[0.0, 0.0], [0.5, 179.7]]])
+    lat, lon = positions[:, 0], positions[:, 1]
+    started = time.perf_counter()
+    distances = vincenty_distances(lat[:, None], lon[:, None], lat[None, :], lon[None, :])
+    assert time.perf_counter() - started < 0.25
+    assert np.isfinite(distances).all()
+    assert distances[-2, -1] == haversine_distances(0.0, 0.0, 0.5, 179.7)
@@ -0,0 +1,77 @@
+import pytest
+
+from app.internal.account_catalog import AccountCatalog
+from app.internal.journal import Journal
+from app.internal.landmark_catalog import LandmarkCatalog
+from app.internal.magazine_catalog import MagazineCatalog
+from app.internal.roadtrip import Roadtrip
+from app.internal.roadtrip_catalog import RoadtripCatalog
+
+
+def boot(directory):
+    roadtrips = RoadtripCatalog()
+    journal = Journal(str(directory), roadtrips, AccountCatalog(), LandmarkCatalog(), MagazineCatalog())
+    journal.open()
+    return journal, roadtrips
+
+
+def test_batch_writes_one_record_per_entity(tmp_path):
+    journal, roadtrips = boot(tmp_path)
+    roadtrip = Roadtrip('alice')
+    roadtrips.add_roadtrip(roadtrip)
+    before = journal.get_record_count()
+
+    with journal.batch():
+        roadtrip.set_title('Alps')
+        roadtrip.set_category('mountain')
+        roadtrip.set_summary('Passes')
+
+    assert journal.get_record_count() == before + 1
+    journal.close()
+    _, reloaded = boot(tmp_path)
+    assert reloaded.get_roadtrip_by_id(roadtrip.get_id()).get_category() == 'mountain'
+
+
+def test_changes_during_a_paged_capture_survive(tmp_path):
+    journal, roadtrips = boot(tmp_path)
+    kept = [Roadtrip('alice') for _ in range(5)]
+    for roadtrip in kept:
+        roadtrips.add_roadtrip(roadtrip)
+
+    pages = journal.capture_pages(page_size=2)
+    next(pages)
+    next(pages)
+    kept[4].set_title('changed')
+    roadtrips.remove_roadtrip(kept[0])
+    added = Roadtrip('bob')
+    roadtrips.add_roadtrip(added)
+    for state in pages:
+        pass
+    journal.write_snapshot(state)
+
+    _, reloaded = boot(tmp_path)
+    assert {roadtrip.get_id() for roadtrip in reloaded.get_roadtrips()} == {
+        roadtrip.get_id() for roadtrip in kept[1:] + [added]}
+    assert reloaded.get_roadtrip_by_id(kept[4].get_id()).get_title() == 'changed'
+
+
+def test_reopen_restores_the_record_count(tmp_path):
+    journal, roadtrips = boot(tmp_path)
+    for _ in range(3):
+        roadtrips.add_roadtrip(Roadtrip('alice'))
+    count = journal.get_record_count()
+
+    reopened, reloaded = boot(tmp_path)
+    assert reopened.get_record_count() == count
+    assert len(reloaded.get_roadtrips()) == 3
+
+
+def test_unknown_format_is_refused(tmp_path):
+    journal, roadtrips = boot(tmp_path)
+    roadtrips.add_roadtrip(Roadtrip('alice'))
+    journal.close()
+    with open(tmp_path / 'snapshot.bin', 'r+b') as file:
+        file.write(b'XXXX')
+
+    with pytest.raises(ValueError):
+        boot(tmp_path)
@@ -0,0 +1,17 @@
+from app.internal.landmark import Landmark
+from app.internal.review import Review
+
+
+def test_non_finite_ratings_count_as_missing():
+    landmark = Landmark('node/1', 'Eiffel', 'tower', [48.8, 2.3], '')
+    landmark.add_review(Review('nice', 'alice', 4))
+    for reviewer, rating in (('bob', float('nan')), ('carol', float('inf'))):
+        landmark.add_review(Review('odd', reviewer, rating))
+    assert landmark.get_rating_count() == 1
+    assert landmark.get_average_rating() == 4
+
+    review = landmark.get_review_by_username('alice')
+    review.set_rating(float('-inf'))
+    assert landmark.get_rating_count() == 0
+    review.set_rating(2)
+    assert landmark.get_average_rating() == 2
@@ -0,0 +1,16 @@
+import asyncio
+
+from app import main
+
+
+def test_failed_warm_up_is_logged_and_still_ready(monkeypatch, caplog):
+    async def broken_warm_up():
+        raise RuntimeError('cache unavailable')
+
+    monkeypatch.setattr(main, 'warm_up', broken_warm_up)
+    monkeypatch.setattr(main.app.state, 'ready', False)
+
+    asyncio.run(main.warm_up_then_ready())
+
+    assert main.app.state.ready
+    assert 'Warm-up failed' in caplog.text
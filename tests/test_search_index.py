@@ -0,0 +1,20 @@
+import pytest
+
+from app.internal.search_index import SearchIndex
+
+
+def test_prefix_keeps_the_most_frequent_terms():
+    index = SearchIndex({'title': 1.0})
+    for doc_id in range(SearchIndex.MAX_PREFIX_TERMS * 2):
+        index.add_document(doc_id, {'title': f'par{doc_id:03d}'})
+    for doc_id in range(1000, 1005):
+        index.add_document(doc_id, {'title': 'paris trip'})
+    assert index.search('par trip') == [1000, 1001, 1002, 1003, 1004]
+
+
+def test_add_document_rejects_non_strings():
+    index = SearchIndex({'title': 1.0})
+    index.add_document('a', {'title': 'lyon'})
+    with pytest.raises(TypeError):
+        index.add_document('a', {'title': 123})
+    assert index.search('lyon') == ['a']
@@ -0,0 +1,21 @@
+from app.internal.roadtrip import Roadtrip
+from app.serializers import FragmentCache
+
+
+def test_fragment_cache_is_bounded_in_bytes():
+    cache = FragmentCache(max_bytes=10 * (FragmentCache.ENTRY_OVERHEAD + 100))
+    roadtrips = [Roadtrip('alice') for _ in range(50)]
+    for roadtrip in roadtrips:
+        for fields in (('id',), ('id', 'title')):
+            cache.put(roadtrip, fields, 0, b'x' * 100)
+    assert cache.get_size() <= 10 * (FragmentCache.ENTRY_OVERHEAD + 100)
+    assert cache.get(roadtrips[-1], ('id', 'title'), 0) == b'x' * 100
+    assert cache.get(roadtrips[0], ('id',), 0) is None
+
+
+def test_fragment_cache_checks_state_and_identity():
+    cache = FragmentCache(max_bytes=1 << 20)
+    roadtrip = Roadtrip('alice')
+    cache.put(roadtrip, ('id',), 1, b'{}')
+    assert cache.get(roadtrip, ('id',), 2) is None
+    assert cache.get(Roadtrip('bob'), ('id',), 1) is None
@@ -0,0 +1,33 @@
+import random
+import time
+
+from app.internal.spatial_index import GeoGrid, haversine
+
+
+def brute_force(points: dict, lat: float, lon: float, radius: float, limit: int):
+    distances = sorted((haversine(lat, lon, *position), key) for key, position in points.items())
+    return [key for distance, key in distances if distance <= radius][:limit]
+
+
+def test_nearest_matches_brute_force():
+    rng = random.Random(4)
+    for _ in range(200):
+        lat, lon = rng.uniform(-90, 90), rng.uniform(-180, 180)
+        grid, points = GeoGrid(), {}
+        for key in range(rng.choice((1, 20, 200))):
+            spread = rng.choice((0.1, 2.0, 30.0))
+            position = (max(-90.0, min(90.0, lat + rng.gauss(0, spread))),
+                        (lon + rng.gauss(0, spread * 3) + 180) % 360 - 180)
+            points[key] = position
+            grid.insert(key, *position, key)
+        radius, limit = rng.choice((1000, 50000, 2000000)), rng.choice((1, 10))
+        assert [key for _, key in grid.nearest(lat, lon, radius, limit)] == brute_force(points, lat, lon, radius, limit)
+
+
+def test_polar_query_is_bounded():
+    for lat in (89.0, 89.99, -90.0):
+        grid = GeoGrid()
+        grid.insert('only', 48.8, 2.35, 'only')
+        started = time.perf_counter()
+        assert grid.nearest(lat, 2.35, 50000, 10) == []
+        assert time.perf_counter() - started < 0.05
@@ -0,0 +1,70 @@
+import pytest
+
+from app.internal.roadtrip import Roadtrip
+from app.internal.sqlite_catalogs import SQLiteMagazineCatalog, SQLiteRoadtripCatalog
+from app.internal.sqlite_storage import SQLiteStorage
+
+
+@pytest.fixture
+def roadtrips(tmp_path):
+    storage = SQLiteStorage(str(tmp_path / 'rally.db'))
+    yield SQLiteRoadtripCatalog(storage, SQLiteMagazineCatalog(storage))
+    storage.close()
+
+
+def change_count(storage):
+    with storage.read() as connection:
+        return connection.execute('SELECT COUNT(*) FROM changes').fetchone()[0]
+
+
+def test_setters_in_one_write_save_once(roadtrips):
+    storage = roadtrips.get_storage()
+    roadtrip = Roadtrip('alice')
+    roadtrips.add_roadtrip(roadtrip)
+    before = change_count(storage)
+
+    with storage.write():
+        roadtrip.set_title('Alps')
+        roadtrip.set_category('mountain')
+        roadtrip.set_summary('Passes')
+
+    assert change_count(storage) == before + 1
+    assert [found.get_id() for found in roadtrips.get_roadtrips_by_keyword('alps')] == [roadtrip.get_id()]
+
+
+def test_failed_write_rolls_back_deferred_saves(roadtrips):
+    storage = roadtrips.get_storage()
+    roadtrip = Roadtrip('alice')
+    roadtrips.add_roadtrip(roadtrip)
+
+    with pytest.raises(ValueError):
+        with storage.write():
+            roadtrip.set_title('Alps')
+            raise ValueError
+    with storage.read() as connection:
+        assert connection.execute('SELECT title FROM roadtrips').fetchone()[0] == ''
+
+
+def test_instance_id_is_shared_by_every_storage_on_the_file(tmp_path):
+    first, second = SQLiteStorage(str(tmp_path / 'rally.db')), SQLiteStorage(str(tmp_path / 'rally.db'))
+    other = SQLiteStorage(str(tmp_path / 'other.db'))
+    assert first.get_instance_id() == second.get_instance_id() != other.get_instance_id()
+    for storage in (first, second, other):
+        storage.close()
+
+
+def test_workers_saving_the_same_roadtrip_get_distinct_versions(tmp_path):
+    first, second = SQLiteStorage(str(tmp_path / 'rally.db')), SQLiteStorage(str(tmp_path / 'rally.db'))
+    first_roadtrips = SQLiteRoadtripCatalog(first, SQLiteMagazineCatalog(first))
+    second_roadtrips = SQLiteRoadtripCatalog(second, SQLiteMagazineCatalog(second))
+    roadtrip = Roadtrip('alice')
+    first_roadtrips.add_roadtrip(roadtrip)
+    copy = second_roadtrips.get_roadtrip_by_id(roadtrip.get_id())
+
+    roadtrip.set_title('Alps')
+    copy.set_title('Dolomites')
+
+    assert roadtrip.get_version() != copy.get_version()
+    assert second_roadtrips.get_roadtrip_by_id(roadtrip.get_id()).get_version() == copy.get_version()
+    for storage in (first, second):
+        storage.close()